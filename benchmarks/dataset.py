@@ -0,0 +1,175 @@
+import random
+from bisect import bisect_right
+from datetime import datetime, date, timedelta, UTC
+from itertools import accumulate
+from typing import List, Iterator, Tuple, Optional
+
+from pydantic import BaseModel, Field
+
+from src.utils.comment.comment_path import ROOT_PATH, path_segment
+from src.utils.password_utils import hash_password
+
+# Every synthetic user has this password
+BENCHMARK_PASSWORD = "benchmark-password"
+
+# Column order of the generated rows, ids of likes are left to the sequence
+USER_COLUMNS = ("id", "email", "first_name", "last_name", "password", "date_of_birth", "created_at", "updated_at")
+POST_COLUMNS = ("id", "title", "content", "draft", "author_id", "auto_reply", "reply_after", "created_at", "updated_at")
+COMMENT_COLUMNS = (
+    "id", "content", "likes", "post_id", "owner_id", "parent_id", "path", "blocked", "blocked_at",
+    "created_at", "updated_at",
+)
+LIKE_COLUMNS = ("comment_id", "owner_id", "created_at")
+
+_WORDS = (
+    "the quick brown fox jumps over lazy dog lorem ipsum dolor sit amet post comment reply great idea "
+    "thanks agree disagree interesting python fastapi database index query cache latency network social "
+    "weekend coffee travel music movie book photo story question answer update news today yesterday"
+).split()
+_FIRST_NAMES = ("John", "Jane", "Alex", "Maria", "Ivan", "Olena", "Chen", "Aisha", "Lucas", "Emma", "Noah", "Sara")
+_LAST_NAMES = ("Doe", "Smith", "Kovalenko", "Garcia", "Nguyen", "Khan", "Muller", "Rossi", "Silva", "Brown")
+
+# Shape of the heavy tail of likes per comment, see SyntheticDataset.comments_and_likes
+_LIKES_PARETO_ALPHA = 1.5
+# Texts are slices of one random text of this many words, which is much faster than joining random words
+_CORPUS_WORDS = 100_000
+
+
+class DatasetConfig(BaseModel):
+    users: int = Field(default=1_000, gt=0)
+    posts: int = Field(default=5_000, gt=0)
+    comments: int = Field(default=50_000, ge=0)
+    mean_likes_per_comment: float = Field(default=2.0, ge=0)
+    reply_ratio: float = Field(default=0.6, ge=0, le=1, description="Share of comments that reply to another comment")
+    blocked_ratio: float = Field(default=0.02, ge=0, le=1)
+    draft_ratio: float = Field(default=0.05, ge=0, le=1)
+    zipf_exponent: float = Field(default=1.1, gt=0, description="Skew of the popularity of users and posts")
+    start_date: date = date(2024, 1, 1)
+    days: int = Field(default=90, gt=0, description="Posts are spread over this many days after start_date")
+    seed: int = 42
+
+
+def zipf_cum_weights(n: int, exponent: float) -> List[float]:
+    """
+    Cumulative Zipf weights, the item with index 0 is the most popular one.
+    """
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def zipf_counts(total: int, n: int, exponent: float) -> List[int]:
+    """
+    Splits total between n items proportionally to their Zipf weights, the counts sum up to total exactly.
+    """
+    weights = [1 / (rank ** exponent) for rank in range(1, n + 1)]
+    weights_sum = sum(weights)
+    expected = [total * weight / weights_sum for weight in weights]
+    counts = [int(value) for value in expected]
+    # Hand out what rounding down left over to the items with the largest remainders
+    remainder = total - sum(counts)
+    for index in sorted(range(n), key=lambda i: counts[i] - expected[i])[:remainder]:
+        counts[index] += 1
+    return counts
+
+
+class SyntheticDataset:
+    """
+    Deterministic generator of users, posts, comment trees and likes.
+
+    Authors and commenters are picked with Zipfian popularity, the number of comments per post
+    follows the Zipf distribution too (the post with id 1 is the most discussed one).
+    Every part of the dataset is generated from its own random generator seeded with the seed
+    and the position of the part, so the posts can be generated in any order or in parallel
+    and still produce the same rows.
+    Rows are tuples in the order of the *_COLUMNS constants, ids start at 1.
+    """
+    def __init__(self, config: DatasetConfig, password_hash: Optional[str] = None):
+        """
+        :param config: Size and shape of the dataset.
+        :param password_hash: Hash of BENCHMARK_PASSWORD, computed when it's not given.
+        """
+        self.config = config
+        self.password_hash = password_hash or hash_password(BENCHMARK_PASSWORD)
+        self.start = datetime.combine(config.start_date, datetime.min.time(), tzinfo=UTC)
+        self._user_cum_weights = zipf_cum_weights(config.users, config.zipf_exponent)
+        self.comment_counts = zipf_counts(config.comments, config.posts, config.zipf_exponent)
+        # The id of the first comment of every post, comments of a post have consecutive ids
+        self.first_comment_ids = [first_id + 1 for first_id in [0] + list(accumulate(self.comment_counts))[:-1]]
+
+        words = self._random("corpus").choices(_WORDS, k=_CORPUS_WORDS)
+        self._corpus = " ".join(words) + " "
+        self._word_starts = [0] + list(accumulate(len(word) + 1 for word in words))
+
+    def _random(self, *parts: object) -> random.Random:
+        return random.Random(f"{self.config.seed}:" + ":".join(map(str, parts)))
+
+    def _pick_user(self, rng: random.Random) -> int:
+        point = rng.random() * self._user_cum_weights[-1]
+        return bisect_right(self._user_cum_weights, point) + 1
+
+    def _text(self, rng: random.Random, min_words: int, max_words: int) -> str:
+        words = rng.randint(min_words, max_words)
+        start = rng.randrange(_CORPUS_WORDS - words)
+        return self._corpus[self._word_starts[start]:self._word_starts[start + words] - 1]
+
+    def users(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple]:
+        stop = self.config.users if stop is None else stop
+        for index in range(start, stop):
+            rng = self._random("user", index)
+            created_at = self.start - timedelta(days=rng.randint(0, 365))
+            yield (
+                index + 1, f"user{index + 1}@bench.example",
+                rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES), self.password_hash,
+                date(1970, 1, 1) + timedelta(days=rng.randint(0, 365 * 35)),
+                created_at, created_at,
+            )
+
+    def _post_created_at(self, index: int) -> datetime:
+        rng = self._random("post-time", index)
+        return self.start + timedelta(seconds=rng.randint(0, self.config.days * 86400))
+
+    def posts(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple]:
+        stop = self.config.posts if stop is None else stop
+        for index in range(start, stop):
+            rng = self._random("post", index)
+            created_at = self._post_created_at(index)
+            yield (
+                index + 1, self._text(rng, 3, 10).capitalize(), self._text(rng, 20, 200),
+                rng.random() < self.config.draft_ratio, self._pick_user(rng),
+                False, None, created_at, created_at,
+            )
+
+    def comments_and_likes(self, post_index: int) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        Generates the comment tree of the post and the likes of its comments.
+
+        A comment replies to a random earlier comment of the post with probability reply_ratio,
+        so popular posts get deep threads. The number of likes per comment has a heavy tail
+        and likes_count of the comment always equals the number of its like rows.
+        """
+        rng = self._random("comments", post_index)
+        config = self.config
+        first_id = self.first_comment_ids[post_index]
+        created_at = self._post_created_at(post_index)
+        likes_scale = config.mean_likes_per_comment * (_LIKES_PARETO_ALPHA - 1)
+
+        comments, likes, paths = [], [], []
+        for offset in range(self.comment_counts[post_index]):
+            comment_id = first_id + offset
+            parent_id, path = None, ROOT_PATH
+            if offset and rng.random() < config.reply_ratio:
+                parent_offset = rng.randrange(offset)
+                parent_id = first_id + parent_offset
+                path = paths[parent_offset] + path_segment(parent_id)
+            paths.append(path)
+            created_at += timedelta(seconds=rng.randint(1, 3600))
+            blocked = rng.random() < config.blocked_ratio
+
+            likes_count = min(round((rng.paretovariate(_LIKES_PARETO_ALPHA) - 1) * likes_scale), config.users)
+            for owner_id in rng.sample(range(1, config.users + 1), likes_count):
+                likes.append((comment_id, owner_id, created_at + timedelta(seconds=rng.randint(1, 86400))))
+
+            comments.append((
+                comment_id, self._text(rng, 3, 60), likes_count, post_index + 1, self._pick_user(rng), parent_id, path,
+                blocked, created_at if blocked else None, created_at, created_at,
+            ))
+        return comments, likes
@@ -0,0 +1,184 @@
+"""
+Generates a large synthetic dataset and streams it into Postgres with COPY.
+
+    python -m benchmarks.generate --users 1000000 --posts 1000000 --comments 10000000 --workers 8
+
+Rows are generated by worker processes in chunks, every chunk is copied in its own transaction.
+The dataset is deterministic: the same options and seed produce the same rows regardless of the number of workers.
+The content of the users, posts, comments and likes tables of psql_connection_string is REPLACED.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple, Optional, Iterable
+
+import asyncpg
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from src.core.database import engine
+from src.core.settings import settings
+from .dataset import (
+    DatasetConfig, SyntheticDataset, USER_COLUMNS, POST_COLUMNS, COMMENT_COLUMNS, LIKE_COLUMNS,
+)
+from .seed import truncate_tables, reset_sequences, fill_counters, TABLES
+
+# Set in every worker process by _init_worker, so the dataset isn't pickled with every chunk
+_dataset: Optional[SyntheticDataset] = None
+_dsn: Optional[str] = None
+_disable_triggers = False
+
+
+def asyncpg_dsn(connection_string: str) -> str:
+    return connection_string.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def plan_comment_chunks(comment_counts: List[int], comments_per_chunk: int) -> List[Tuple[int, int]]:
+    """
+    Groups consecutive posts into ranges of post indexes with about comments_per_chunk comments each.
+    A post is never split, so the comment tree of the post is copied in one transaction.
+    """
+    chunks, start, size = [], 0, 0
+    for index, count in enumerate(comment_counts):
+        size += count
+        if size >= comments_per_chunk:
+            chunks.append((start, index + 1))
+            start, size = index + 1, 0
+    if start < len(comment_counts):
+        chunks.append((start, len(comment_counts)))
+    return chunks
+
+
+def _init_worker(config: DatasetConfig, password_hash: str, dsn: str, disable_triggers: bool) -> None:
+    global _dataset, _dsn, _disable_triggers
+    _dataset = SyntheticDataset(config, password_hash)
+    _dsn = dsn
+    _disable_triggers = disable_triggers
+
+
+async def _copy(tables: Iterable[Tuple[str, Tuple[str, ...], Iterable[tuple]]]) -> None:
+    connection = await asyncpg.connect(_dsn)
+    try:
+        async with connection.transaction():
+            if _disable_triggers:
+                # Skips the foreign key checks, the generator guarantees the references. Needs a superuser
+                await connection.execute("SET LOCAL session_replication_role = replica")
+            for table, columns, records in tables:
+                await connection.copy_records_to_table(table, records=records, columns=columns)
+    finally:
+        await connection.close()
+
+
+def _load_users(start: int, stop: int) -> Tuple[str, int]:
+    asyncio.run(_copy([("users", USER_COLUMNS, _dataset.users(start, stop))]))
+    return "users", stop - start
+
+
+def _load_posts(start: int, stop: int) -> Tuple[str, int]:
+    asyncio.run(_copy([("posts", POST_COLUMNS, _dataset.posts(start, stop))]))
+    return "posts", stop - start
+
+
+def _load_comments(start: int, stop: int) -> Tuple[str, int]:
+    comments, likes = [], []
+    for post_index in range(start, stop):
+        post_comments, post_likes = _dataset.comments_and_likes(post_index)
+        comments.extend(post_comments)
+        likes.extend(post_likes)
+    asyncio.run(_copy([("comments", COMMENT_COLUMNS, comments), ("likes", LIKE_COLUMNS, likes)]))
+    return "comments", len(comments)
+
+
+def _ranges(total: int, size: int) -> List[Tuple[int, int]]:
+    return [(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def _run_stage(executor: ProcessPoolExecutor, function, chunks: List[Tuple[int, int]], total: int) -> None:
+    done = 0
+    started_at = time.perf_counter()
+    futures = [executor.submit(function, start, stop) for start, stop in chunks]
+    for future in as_completed(futures):
+        table, rows = future.result()
+        done += rows
+        elapsed = time.perf_counter() - started_at
+        print(f"{table}: {done}/{total} rows, {done / elapsed:,.0f} rows/s", flush=True)
+
+
+async def _prepare_tables() -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await truncate_tables(connection)
+    # The pool belongs to this event loop, the next asyncio.run has another one
+    await engine.dispose()
+
+
+async def _finish_tables() -> None:
+    async with engine.begin() as connection:
+        await fill_counters(connection)
+        await reset_sequences(connection)
+    # ANALYZE can't run in a transaction block
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for table in TABLES:
+            await connection.execute(text(f"ANALYZE {table}"))
+    await engine.dispose()
+
+
+def generate(config: DatasetConfig, workers: int, rows_per_chunk: int, disable_triggers: bool = False) -> None:
+    """
+    Replaces the tables with the dataset, users and posts are loaded before comments and likes
+    so the foreign keys hold in every chunk.
+    """
+    dataset = SyntheticDataset(config)
+    dsn = asyncpg_dsn(settings.psql_connection_string)
+    asyncio.run(_prepare_tables())
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker,
+        initargs=(config, dataset.password_hash, dsn, disable_triggers),
+    ) as executor:
+        _run_stage(executor, _load_users, _ranges(config.users, rows_per_chunk), config.users)
+        _run_stage(executor, _load_posts, _ranges(config.posts, rows_per_chunk), config.posts)
+        _run_stage(
+            executor, _load_comments, plan_comment_chunks(dataset.comment_counts, rows_per_chunk), config.comments,
+        )
+
+    asyncio.run(_finish_tables())
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--posts", type=int, default=200_000)
+    parser.add_argument("--comments", type=int, default=2_000_000)
+    parser.add_argument("--likes-per-comment", type=float, default=2.0)
+    parser.add_argument("--reply-ratio", type=float, default=0.6, help="Share of comments that are replies")
+    parser.add_argument("--blocked-ratio", type=float, default=0.02, help="Share of blocked comments")
+    parser.add_argument("--draft-ratio", type=float, default=0.05, help="Share of draft posts")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--rows-per-chunk", type=int, default=100_000, help="Rows copied in one transaction")
+    parser.add_argument("--disable-triggers", action="store_true",
+                        help="Skip foreign key checks while copying (requires a superuser)")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    config = DatasetConfig(
+        users=args.users, posts=args.posts, comments=args.comments,
+        mean_likes_per_comment=args.likes_per_comment, reply_ratio=args.reply_ratio,
+        blocked_ratio=args.blocked_ratio, draft_ratio=args.draft_ratio,
+        zipf_exponent=args.zipf_exponent, seed=args.seed,
+    )
+    started_at = time.perf_counter()
+    generate(config, args.workers, args.rows_per_chunk, args.disable_triggers)
+    print(f"Done in {time.perf_counter() - started_at:.1f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,104 @@
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Sequence, Optional
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LatencyRecorder:
+    """
+    Collects latencies (in seconds) and errors per operation.
+    """
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, operation: str, latency: float, failed: bool) -> None:
+        self.latencies.setdefault(operation, []).append(latency)
+        if failed:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def summary(self, duration: float) -> Dict[str, dict]:
+        """
+        :param duration: Time the measured requests took (in seconds), used for the throughput.
+        """
+        operations = {}
+        all_latencies = []
+        for operation, latencies in sorted(self.latencies.items()):
+            all_latencies.extend(latencies)
+            operations[operation] = self._summarize(sorted(latencies), self.errors.get(operation, 0), duration)
+        return {
+            "total": self._summarize(sorted(all_latencies), sum(self.errors.values()), duration),
+            "operations": operations,
+        }
+
+    @staticmethod
+    def _summarize(latencies: List[float], errors: int, duration: float) -> dict:
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput": round(len(latencies) / duration, 2) if duration else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2, min_delta_ms: float = 2.0) -> List[str]:
+    """
+    Returns the regressions of the current report against the baseline.
+
+    A percentile is a regression when it grew by more than the tolerance and by at least min_delta_ms,
+    so sub-millisecond noise of fast endpoints doesn't fail the run. Throughput regresses when
+    it dropped by more than the tolerance, and any errors where the baseline had none are a regression too.
+
+    :param tolerance: Allowed relative change, 0.2 is 20%.
+    :param min_delta_ms: Smallest absolute latency increase that counts.
+    """
+    regressions = []
+    pairs = [("total", current["total"], baseline["total"])] + [
+        (name, stats, baseline["operations"][name])
+        for name, stats in current["operations"].items() if name in baseline["operations"]
+    ]
+    for name, stats, base in pairs:
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if stats[key] > base[key] * (1 + tolerance) and stats[key] - base[key] >= min_delta_ms:
+                regressions.append(f"{name}: {key} {base[key]} -> {stats[key]}")
+        if stats["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput']} -> {stats['throughput']} req/s")
+        if stats["errors"] and not base["errors"]:
+            regressions.append(f"{name}: {stats['errors']} errors, baseline had none")
+    return regressions
+
+
+def format_table(report: dict, regressions: Optional[List[str]] = None) -> str:
+    regressed = {regression.split(":", 1)[0] for regression in regressions or []}
+    header = f"{'operation':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    lines = [header, "-" * len(header)]
+    rows = list(report["operations"].items()) + [("total", report["total"])]
+    for name, stats in rows:
+        flag = "  REGRESSION" if name in regressed else ""
+        lines.append(
+            f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput']:>10}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def save_report(report: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+
+def load_report(path: Path) -> dict:
+    return json.loads(path.read_text())
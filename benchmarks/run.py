@@ -0,0 +1,145 @@
+"""
+Runs a workload mix against the API and reports throughput and latency percentiles per operation.
+
+    python -m benchmarks.run --seed-data --mix read-heavy --concurrency 20 --duration 30 \\
+        --baseline benchmarks/baselines/read-heavy.json
+
+The app runs in-process with stub moderation and reply backends, unless --base-url points to a running server.
+--seed-data REPLACES the content of the database configured by psql_connection_string, use a scratch database.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from dependency_injector import providers
+
+from src.core.app_factory import create_app
+from src.core.database import engine
+from .dataset import DatasetConfig, SyntheticDataset, BENCHMARK_PASSWORD
+from .report import LatencyRecorder, compare, format_table, save_report, load_report
+from .seed import seed_database
+from .stubs import StubContentModerator, StubReplyGenerator
+from .workloads import Targets, WorkloadContext, OPERATIONS, MIXES
+
+
+async def log_in(client: httpx.AsyncClient, emails: List[str]) -> Dict[str, str]:
+    tokens = {}
+    for email in emails:
+        response = await client.post("/api/v1/auth/token", data={"username": email, "password": BENCHMARK_PASSWORD})
+        response.raise_for_status()
+        tokens[email] = response.json()["access_token"]
+    return tokens
+
+
+async def run_workload(client: httpx.AsyncClient, targets: Targets, tokens: Dict[str, str], mix: Dict[str, int],
+                       concurrency: int, duration: float, warmup: float, seed: int,
+                       zipf_exponent: float) -> LatencyRecorder:
+    """
+    Runs concurrent virtual users that pick operations by the weights of the mix.
+    Requests started during the warmup aren't recorded.
+    """
+    operations, weights = list(mix), list(mix.values())
+    recorder = LatencyRecorder()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def virtual_user(number: int) -> None:
+        ctx = WorkloadContext(client, targets, tokens, random.Random(f"{seed}:{number}"), zipf_exponent)
+        while time.perf_counter() < deadline:
+            operation = ctx.rng.choices(operations, weights)[0]
+            started_at = time.perf_counter()
+            try:
+                response = await OPERATIONS[operation](ctx)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if started_at >= measure_from:
+                recorder.record(operation, time.perf_counter() - started_at, failed)
+
+    await asyncio.gather(*(virtual_user(number) for number in range(concurrency)))
+    return recorder
+
+
+def create_client(args: argparse.Namespace) -> httpx.AsyncClient:
+    if args.base_url:
+        return httpx.AsyncClient(base_url=args.base_url, timeout=60)
+
+    app = create_app()
+    app.container.content_moderator.override(providers.Object(StubContentModerator(args.moderator_latency)))
+    app.container.reply_generator.override(providers.Object(StubReplyGenerator(args.reply_latency)))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=60)
+
+
+async def main(args: argparse.Namespace) -> int:
+    config = DatasetConfig(
+        users=args.users, posts=args.posts, comments=args.comments,
+        mean_likes_per_comment=args.likes_per_comment, zipf_exponent=args.zipf_exponent, seed=args.seed,
+    )
+    if args.seed_data:
+        print(f"Seeding {config.users} users, {config.posts} posts, {config.comments} comments...")
+        await seed_database(engine, SyntheticDataset(config))
+
+    targets = await Targets.load(engine, accounts=args.accounts)
+    async with create_client(args) as client:
+        tokens = await log_in(client, targets.emails)
+        recorder = await run_workload(
+            client, targets, tokens, MIXES[args.mix], args.concurrency, args.duration, args.warmup,
+            args.seed, args.zipf_exponent,
+        )
+
+    report = {
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "dataset": config.model_dump(mode="json") if args.seed_data else None,
+        **recorder.summary(args.duration),
+    }
+
+    regressions = []
+    baseline_path = Path(args.baseline) if args.baseline else None
+    if baseline_path and baseline_path.exists() and not args.save_baseline:
+        regressions = compare(report, load_report(baseline_path), args.tolerance)
+
+    print(format_table(report, regressions))
+    if args.output:
+        save_report(report, Path(args.output))
+    if baseline_path and (args.save_baseline or not baseline_path.exists()):
+        save_report(report, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="read-heavy")
+    parser.add_argument("--concurrency", type=int, default=20, help="Number of virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Measured time (in seconds)")
+    parser.add_argument("--warmup", type=float, default=5, help="Time before the measurement (in seconds)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the dataset and the virtual users")
+    parser.add_argument("--seed-data", action="store_true", help="Replace the database content with a synthetic dataset")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--posts", type=int, default=5_000)
+    parser.add_argument("--comments", type=int, default=50_000)
+    parser.add_argument("--likes-per-comment", type=float, default=2.0)
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--accounts", type=int, default=20, help="Number of users the virtual users act as")
+    parser.add_argument("--moderator-latency", type=float, default=0.05, help="Latency of the stub moderator")
+    parser.add_argument("--reply-latency", type=float, default=0.5, help="Latency of the stub reply generator")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--baseline", help="JSON baseline to compare with, created when it doesn't exist")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression, 0.2 is 20%%")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args(sys.argv[1:]))))
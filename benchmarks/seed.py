@@ -0,0 +1,69 @@
+from itertools import islice
+from typing import Iterable, Tuple, Sequence
+
+from sqlalchemy import text, Table
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+from sqlmodel import SQLModel
+
+from src.models.comment import Comment
+from src.models.like import Like
+from src.models.post import Post
+from src.models.user import User
+from src.repositories.comment.counters import post_comment_count_fix, comment_reply_count_fix
+from .dataset import SyntheticDataset, USER_COLUMNS, POST_COLUMNS, COMMENT_COLUMNS, LIKE_COLUMNS
+
+TABLES = ("likes", "comments", "posts", "users")
+
+
+def batched(rows: Iterable[Tuple], size: int) -> Iterable[list]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def truncate_tables(connection: AsyncConnection) -> None:
+    await connection.execute(text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"))
+
+
+async def reset_sequences(connection: AsyncConnection) -> None:
+    """
+    Moves the id sequences past the explicitly inserted ids.
+    """
+    for table in TABLES:
+        await connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        ))
+
+
+async def fill_counters(connection: AsyncConnection) -> None:
+    """
+    Computes the denormalized comment and reply counters of the loaded rows.
+    """
+    await connection.execute(post_comment_count_fix())
+    await connection.execute(comment_reply_count_fix())
+
+
+async def _insert(connection: AsyncConnection, table: Table, columns: Sequence[str], rows: Iterable[Tuple],
+                  batch_size: int) -> None:
+    for batch in batched(rows, batch_size):
+        await connection.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+
+
+async def seed_database(engine: AsyncEngine, dataset: SyntheticDataset, batch_size: int = 1_000) -> None:
+    """
+    Replaces the content of the tables with the dataset using batched INSERTs.
+    """
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await truncate_tables(connection)
+        await _insert(connection, User.__table__, USER_COLUMNS, dataset.users(), batch_size)
+        await _insert(connection, Post.__table__, POST_COLUMNS, dataset.posts(), batch_size)
+        # The dataset is deterministic, so the comments are generated again for their likes
+        # instead of keeping all the likes in memory until the comments are inserted
+        posts = range(dataset.config.posts)
+        await _insert(connection, Comment.__table__, COMMENT_COLUMNS,
+                      (row for index in posts for row in dataset.comments_and_likes(index)[0]), batch_size)
+        await _insert(connection, Like.__table__, LIKE_COLUMNS,
+                      (row for index in posts for row in dataset.comments_and_likes(index)[1]), batch_size)
+        await fill_counters(connection)
+        await reset_sequences(connection)
@@ -0,0 +1,28 @@
+import asyncio
+
+from src.utils.content_moderator.abstract import AbstractContentModerator
+from src.utils.reply_generator.abstract import AbstractReplyGenerator
+
+
+class StubContentModerator(AbstractContentModerator):
+    """
+    Accepts every text after a fixed delay that stands in for the moderation API.
+    """
+    def __init__(self, latency: float = 0.05):
+        self._latency = latency
+
+    async def moderate_text(self, text: str) -> bool:
+        await asyncio.sleep(self._latency)
+        return True
+
+
+class StubReplyGenerator(AbstractReplyGenerator):
+    """
+    Returns a canned reply after a fixed delay that stands in for Gemini.
+    """
+    def __init__(self, latency: float = 0.5):
+        self._latency = latency
+
+    async def generate_reply(self, prompt: str) -> str:
+        await asyncio.sleep(self._latency)
+        return "Thank you for your comment!"
@@ -0,0 +1,158 @@
+import random
+from bisect import bisect_right
+from datetime import timedelta, date
+from typing import Callable, Awaitable, Dict, List, Sequence
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .dataset import zipf_cum_weights, BENCHMARK_PASSWORD
+
+
+class Targets:
+    """
+    Ids the workloads pick from, the lists are ordered from the most to the least popular item.
+    """
+    def __init__(self, post_ids: List[int], comment_ids: List[int], emails: List[str], author_emails: List[str],
+                 first_date: date):
+        self.post_ids = post_ids
+        self.comment_ids = comment_ids
+        self.emails = emails
+        self.author_emails = author_emails
+        self.first_date = first_date
+
+    @classmethod
+    async def load(cls, engine: AsyncEngine, limit: int = 10_000, accounts: int = 50) -> "Targets":
+        """
+        Reads the targets from the database, so datasets generated by other tools work as well.
+        Posts are ranked by the number of comments, comments by the number of likes.
+
+        :param limit: Max number of posts and comments to pick from.
+        :param accounts: Number of users that log in, the authors of the most popular posts come first.
+        """
+        async with engine.connect() as connection:
+            posts = (await connection.execute(text(
+                "SELECT posts.id, users.email FROM posts JOIN users ON users.id = posts.author_id "
+                "LEFT JOIN comments ON comments.post_id = posts.id "
+                "WHERE NOT posts.draft GROUP BY posts.id, users.email ORDER BY COUNT(comments.id) DESC LIMIT :limit"
+            ), {"limit": limit})).all()
+            comment_ids = (await connection.execute(text(
+                "SELECT comments.id FROM comments JOIN posts ON posts.id = comments.post_id "
+                "WHERE NOT comments.blocked AND NOT posts.draft ORDER BY comments.likes DESC LIMIT :limit"
+            ), {"limit": limit})).scalars().all()
+            emails = (await connection.execute(
+                text("SELECT email FROM users ORDER BY id LIMIT :limit"), {"limit": accounts}
+            )).scalars().all()
+            first_post_at = (await connection.execute(text("SELECT MIN(created_at) FROM posts"))).scalar()
+
+        author_emails = list(dict.fromkeys(email for _, email in posts))[:max(accounts // 5, 1)]
+        emails = list(dict.fromkeys(author_emails + list(emails)))[:accounts]
+        return cls(
+            [post_id for post_id, _ in posts], list(comment_ids), emails, author_emails,
+            first_post_at.date() if first_post_at else date.today(),
+        )
+
+
+class WorkloadContext:
+    """
+    State of one virtual user: its client, random generator and the tokens of the logged in accounts.
+    """
+    def __init__(self, client: httpx.AsyncClient, targets: Targets, tokens: Dict[str, str],
+                 rng: random.Random, zipf_exponent: float = 1.1):
+        self.client = client
+        self.targets = targets
+        self.tokens = tokens
+        self.rng = rng
+        self._cum_weights: Dict[int, List[float]] = {}
+        self._zipf_exponent = zipf_exponent
+
+    def pick(self, items: Sequence):
+        """
+        Picks an item with Zipfian popularity, the first item is the most popular one.
+        """
+        cum_weights = self._cum_weights.get(len(items))
+        if cum_weights is None:
+            cum_weights = self._cum_weights[len(items)] = zipf_cum_weights(len(items), self._zipf_exponent)
+        return items[bisect_right(cum_weights, self.rng.random() * cum_weights[-1])]
+
+    def auth_headers(self, email: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.tokens[email]}"}
+
+    def any_user_headers(self) -> Dict[str, str]:
+        return self.auth_headers(self.rng.choice(self.targets.emails))
+
+
+Operation = Callable[[WorkloadContext], Awaitable[httpx.Response]]
+
+
+async def feed(ctx: WorkloadContext) -> httpx.Response:
+    return await ctx.client.get("/api/v1/posts/")
+
+
+async def post_detail(ctx: WorkloadContext) -> httpx.Response:
+    return await ctx.client.get(f"/api/v1/posts/{ctx.pick(ctx.targets.post_ids)}")
+
+
+async def comment_thread(ctx: WorkloadContext) -> httpx.Response:
+    return await ctx.client.get("/api/v1/comments/", params={"post_id": ctx.pick(ctx.targets.post_ids)})
+
+
+async def comment_detail(ctx: WorkloadContext) -> httpx.Response:
+    return await ctx.client.get(f"/api/v1/comments/{ctx.pick(ctx.targets.comment_ids)}")
+
+
+async def like(ctx: WorkloadContext) -> httpx.Response:
+    comment_id = ctx.pick(ctx.targets.comment_ids)
+    return await ctx.client.put(f"/api/v1/comments/{comment_id}/like", headers=ctx.any_user_headers())
+
+
+async def create_comment(ctx: WorkloadContext) -> httpx.Response:
+    return await ctx.client.post(
+        "/api/v1/comments/", headers=ctx.any_user_headers(),
+        json={"content": "Benchmark comment", "post_id": ctx.pick(ctx.targets.post_ids)},
+    )
+
+
+async def login(ctx: WorkloadContext) -> httpx.Response:
+    return await ctx.client.post(
+        "/api/v1/auth/token", data={"username": ctx.rng.choice(ctx.targets.emails), "password": BENCHMARK_PASSWORD},
+    )
+
+
+async def analytics(ctx: WorkloadContext) -> httpx.Response:
+    # A month long window within the first three months of the data
+    date_from = ctx.targets.first_date + timedelta(days=ctx.rng.randint(0, 60))
+    return await ctx.client.get(
+        "/api/v1/comments/analytics/daily-breakdown",
+        headers=ctx.auth_headers(ctx.rng.choice(ctx.targets.author_emails)),
+        params={"date_from": date_from.isoformat(), "date_to": (date_from + timedelta(days=30)).isoformat()},
+    )
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "feed": feed,
+    "post_detail": post_detail,
+    "comment_thread": comment_thread,
+    "comment_detail": comment_detail,
+    "like": like,
+    "create_comment": create_comment,
+    "login": login,
+    "analytics": analytics,
+}
+
+# Relative weights of the operations
+MIXES: Dict[str, Dict[str, int]] = {
+    "read-heavy": {
+        "feed": 30, "post_detail": 25, "comment_thread": 25, "comment_detail": 10,
+        "like": 5, "login": 2, "analytics": 3,
+    },
+    "mixed": {
+        "feed": 20, "post_detail": 15, "comment_thread": 20, "comment_detail": 10,
+        "like": 15, "create_comment": 10, "login": 5, "analytics": 5,
+    },
+    "write-heavy": {
+        "feed": 10, "post_detail": 10, "comment_thread": 15,
+        "like": 35, "create_comment": 25, "login": 5,
+    },
+}
@@ -1,11 +1,54 @@
 import os
+import redis
 from celery import Celery
+from celery.signals import task_prerun, task_postrun
 from celery.utils.log import get_task_logger
 
+from src.core.celery_metrics import WorkerMetricsPusher, TaskTimer
+from src.core.settings import settings
+
 celery = Celery(__name__)
 celery.conf.broker_url = os.getenv("CELERY_BROKER_URL")
 celery.conf.result_backend = os.getenv("CELERY_BROKER_URL")
+# A send to a hung broker fails after the timeout instead of holding the sending thread
+celery.conf.broker_connection_timeout = settings.task_enqueue_timeout_seconds
+celery.conf.broker_transport_options = {
+    "socket_timeout": settings.task_enqueue_timeout_seconds,
+    "socket_connect_timeout": settings.task_enqueue_timeout_seconds,
+}
 
 celery.autodiscover_tasks(["src.tasks"])
 
-logger = get_task_logger(__name__)
\ No newline at end of file
+# Periodic tasks, they run when the worker is started with --beat (or a separate celery beat process)
+celery.conf.beat_schedule = {
+    "reconcile-comment-counters": {
+        "task": "reconcile-comment-counters",
+        "schedule": float(os.getenv("COUNTER_RECONCILE_INTERVAL_SECONDS", 3600)),
+    },
+    "purge-deleted-posts": {
+        "task": "purge-deleted-posts",
+        "schedule": float(os.getenv("POST_PURGE_INTERVAL_SECONDS", 3600)),
+    },
+    "relay-outbox": {
+        "task": "relay-outbox",
+        "schedule": float(os.getenv("OUTBOX_RELAY_INTERVAL_SECONDS", 5)),
+    },
+}
+
+logger = get_task_logger(__name__)
+
+# Task durations and calls to external services are pushed to the broker, the API exposes them on /metrics
+task_timer = TaskTimer(
+    WorkerMetricsPusher(redis.Redis.from_url(celery.conf.broker_url))
+    if celery.conf.broker_url else None
+)
+
+
+@task_prerun.connect
+def on_task_prerun(task_id=None, **kwargs):
+    task_timer.task_started(task_id)
+
+
+@task_postrun.connect
+def on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    task_timer.task_finished(task_id, task.name, state)
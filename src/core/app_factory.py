@@ -1,9 +1,21 @@
 from fastapi import FastAPI
 from .containers import Container
+from .settings import settings
+from .query_stats import install_query_listeners
+from .metrics import registry
+from .celery_metrics import make_celery_collector
+from .loop_monitor import LoopLagMonitor
+from src.celery_worker import celery
+from src.middlewares.database_routing import DatabaseRoutingMiddleware
+from src.middlewares.database_session import DatabaseSessionMiddleware
+from src.middlewares.query_stats import QueryStatsMiddleware
+from src.middlewares.metrics import MetricsMiddleware
 from src.routes.user import router as user_router
 from src.routes.auth import router as auth_router
 from src.routes.post import router as post_router
 from src.routes.comment import router as comment_router
+from src.routes.metrics import router as metrics_router
+from src.routes.debug import router as debug_router
 
 
 def create_app() -> FastAPI:
@@ -21,9 +33,46 @@ def create_app() -> FastAPI:
     app = FastAPI()
     app.container = container
 
+    app.add_middleware(DatabaseSessionMiddleware)
+    if settings.psql_replica_connection_strings:
+        app.add_middleware(DatabaseRoutingMiddleware, sticky_seconds=settings.read_your_writes_seconds)
+
+    install_query_listeners()
+    app.add_middleware(
+        QueryStatsMiddleware,
+        budget=settings.query_budget,
+        strict=settings.query_budget_strict,
+        n_plus_one_threshold=settings.n_plus_one_threshold,
+    )
+
+    if settings.metrics_enabled:
+        # Added last, so it's the outermost middleware and the duration covers the others
+        app.add_middleware(MetricsMiddleware)
+        if celery.conf.broker_url:
+            registry.register_collector(make_celery_collector(celery.conf.broker_url))
+        app.include_router(metrics_router)
+
+    if settings.loop_lag_threshold_seconds > 0:
+        loop_monitor = LoopLagMonitor(
+            interval=settings.loop_lag_threshold_seconds / 2, threshold=settings.loop_lag_threshold_seconds,
+        )
+        app.add_event_handler("startup", loop_monitor.start)
+        app.add_event_handler("shutdown", loop_monitor.stop)
+
+    # Applies the invalidations of the post cache sent by the other processes
+    post_cache = container.post_cache()
+    app.add_event_handler("startup", post_cache.start)
+    app.add_event_handler("shutdown", post_cache.stop)
+
+    # Sends the enqueued Celery tasks in batches, and the tasks spilled while the broker was down
+    task_enqueuer = container.task_enqueuer()
+    app.add_event_handler("startup", task_enqueuer.start)
+    app.add_event_handler("shutdown", task_enqueuer.stop)
+
     app.include_router(auth_router, prefix=api_v1_prefix)
     app.include_router(user_router, prefix=api_v1_prefix)
     app.include_router(post_router, prefix=api_v1_prefix)
     app.include_router(comment_router, prefix=api_v1_prefix)
+    app.include_router(debug_router, prefix=api_v1_prefix)
 
     return app
\ No newline at end of file
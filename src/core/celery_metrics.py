@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Tuple, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from src.core.metrics import (
+    registry, Metric, Gauge, Sample, external_call_duration, external_call_errors, auto_replies_skipped,
+    auto_replies_merged,
+)
+
+logger = logging.getLogger(__name__)
+
+# Hash that Celery workers add their counters and histograms to, the API renders it at scrape time
+WORKER_METRICS_KEY = "metrics:celery-worker"
+QUEUE_NAMES = ("celery", )
+
+celery_task_duration = registry.histogram(
+    "celery_task_duration_seconds", "Duration of Celery tasks.", labelnames=("task", "state"),
+)
+celery_queue_length = Gauge("celery_queue_length", "Tasks waiting in the Celery queue.", ("queue", ))
+
+# Metrics recorded in worker processes, they are cumulative so deltas of several processes can be summed
+WORKER_METRICS: Tuple[Metric, ...] = (
+    celery_task_duration, external_call_duration, external_call_errors, auto_replies_skipped, auto_replies_merged,
+)
+
+
+def _field(suffix: str, labels: Dict[str, str]) -> str:
+    return suffix + "\t" + json.dumps(labels, sort_keys=True)
+
+
+class WorkerMetricsPusher:
+    """
+    Adds what a worker process recorded since the last push to the shared Redis hash.
+    Each process keeps its own last pushed values, so prefork children don't need to coordinate.
+    """
+    def __init__(self, client: redis.Redis, metrics: Tuple[Metric, ...] = WORKER_METRICS):
+        self._client = client
+        self._metrics = metrics
+        self._pushed: Dict[Tuple[str, str], float] = {}
+
+    def push(self) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        pending = {}
+        for metric in self._metrics:
+            for suffix, labels, value in metric.samples():
+                key = (metric.name, _field(suffix, labels))
+                delta = value - self._pushed.get(key, 0.0)
+                if delta:
+                    pipeline.hincrbyfloat(WORKER_METRICS_KEY, f"{metric.name}\t{key[1]}", delta)
+                    pending[key] = value
+
+        if not pending:
+            return
+        try:
+            pipeline.execute()
+        except redis.RedisError as e:
+            # The deltas are retried with the next push
+            logger.warning("Failed to push worker metrics: %s", e)
+            return
+        self._pushed.update(pending)
+
+
+class TaskTimer:
+    """
+    Measures Celery tasks between the task_prerun and task_postrun signals.
+    """
+    def __init__(self, pusher: Optional[WorkerMetricsPusher] = None):
+        self._pusher = pusher
+        self._started_at: Dict[str, float] = {}
+
+    def task_started(self, task_id: str) -> None:
+        self._started_at[task_id] = time.perf_counter()
+
+    def task_finished(self, task_id: str, task_name: str, state: Optional[str]) -> None:
+        started_at = self._started_at.pop(task_id, None)
+        if started_at is not None:
+            celery_task_duration.labels(task_name, state or "UNKNOWN").observe(time.perf_counter() - started_at)
+        if self._pusher is not None:
+            self._pusher.push()
+
+
+def _parse_worker_metrics(raw: Dict[str, str]) -> List[Tuple[Metric, List[Sample]]]:
+    metrics = {metric.name: metric for metric in WORKER_METRICS}
+    families: Dict[str, List[Sample]] = {}
+    for field, value in raw.items():
+        name, suffix, labels = field.split("\t", 2)
+        if name not in metrics:
+            continue
+        families.setdefault(name, []).append((suffix, {**json.loads(labels), "process": "worker"}, float(value)))
+    return [(metrics[name], samples) for name, samples in families.items()]
+
+
+def make_celery_collector(broker_url: str, timeout: float = 1.0):
+    """
+    Returns a collector that reads the queue length and the metrics pushed by workers from the broker.
+    A slow or unavailable broker drops these families from the scrape instead of failing it.
+
+    :param broker_url: Redis URL of the Celery broker.
+    :param timeout: How long the scrape waits for Redis (in seconds).
+    """
+    client = aioredis.from_url(broker_url, decode_responses=True)
+
+    async def read() -> List[Tuple[Metric, List[Sample]]]:
+        async with client.pipeline(transaction=False) as pipeline:
+            for queue in QUEUE_NAMES:
+                pipeline.llen(queue)
+            pipeline.hgetall(WORKER_METRICS_KEY)
+            *lengths, raw = await pipeline.execute()
+
+        queue_samples = [("", {"queue": queue}, float(length)) for queue, length in zip(QUEUE_NAMES, lengths)]
+        return [(celery_queue_length, queue_samples)] + _parse_worker_metrics(raw)
+
+    async def collect() -> List[Tuple[Metric, List[Sample]]]:
+        try:
+            return await asyncio.wait_for(read(), timeout)
+        except (asyncio.TimeoutError, redis.RedisError, OSError) as e:
+            logger.warning("Failed to collect Celery metrics: %s", e)
+            return []
+
+    return collect
@@ -1,10 +1,15 @@
 from dependency_injector import providers, containers
 
 from .configs.content_moderator_config import ContentModeratorConfig
-from .database import get_session
+from .database import get_request_session
 from .settings import settings
 from .configs.jwt_handler_config import JWTHandlerConfig
 from src.utils.auth.jwt_handler import JWTHandler
+from src.utils.cache import TTLCache
+from src.utils.post.post_cache import make_post_cache
+from src.utils.post.prompt_context import make_prompt_context_cache
+from src.utils.single_flight import SingleFlight
+from src.utils.task_queue import TaskEnqueuer, SpillBuffer, send_to_celery
 from src.repositories.unit_of_work.implementation import UnitOfWork
 from src.repositories.user.implementation import UserRepositoryImplementation
 from src.services.user.implementation import UserServiceImplementation
@@ -14,12 +19,14 @@ from src.services.post.implementation import PostServiceImplementation
 from src.repositories.comment.implementation import CommentRepositoryImplementation
 from src.services.comment.implementation import CommentServiceImplementation
 from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
 from src.utils.content_moderator.implementation import ContentModerator
 from src.utils.reply_generator.implementation import ReplyGenerator
 
 
 class Container(containers.DeclarativeContainer):
-    db_session = providers.Resource(get_session)
+    # One lazily created session per request, see DatabaseSessionMiddleware
+    db_session = providers.Callable(get_request_session)
 
     jwt_config = providers.Singleton(JWTHandlerConfig, secret_key=settings.secret_key)
     jwt_handler = providers.Singleton(JWTHandler, config=jwt_config)
@@ -37,22 +44,58 @@ class Container(containers.DeclarativeContainer):
     post_repository = providers.Factory(PostRepositoryImplementation, session=db_session)
     comment_repository = providers.Factory(CommentRepositoryImplementation, session=db_session)
     like_repository = providers.Factory(LikeRepositoryImplementation, session=db_session)
+    outbox_repository = providers.Factory(OutboxRepositoryImplementation, session=db_session)
 
     unit_of_work = providers.Factory(
         UnitOfWork,
         session=db_session,
         user_repository=user_repository, post_repository=post_repository,
         comment_repository=comment_repository, like_repository=like_repository,
+        outbox_repository=outbox_repository,
     )
 
-    user_service = providers.Factory(UserServiceImplementation, uow=unit_of_work)
-    post_service = providers.Factory(PostServiceImplementation, uow=unit_of_work, content_moderator=content_moderator)
+    user_search_cache = providers.Singleton(
+        TTLCache, max_size=settings.user_search_cache_size, ttl=settings.user_search_cache_ttl_seconds,
+    )
+
+    post_cache = providers.Singleton(
+        make_post_cache,
+        redis_url=settings.cache_redis_url, size=settings.post_cache_size, ttl=settings.post_cache_ttl_seconds,
+        lock_seconds=settings.post_cache_lock_seconds,
+    )
+    # The API only drops the condensed posts of the updated posts from Redis, the worker reads them
+    # (see src.dependencies.comments). Without Redis nothing reaches the worker, it checks the post version instead
+    prompt_context_cache = providers.Singleton(
+        make_prompt_context_cache,
+        redis_url=settings.cache_redis_url, size=0, ttl=settings.prompt_context_cache_ttl_seconds,
+    ) if settings.cache_redis_url else providers.Object(None)
+    read_single_flight = providers.Singleton(SingleFlight, name="reads")
+    token_version_cache = providers.Singleton(
+        TTLCache, max_size=settings.token_version_cache_size, ttl=settings.token_version_cache_ttl_seconds,
+    )
+
+    task_spill = providers.Singleton(SpillBuffer, directory=settings.task_spill_dir)
+    task_enqueuer = providers.Singleton(
+        TaskEnqueuer,
+        send_batch=send_to_celery, spill=task_spill,
+        batch_size=settings.task_enqueue_batch_size, timeout=settings.task_enqueue_timeout_seconds,
+    )
+
+    user_service = providers.Factory(UserServiceImplementation,
+                                     uow=unit_of_work, search_cache=user_search_cache, post_cache=post_cache,
+                                     token_versions=token_version_cache)
+    post_service = providers.Factory(PostServiceImplementation,
+                                     uow=unit_of_work, content_moderator=content_moderator, post_cache=post_cache,
+                                     single_flight=read_single_flight, task_enqueuer=task_enqueuer,
+                                     prompt_context_cache=prompt_context_cache)
     comment_service = providers.Factory(CommentServiceImplementation,
                                         uow=unit_of_work, content_moderator=content_moderator,
-                                        reply_generator=reply_generator,
+                                        reply_generator=reply_generator, post_cache=post_cache,
+                                        single_flight=read_single_flight,
                                         )
 
     auth_service = providers.Factory(
         AuthServiceImplementation,
-        jwt_handler=jwt_handler, uow=unit_of_work
+        jwt_handler=jwt_handler, uow=unit_of_work,
+        token_versions=token_version_cache, stateless=settings.stateless_auth,
     )
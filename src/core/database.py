@@ -1,22 +1,169 @@
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional, List, Tuple
+
+from sqlalchemy import Select
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import SQLModel
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.core.metrics import registry, Gauge, Sample
 from src.core.settings import settings
 
+pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.",
+    labelnames=("database", ),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
 
-engine = create_async_engine(settings.psql_connection_string, echo=True, future=True)
 
-# Asynchronous function to create tables
-async def create_database() -> None:
-    async with engine.begin() as conn:
-        # Create all tables based on SQLModel metadata
-        await conn.run_sync(SQLModel.metadata.create_all)
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long checkouts wait for a free connection (including connecting).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_wait = pool_checkout_wait.labels("primary")
 
-async def get_session() -> AsyncSession:
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
+    def set_metrics_label(self, metrics_label: str) -> None:
+        self._checkout_wait = pool_checkout_wait.labels(metrics_label)
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self._checkout_wait.observe(time.perf_counter() - started_at)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool._checkout_wait = self._checkout_wait
+        return pool
+
+
+def _create_engine(connection_string: str, metrics_label: str):
+    async_engine = create_async_engine(
+        connection_string, echo=settings.sql_echo, future=True, poolclass=InstrumentedQueuePool,
     )
+    async_engine.pool.set_metrics_label(metrics_label)
+    return async_engine
+
+
+engine = _create_engine(settings.psql_connection_string, "primary")
+replica_engines = [
+    _create_engine(connection_string, f"replica{number}")
+    for number, connection_string in enumerate(settings.psql_replica_connection_strings)
+]
+
+_pool_size = Gauge("db_pool_size", "Configured size of the connection pool.", ("database", ))
+_pool_checked_out = Gauge("db_pool_checked_out", "Connections currently checked out of the pool.", ("database", ))
+_pool_overflow = Gauge("db_pool_overflow", "Connections opened above the pool size.", ("database", ))
+
+
+def collect_pool_metrics() -> List[Tuple[Gauge, List[Sample]]]:
+    """
+    Reads the state of the connection pools at scrape time.
+    """
+    pools = [("primary", engine.pool)] + [
+        (f"replica{number}", replica_engine.pool) for number, replica_engine in enumerate(replica_engines)
+    ]
+    return [
+        (gauge, [("", {"database": label}, float(read(pool))) for label, pool in pools])
+        for gauge, read in (
+            (_pool_size, lambda pool: pool.size()),
+            (_pool_checked_out, lambda pool: pool.checkedout()),
+            (_pool_overflow, lambda pool: max(pool.overflow(), 0)),
+        )
+    ]
+
+
+registry.register_collector(collect_pool_metrics)
+
+
+class RoutingState:
+    """
+    Per-request routing decision shared between the middleware and the database session.
+    """
+    __slots__ = ("use_replica", "wrote")
+
+    def __init__(self, use_replica: bool):
+        self.use_replica = use_replica
+        self.wrote = False
+
 
+# Not set outside HTTP requests (Celery tasks, startup hooks), so everything goes to the primary there
+routing_state: ContextVar[Optional[RoutingState]] = ContextVar("routing_state", default=None)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to a random replica while the request allows it.
+    Writes, locking reads and everything after the first write in the request go to the primary,
+    so the request always reads its own writes.
+    """
+    def __init__(self, primary: Engine, replicas: List[Engine], **kwargs):
+        super().__init__(**kwargs)
+        self._primary = primary
+        self._replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        state = routing_state.get()
+
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            if state is not None:
+                state.use_replica = False
+                state.wrote = True
+            return self._primary
+
+        if (
+            self._replicas
+            and state is not None and state.use_replica
+            and isinstance(clause, Select) and clause._for_update_arg is None
+        ):
+            return random.choice(self._replicas)
+
+        return self._primary
+
+
+async_session = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    primary=engine.sync_engine,
+    replicas=[replica_engine.sync_engine for replica_engine in replica_engines],
+)
+
+
+class SessionScope:
+    """
+    Holds the session shared by everything that runs within one request (or one task outside requests).
+    """
+    __slots__ = ("session",)
+
+    def __init__(self):
+        self.session: Optional[AsyncSession] = None
+
+
+session_scope: ContextVar[Optional[SessionScope]] = ContextVar("session_scope", default=None)
+
+async def get_session() -> AsyncSession:
     async with async_session() as session:
         yield session
+
+def get_request_session() -> AsyncSession:
+    """
+    Returns the session of the current request, the session is created on the first call.
+    Creating the session is cheap, it checks out a connection only when the first statement is executed
+    and returns the connection to the pool when it's closed.
+    Outside a request the session is shared by the current task.
+    """
+    scope = session_scope.get()
+    if scope is None:
+        scope = SessionScope()
+        session_scope.set(scope)
+
+    if scope.session is None:
+        scope.session = async_session()
+    return scope.session
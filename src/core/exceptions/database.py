@@ -0,0 +1,7 @@
+class QueryBudgetExceeded(Exception):
+    """Exception raised when a request issues more SQL statements than allowed."""
+    def __init__(self, budget: int, actual: int, path: str):
+        self.budget = budget
+        self.actual = actual
+        self.path = path
+        super().__init__(f"Query budget exceeded for '{path}': expected at most {budget} queries, got {actual}.")
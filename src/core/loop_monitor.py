@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from typing import Optional, Dict
+from weakref import WeakKeyDictionary
+
+from starlette.types import Scope
+
+from src.core.metrics import registry
+from src.core.profiler import thread_stack
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+event_loop_stalls = registry.counter(
+    "event_loop_stalls", "Times the event loop was blocked longer than the threshold.",
+    labelnames=("route", ),
+)
+
+# Requests being processed by the tasks of the loop, filled by MetricsMiddleware
+running_requests: "WeakKeyDictionary[asyncio.Task, Scope]" = WeakKeyDictionary()
+
+
+def _describe_task(task: Optional[asyncio.Task]) -> Dict[str, Optional[str]]:
+    if task is None:
+        return {"route": "unknown", "task": None}
+
+    scope = running_requests.get(task)
+    if scope is None:
+        route = "background"
+    else:
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "unknown")
+    coro = task.get_coro()
+    return {"route": route, "task": f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"}
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a timer that should fire every interval.
+
+    A watchdog thread notices when the loop hasn't woken the timer for longer than the threshold,
+    which means something blocks the loop right now, and captures the stack of the loop thread
+    and the task (and so the route) that is running. When the loop wakes up again,
+    the stall is counted and logged as a warning together with the captured stack.
+    """
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1):
+        """
+        :param interval: Time between the timer wake-ups (in seconds).
+        :param threshold: Lag after which the loop is considered blocked (in seconds).
+        """
+        self._interval = interval
+        self._threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.perf_counter()
+        self._capture: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    async def _run(self) -> None:
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self._heartbeat = time.perf_counter()
+            lag = max(self._heartbeat - started_at - self._interval, 0.0)
+            event_loop_lag.labels().observe(lag)
+
+            capture, self._capture = self._capture, None
+            if lag >= self._threshold:
+                self._report(lag, capture)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._threshold / 2):
+            blocked_for = time.perf_counter() - self._heartbeat - self._interval
+            if blocked_for >= self._threshold and self._capture is None:
+                self._capture = self.capture()
+
+    def capture(self) -> dict:
+        """
+        Returns the stack of the loop thread and what the loop is running at the moment.
+        """
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return {
+            **_describe_task(asyncio.current_task(self._loop)),
+            "stack": thread_stack(frame),
+        }
+
+    def _report(self, lag: float, capture: Optional[dict]) -> None:
+        capture = capture or {"route": "unknown", "task": None, "stack": []}
+        event_loop_stalls.labels(capture["route"]).inc()
+        logger.warning(
+            "Event loop was blocked for %.0f ms while running %s",
+            lag * 1000, capture["task"] or capture["route"],
+            extra={
+                "lag_ms": round(lag * 1000, 2),
+                "route": capture["route"],
+                "task": capture["task"],
+                "blocking_stack": "\n".join(capture["stack"]),
+            },
+        )
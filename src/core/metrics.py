@@ -0,0 +1,240 @@
+import inspect
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Tuple, List, Sequence, Callable, Iterator, Union, Awaitable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# A sample is (suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+class Metric:
+    """
+    Base class of metrics with optional labels.
+
+    Recording only updates plain numbers of the labelled child, nothing is locked or aggregated;
+    the children are turned into samples when the metrics are scraped.
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+    def labels(self, *labelvalues: str):
+        """
+        Returns the child for the label values, the child is created on the first call.
+        """
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"Expected labels {self.labelnames} for metric {self.name}")
+            child = self._children.setdefault(labelvalues, self._new_child())
+        return child
+
+    def _child_samples(self, child) -> List[Sample]:
+        raise NotImplementedError()
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for labelvalues, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            for suffix, extra_labels, value in self._child_samples(child):
+                samples.append((suffix, {**labels, **extra_labels}, value))
+        return samples
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def _child_samples(self, child: _Value) -> List[Sample]:
+        return [("_total", {}, child.value)]
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def _child_samples(self, child: _Value) -> List[Sample]:
+        return [("", {}, child.value)]
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # Non-cumulative counts, the last one is +Inf. They are made cumulative at scrape time
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def _child_samples(self, child: _HistogramValue) -> List[Sample]:
+        samples = []
+        cumulative = 0
+        counts = list(child.counts)
+        for upper_bound, count in zip(self.upper_bounds + (float("inf"), ), counts):
+            cumulative += count
+            le = "+Inf" if upper_bound == float("inf") else repr(upper_bound)
+            samples.append(("_bucket", {"le": le}, cumulative))
+        samples.append(("_sum", {}, child.sum))
+        samples.append(("_count", {}, cumulative))
+        return samples
+
+
+# Returns samples of a metric family that is computed at scrape time
+Collector = Callable[[], Union[List[Tuple[Metric, List[Sample]]], Awaitable[List[Tuple[Metric, List[Sample]]]]]]
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process and renders them in the Prometheus text format.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: Metric) -> Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Collector) -> None:
+        """
+        Registers a function that returns (metric, samples) pairs computed at scrape time,
+        e.g. the state of the connection pool. The function may be a coroutine function.
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    @staticmethod
+    def _render_family(lines: List[str], metric: Metric, samples: List[Sample]) -> None:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        for suffix, labels, value in samples:
+            lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {value}")
+
+    async def render(self) -> str:
+        families: Dict[str, Tuple[Metric, List[Sample]]] = {}
+        for metric in list(self._metrics.values()):
+            families[metric.name] = (metric, metric.samples())
+
+        for collector in self._collectors:
+            collected = collector()
+            if inspect.isawaitable(collected):
+                collected = await collected
+            for metric, samples in collected:
+                # Collected samples of a registered metric (e.g. pushed by another process) join its family
+                families.setdefault(metric.name, (metric, []))[1].extend(samples)
+
+        lines = []
+        for metric, samples in families.values():
+            self._render_family(lines, metric, samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# External services
+external_call_duration = registry.histogram(
+    "external_call_duration_seconds", "Duration of calls to external services.",
+    labelnames=("service", "operation"),
+)
+external_call_errors = registry.counter(
+    "external_call_errors", "Failed calls to external services.",
+    labelnames=("service", "operation"),
+)
+
+# Auto replies, recorded by the Celery workers
+auto_replies_skipped = registry.counter(
+    "auto_replies_skipped", "Scheduled auto replies dropped before the Gemini call, by why they were no longer due.",
+    labelnames=("reason", ),
+)
+auto_replies_merged = registry.counter(
+    "auto_replies_merged", "Comments answered by the auto reply to a later comment of the same burst.",
+)
+
+
+@contextmanager
+def track_external_call(service: str, operation: str) -> Iterator[None]:
+    """
+    Records the duration of the call to the external service and counts the call as failed
+    if an exception leaves the block.
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        external_call_errors.labels(service, operation).inc()
+        raise
+    finally:
+        external_call_duration.labels(service, operation).observe(time.perf_counter() - started_at)
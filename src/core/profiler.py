@@ -0,0 +1,139 @@
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+from typing import List, Optional
+
+# Roots of the collapsed stacks
+LOOP_BLOCKED = "loop-blocked"
+AWAITING_IO = "awaiting-io"
+LOOP_IDLE = "loop-idle"
+
+# Frames of the event loop itself, the loop waits for I/O when the innermost frame of its thread is one of them
+_LOOP_WAIT_FUNCTIONS = {"select", "run_forever", "run_until_complete", "run", "_run_once"}
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_loop_waiting(frame: FrameType) -> bool:
+    """
+    The stdlib loop waits in selectors.*.select, uvloop waits in C code below asyncio.run/run_until_complete.
+    """
+    filename = frame.f_code.co_filename
+    return (
+        frame.f_code.co_name in _LOOP_WAIT_FUNCTIONS
+        and (filename.endswith("selectors.py") or f"{os.sep}asyncio{os.sep}" in filename)
+    )
+
+
+def thread_stack(frame: Optional[FrameType]) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _task_stack(task: asyncio.Task) -> List[str]:
+    """
+    Follows the chain of awaited coroutines of the task, the last entry is what the task waits for.
+    """
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # A future or a finished coroutine
+            stack.append(type(awaitable).__name__)
+            break
+        stack.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return stack
+
+
+class StackSampler:
+    """
+    Statistical profiler of an event loop thread that uses only the standard library.
+
+    A background thread wakes up every interval and looks at the loop thread:
+    if the loop runs Python code, the stack of the thread is counted under "loop-blocked"
+    (CPU work or blocking calls such as bcrypt or serialization that stall every request);
+    if the loop waits for I/O, the await chains of the pending tasks are counted under "awaiting-io".
+    The result is in the collapsed stack format ("frame;frame;frame count"),
+    which flamegraph.pl, speedscope and similar tools read.
+
+    Code that holds the GIL without releasing it delays the samples, so such code is under-represented.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int, interval: float = 0.01,
+                 ignored_task: Optional[asyncio.Task] = None):
+        """
+        :param loop: The loop to profile.
+        :param loop_thread_id: Identifier of the thread that runs the loop.
+        :param interval: Time between the samples (in seconds).
+        :param ignored_task: Task left out of the samples, e.g. the one waiting for the profile.
+        """
+        self._loop = loop
+        self._loop_thread_id = loop_thread_id
+        self._interval = interval
+        self._ignored_task = ignored_task
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.sample()
+
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        self.samples += 1
+
+        if not _is_loop_waiting(frame):
+            self._stacks[";".join([LOOP_BLOCKED] + thread_stack(frame))] += 1
+            return
+
+        tasks = [task for task in asyncio.all_tasks(self._loop) if task is not self._ignored_task]
+        if not tasks:
+            self._stacks[LOOP_IDLE] += 1
+        for task in tasks:
+            self._stacks[";".join([AWAITING_IO] + _task_stack(task))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+async def profile_event_loop(seconds: float, interval: float = 0.01) -> StackSampler:
+    """
+    Samples the running event loop for the given time.
+
+    :param seconds: How long to sample.
+    :param interval: Time between the samples (in seconds).
+    :return: The stopped sampler, see StackSampler.collapsed.
+    """
+    sampler = StackSampler(
+        asyncio.get_running_loop(), threading.get_ident(), interval, ignored_task=asyncio.current_task(),
+    )
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+    return sampler
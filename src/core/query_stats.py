@@ -0,0 +1,78 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Tuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    """
+    Number of SQL statements, time spent in the database and rows fetched.
+    """
+    __slots__ = ("queries", "duration", "rows", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0  # In seconds
+        self.rows = 0
+        self.statements = Counter()
+
+    def most_repeated_statement(self) -> Optional[Tuple[str, int]]:
+        """
+        Returns the statement executed the most times and how many times it was executed.
+        The same statement executed many times within a request is usually an N+1 query.
+        """
+        if not self.statements:
+            return None
+        return self.statements.most_common(1)[0]
+
+
+# Stats of every active collection, e.g. the request and the test around it
+active_query_stats: ContextVar[Tuple[QueryStats, ...]] = ContextVar("active_query_stats", default=())
+
+
+@contextmanager
+def collect_query_stats() -> Iterator[QueryStats]:
+    """
+    Collects stats of the SQL statements executed within the block in the current context.
+    """
+    stats = QueryStats()
+    token = active_query_stats.set(active_query_stats.get() + (stats, ))
+    try:
+        yield stats
+    finally:
+        active_query_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if active_query_stats.get():
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collections = active_query_stats.get()
+    started = conn.info.get("query_started_at")
+    if not collections or not started:
+        return
+
+    started_at = started.pop()
+    duration = time.perf_counter() - started_at
+    rows = cursor.rowcount if cursor.description is not None and cursor.rowcount > 0 else 0
+
+    for stats in collections:
+        stats.queries += 1
+        stats.duration += duration
+        stats.rows += rows
+        stats.statements[statement] += 1
+
+
+def install_query_listeners() -> None:
+    """
+    Registers the listeners on all engines, the stats are collected only inside collect_query_stats().
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
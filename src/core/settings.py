@@ -1,7 +1,49 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     psql_connection_string: str
+    # Read replicas, JSON list of connection strings. Reads stay on the primary when it's empty
+    psql_replica_connection_strings: List[str] = []
+    # How long the client keeps reading from the primary after its last write (in seconds)
+    read_your_writes_seconds: int = 5
+    sql_echo: bool = False # Log every SQL statement
+    # Max number of SQL statements per request, exceeding it is logged as a warning
+    query_budget: Optional[int] = None
+    query_budget_strict: bool = False # Fail the request instead of logging, meant for tests
+    n_plus_one_threshold: int = 5 # How many times the same statement may run per request before a warning
+    metrics_enabled: bool = True # Expose Prometheus metrics on /metrics
+    # Warn about code that blocks the event loop longer than the threshold (in seconds), 0 turns it off
+    loop_lag_threshold_seconds: float = 0.1
+    profiler_enabled: bool = False # Allow admins to profile the event loop of a worker
+    admin_emails: List[str] = [] # Users allowed to use the debug endpoints, JSON list
+    # Results of the user lookup are cached per query in every process, 0 turns the cache off
+    user_search_cache_size: int = 1024
+    user_search_cache_ttl_seconds: float = 30
+    stateless_auth: bool = False # Trust the id and the token version of access tokens instead of loading the user
+    token_version_cache_size: int = 10000 # Token versions cached per process in the stateless mode
+    token_version_cache_ttl_seconds: float = 30 # How long other processes accept tokens revoked by a password change
+    # Posts with at least this many comments are hidden at once and purged by a Celery task
+    post_purge_threshold: int = 5000
+    purge_chunk_size: int = 1000 # Comments deleted per transaction by the purge
+    # Redis shared by the processes for the post cache and its invalidations, the cache stays in the process without it
+    cache_redis_url: Optional[str] = None
+    post_cache_size: int = 10000 # Post details cached in every process, 0 leaves only the Redis tier
+    post_cache_ttl_seconds: int = 60 # Lifetime of cached post details, it bounds the staleness after a missed invalidation
+    post_cache_lock_seconds: float = 0 # One process of the cluster loads a missed post while the others wait up to this long, 0 turns it off
+    # Celery tasks the broker didn't take in time are kept here and sent again, a volume keeps them over restarts
+    task_spill_dir: str = "/tmp/task-spill"
+    task_enqueue_timeout_seconds: float = 5 # How long a batch of tasks may take to reach the broker before it's spilled
+    task_enqueue_batch_size: int = 100 # Tasks sent to the broker at once
+    # Comments of a user in a thread less than this apart (in seconds) get one auto reply, to the last of them
+    auto_reply_burst_seconds: int = 120
+    auto_reply_post_tokens: int = 1000 # Tokens of the post in an auto reply prompt, longer posts are cut
+    auto_reply_prompt_max_tokens: int = 2000 # Tokens of an auto reply prompt, the oldest comments of a burst are left out past it
+    prompt_context_cache_size: int = 1000 # Condensed posts of the auto reply prompts cached in every worker without Redis
+    prompt_context_cache_ttl_seconds: int = 3600 # Lifetime of a condensed post, an update of the post drops it earlier
+    outbox_relay_batch_size: int = 500 # Outbox messages published per transaction by the relay
+    outbox_retention_seconds: int = 86400 # How long sent outbox messages are kept
     secret_key: str # Secret key for JWT tokens
     sightengine_api_user: str # For Content moderation
     sightengine_api_secret: str # # For Content moderation
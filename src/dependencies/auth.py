@@ -1,8 +1,10 @@
 from dependency_injector.wiring import Provide, inject
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from src.core.containers import Container
+from src.core.settings import settings
+from src.dto.user import PrincipalDTO
 from src.models.user import User
 from src.services.auth.abstract import AbstractAuthService
 
@@ -16,3 +18,23 @@ async def get_current_user(
         token: str = Depends(oauth2_scheme),
         auth_service: AbstractAuthService = Depends(Provide[Container.auth_service])) -> User:
     return await auth_service.get_user_from_token(token)
+
+
+@inject
+async def get_current_principal(
+        token: str = Depends(oauth2_scheme),
+        auth_service: AbstractAuthService = Depends(Provide[Container.auth_service])) -> PrincipalDTO:
+    """
+    Identity of the current user for the handlers that don't need the user's fields,
+    with stateless_auth it's authenticated without loading the user.
+    """
+    return await auth_service.get_principal_from_token(token)
+
+
+async def get_current_admin(user: User = Depends(get_current_user)) -> User:
+    if user.email not in settings.admin_emails:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return user
@@ -1,17 +1,52 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
 from src.core.configs.content_moderator_config import ContentModeratorConfig
 from src.core.database import get_session
 from src.core.settings import settings
 from src.repositories.comment.implementation import CommentRepositoryImplementation
 from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
 from src.repositories.post.implementation import PostRepositoryImplementation
 from src.repositories.unit_of_work.implementation import UnitOfWork
 from src.repositories.user.implementation import UserRepositoryImplementation
 from src.services.comment.implementation import CommentServiceImplementation
 from src.utils.content_moderator.implementation import ContentModerator
+from src.utils.post.post_cache import PostCacheEntry
+from src.utils.post.prompt_context import PromptContext, make_prompt_context_cache
 from src.utils.reply_generator.implementation import ReplyGenerator
+from src.utils.tiered_cache import TieredCache
+
+# Condensed posts of the auto replies of the worker process when there's no Redis to share them
+local_prompt_context_cache = make_prompt_context_cache(
+    None, settings.prompt_context_cache_size, settings.prompt_context_cache_ttl_seconds,
+)
+
+
+@asynccontextmanager
+async def task_prompt_context_cache() -> AsyncIterator[TieredCache[PromptContext]]:
+    """
+    Condensed posts of the auto reply of a Celery task. With Redis they're shared by the workers and dropped
+    by update_post in the API, the client is created and closed with the task, see task_post_cache.
+    Without Redis they stay in the worker process, which no invalidation reaches,
+    there a cached post of an older version is condensed again.
+    """
+    if not settings.cache_redis_url:
+        yield local_prompt_context_cache
+        return
+
+    prompt_context_cache = make_prompt_context_cache(
+        settings.cache_redis_url, settings.prompt_context_cache_size, settings.prompt_context_cache_ttl_seconds,
+    )
+    try:
+        yield prompt_context_cache
+    finally:
+        await prompt_context_cache.close()
 
 
-async def get_comment_service() -> CommentServiceImplementation:
+async def get_comment_service(
+        post_cache: Optional[TieredCache[PostCacheEntry]] = None,
+        prompt_context_cache: Optional[TieredCache[PromptContext]] = None) -> CommentServiceImplementation:
     async for session in get_session():  # Use async for to retrieve the session
         content_moderator_config = ContentModeratorConfig(
             api_user=settings.sightengine_api_user,
@@ -26,6 +61,7 @@ async def get_comment_service() -> CommentServiceImplementation:
         post_repository = PostRepositoryImplementation(session=session)
         comment_repository = CommentRepositoryImplementation(session=session)
         like_repository = LikeRepositoryImplementation(session=session)
+        outbox_repository = OutboxRepositoryImplementation(session=session)
 
         # Create the Unit of Work
         unit_of_work = UnitOfWork(
@@ -34,6 +70,7 @@ async def get_comment_service() -> CommentServiceImplementation:
             post_repository=post_repository,
             comment_repository=comment_repository,
             like_repository=like_repository,
+            outbox_repository=outbox_repository,
         )
 
         # Create and return the comment service
@@ -41,4 +78,6 @@ async def get_comment_service() -> CommentServiceImplementation:
             uow=unit_of_work,
             content_moderator=content_moderator,
             reply_generator=reply_generator,
+            post_cache=post_cache,
+            prompt_context_cache=prompt_context_cache,
         )
\ No newline at end of file
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from src.core.database import get_session
+from src.core.settings import settings
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
+from src.repositories.post.implementation import PostRepositoryImplementation
+from src.repositories.unit_of_work.implementation import UnitOfWork
+from src.repositories.user.implementation import UserRepositoryImplementation
+from src.services.outbox.implementation import OutboxServiceImplementation
+
+
+async def get_outbox_service() -> OutboxServiceImplementation:
+    async for session in get_session():
+        unit_of_work = UnitOfWork(
+            session=session,
+            user_repository=UserRepositoryImplementation(session=session),
+            post_repository=PostRepositoryImplementation(session=session),
+            comment_repository=CommentRepositoryImplementation(session=session),
+            like_repository=LikeRepositoryImplementation(session=session),
+            outbox_repository=OutboxRepositoryImplementation(session=session),
+        )
+
+        return OutboxServiceImplementation(
+            uow=unit_of_work,
+            batch_size=settings.outbox_relay_batch_size,
+            retention=timedelta(seconds=settings.outbox_retention_seconds),
+            publish_timeout=settings.task_enqueue_timeout_seconds,
+        )
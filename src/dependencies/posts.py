@@ -0,0 +1,49 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from src.core.configs.content_moderator_config import ContentModeratorConfig
+from src.core.database import get_session
+from src.core.settings import settings
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
+from src.repositories.post.implementation import PostRepositoryImplementation
+from src.repositories.unit_of_work.implementation import UnitOfWork
+from src.repositories.user.implementation import UserRepositoryImplementation
+from src.services.post.implementation import PostServiceImplementation
+from src.utils.content_moderator.implementation import ContentModerator
+from src.utils.post.post_cache import PostCacheEntry, make_post_cache
+from src.utils.tiered_cache import TieredCache
+
+
+@asynccontextmanager
+async def task_post_cache() -> AsyncIterator[TieredCache[PostCacheEntry]]:
+    """
+    Post cache of a Celery task, its services only invalidate the posts they change. Every task runs in its own
+    event loop, which a Redis client can't be shared across, so the client is created and closed with the task.
+    """
+    post_cache = make_post_cache(settings.cache_redis_url, size=settings.post_cache_size,
+                                 ttl=settings.post_cache_ttl_seconds)
+    try:
+        yield post_cache
+    finally:
+        await post_cache.close()
+
+
+async def get_post_service(post_cache: Optional[TieredCache[PostCacheEntry]] = None) -> PostServiceImplementation:
+    async for session in get_session():
+        content_moderator = ContentModerator(config=ContentModeratorConfig(
+            api_user=settings.sightengine_api_user,
+            api_secret=settings.sightengine_api_secret,
+        ))
+
+        unit_of_work = UnitOfWork(
+            session=session,
+            user_repository=UserRepositoryImplementation(session=session),
+            post_repository=PostRepositoryImplementation(session=session),
+            comment_repository=CommentRepositoryImplementation(session=session),
+            like_repository=LikeRepositoryImplementation(session=session),
+            outbox_repository=OutboxRepositoryImplementation(session=session),
+        )
+
+        return PostServiceImplementation(uow=unit_of_work, content_moderator=content_moderator, post_cache=post_cache)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional, List
+
+
+class CommentDTO:
+    """
+    Read-only projection of the comment row.
+    The order of the constructor arguments matches the order of the columns selected by the comment repository.
+    """
+    __slots__ = (
+        "id", "content", "likes_count", "post_id", "owner_id", "parent_id",
+        "reply_count", "blocked", "blocked_at", "created_at", "updated_at",
+    )
+
+    def __init__(self, id: int, content: str, likes_count: int, post_id: int, owner_id: int,
+                 parent_id: Optional[int], reply_count: int, blocked: bool, blocked_at: Optional[datetime],
+                 created_at: datetime, updated_at: datetime):
+        self.id = id
+        self.content = content
+        self.likes_count = likes_count
+        self.post_id = post_id
+        self.owner_id = owner_id
+        self.parent_id = parent_id
+        self.reply_count = reply_count
+        self.blocked = blocked
+        self.blocked_at = blocked_at
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class CommentWithRepliesDTO:
+    """
+    The comment with its non-blocked replies.
+    """
+    __slots__ = ("comment", "replies")
+
+    def __init__(self, comment: CommentDTO, replies: List[CommentDTO]):
+        self.comment = comment
+        self.replies = replies
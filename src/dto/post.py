@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional
+
+
+class AuthorDTO:
+    """
+    Read-only projection of the post's author.
+    """
+    __slots__ = ("first_name", "last_name")
+
+    def __init__(self, first_name: str, last_name: str):
+        self.first_name = first_name
+        self.last_name = last_name
+
+
+class PostDTO:
+    """
+    Read-only projection of the post row.
+    The order of the constructor arguments matches the order of the columns selected by the post repository.
+    """
+    __slots__ = (
+        "id", "title", "content", "draft", "auto_reply",
+        "author_id", "reply_after", "comment_count", "created_at", "updated_at",
+    )
+
+    def __init__(self, id: int, title: str, content: str, draft: bool, auto_reply: bool,
+                 author_id: int, reply_after: Optional[int], comment_count: int,
+                 created_at: datetime, updated_at: datetime):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.draft = draft
+        self.auto_reply = auto_reply
+        self.author_id = author_id
+        self.reply_after = reply_after
+        self.comment_count = comment_count
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+
+class PostWithAuthorDTO(PostDTO):
+    """
+    Read-only projection of the post row joined with its author.
+    """
+    __slots__ = ("author",)
+
+    def __init__(self, *post_columns, author: AuthorDTO):
+        super().__init__(*post_columns)
+        self.author = author
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional, Sequence
+
+
+class PostSearchHitDTO:
+    """
+    Post found by the full-text search, the snippet is a fragment of the content with the matches highlighted.
+    """
+    __slots__ = ("id", "title", "author_id", "created_at", "rank", "snippet")
+
+    def __init__(self, id: int, title: str, author_id: int, created_at: datetime, rank: float, snippet: str):
+        self.id = id
+        self.title = title
+        self.author_id = author_id
+        self.created_at = created_at
+        self.rank = rank
+        self.snippet = snippet
+
+
+class CommentSearchHitDTO:
+    """
+    Comment found by the full-text search, see PostSearchHitDTO.
+    """
+    __slots__ = ("id", "post_id", "owner_id", "parent_id", "created_at", "rank", "snippet")
+
+    def __init__(self, id: int, post_id: int, owner_id: int, parent_id: Optional[int], created_at: datetime,
+                 rank: float, snippet: str):
+        self.id = id
+        self.post_id = post_id
+        self.owner_id = owner_id
+        self.parent_id = parent_id
+        self.created_at = created_at
+        self.rank = rank
+        self.snippet = snippet
+
+
+class SearchPageDTO:
+    """
+    One page of search results, next_cursor is None on the last page.
+    """
+    __slots__ = ("items", "next_cursor")
+
+    def __init__(self, items: Sequence, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
@@ -0,0 +1,20 @@
+class UserSearchHitDTO:
+    """
+    User found by the user lookup, only the fields needed to mention the user.
+    """
+    __slots__ = ("id", "first_name", "last_name")
+
+    def __init__(self, id: int, first_name: str, last_name: str):
+        self.id = id
+        self.first_name = first_name
+        self.last_name = last_name
+
+
+class PrincipalDTO:
+    """
+    Identity of the authenticated user, for the handlers that need only the id of the user.
+    """
+    __slots__ = ("id", )
+
+    def __init__(self, id: int):
+        self.id = id
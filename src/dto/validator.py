@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+
+
+class ValidatorDTO:
+    """
+    Freshness of a response: the time of the last change of its rows and the state of their counters.
+    It's read with aggregates instead of the rows, so checking a cached copy is cheap.
+    last_modified is None when it doesn't cover every change, e.g. of rows whose counters change without updated_at.
+    """
+    __slots__ = ("last_modified", "state")
+
+    def __init__(self, last_modified: Optional[datetime], state: tuple):
+        self.last_modified = last_modified
+        self.state = state
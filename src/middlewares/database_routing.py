@@ -0,0 +1,57 @@
+import time
+from http.cookies import SimpleCookie
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.core.database import RoutingState, routing_state
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+STICKY_COOKIE_NAME = "db_primary_until"
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Lets the database session send reads of safe (GET, HEAD, OPTIONS) requests to the read replicas.
+
+    Once a request has written to the primary, the response sets a cookie which keeps the
+    client's reads on the primary for a few seconds, so it reads its own writes despite replication lag.
+    """
+    def __init__(self, app: ASGIApp, sticky_seconds: int):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    def _is_sticky(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                cookie = SimpleCookie(value.decode("latin-1"))
+                morsel = cookie.get(STICKY_COOKIE_NAME)
+                if morsel is not None:
+                    try:
+                        return float(morsel.value) > time.time()
+                    except ValueError:
+                        return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = RoutingState(use_replica=scope["method"] in SAFE_METHODS and not self._is_sticky(scope))
+        token = routing_state.set(state)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and state.wrote:
+                headers = MutableHeaders(scope=message)
+                primary_until = time.time() + self.sticky_seconds
+                headers.append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE_NAME}={primary_until:.3f}; Max-Age={self.sticky_seconds}; Path=/; HttpOnly",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            routing_state.reset(token)
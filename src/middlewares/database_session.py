@@ -0,0 +1,27 @@
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from src.core.database import SessionScope, session_scope
+
+
+class DatabaseSessionMiddleware:
+    """
+    Opens a session scope for every request, so the authentication and the services
+    of the request share one session and hold at most one connection at a time.
+    The session is closed when the request is finished.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_scope = SessionScope()
+        token = session_scope.set(request_scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session_scope.reset(token)
+            if request_scope.session is not None:
+                await request_scope.session.close()
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.core.loop_monitor import running_requests
+from src.core.metrics import registry
+
+http_requests = registry.counter(
+    "http_requests", "Finished HTTP requests.", labelnames=("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Duration of HTTP requests.", labelnames=("method", "route"),
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress", "HTTP requests being processed.", labelnames=("method", ),
+)
+
+
+class MetricsMiddleware:
+    """
+    Records the number, duration and status of HTTP requests per route.
+
+    The route label is the path template of the matched route (e.g. /api/v1/posts/{post_id}),
+    so the number of label values stays bounded. Requests that didn't match a route are labelled "unmatched".
+    The request is also registered for its task, so the loop lag monitor can tell which route blocked the loop.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        task = asyncio.current_task()
+        running_requests[task] = scope
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started_at
+            in_progress.dec()
+            running_requests.pop(task, None)
+
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration.labels(method, route).observe(duration)
+            # The response wasn't started when the app raised, the server answers with 500
+            http_requests.labels(method, route, str(status_code or 500)).inc()
@@ -0,0 +1,82 @@
+import logging
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from src.core.exceptions.database import QueryBudgetExceeded
+from src.core.query_stats import collect_query_stats, QueryStats
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStatsMiddleware:
+    """
+    Counts SQL statements, database time and fetched rows of every request.
+
+    The numbers are sent in the Server-Timing header and logged when the request is finished.
+    Requests that issue more statements than the budget, or repeat the same statement
+    at least n_plus_one_threshold times, are logged as warnings.
+    In strict mode exceeding the budget raises QueryBudgetExceeded, which is meant for tests.
+    """
+    def __init__(self, app: ASGIApp, budget: Optional[int] = None, strict: bool = False,
+                 n_plus_one_threshold: int = 5):
+        self.app = app
+        self.budget = budget
+        self.strict = strict
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    @staticmethod
+    def _server_timing(stats: QueryStats) -> str:
+        return f'db;dur={stats.duration * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows"'
+
+    def _report(self, scope: Scope, stats: QueryStats, status_code: Optional[int]) -> None:
+        route = scope.get("route")
+        log_data = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status_code": status_code,
+            "db_queries": stats.queries,
+            "db_duration_ms": round(stats.duration * 1000, 2),
+            "db_rows": stats.rows,
+        }
+        logger.info("Database usage of %s %s", scope["method"], scope["path"], extra=log_data)
+
+        most_repeated = stats.most_repeated_statement()
+        if most_repeated is not None and most_repeated[1] >= self.n_plus_one_threshold:
+            statement, count = most_repeated
+            logger.warning(
+                "Possible N+1 query in %s %s: the same statement was executed %d times",
+                scope["method"], scope["path"], count,
+                extra={**log_data, "repeated_statement": statement, "repeated_count": count},
+            )
+
+        if self.budget is not None and stats.queries > self.budget:
+            logger.warning(
+                "Query budget exceeded in %s %s: %d queries, budget is %d",
+                scope["method"], scope["path"], stats.queries, self.budget,
+                extra=log_data,
+            )
+            if self.strict:
+                raise QueryBudgetExceeded(self.budget, stats.queries, scope["path"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+
+        with collect_query_stats() as stats:
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("server-timing", self._server_timing(stats))
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        self._report(scope, stats, status_code)
@@ -0,0 +1,43 @@
+"""
+Applies the schema migrations, run it before the app starts:
+
+    python -m src.migrations upgrade
+    python -m src.migrations status
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from typing import List
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.core.settings import settings
+from src.migrations.runner import upgrade, applied_revisions, load_migrations
+
+
+async def main(command: str) -> None:
+    engine = create_async_engine(settings.psql_connection_string, poolclass=NullPool)
+    try:
+        if command == "upgrade":
+            applied = await upgrade(engine)
+            print(f"Applied {', '.join(applied)}" if applied else "The database is up to date")
+        else:
+            done = await applied_revisions(engine)
+            for migration in load_migrations():
+                state = "applied" if migration.revision in done else "pending"
+                print(f"{migration.revision:<32}{state:<10}{migration.description.splitlines()[0]}")
+    finally:
+        await engine.dispose()
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("upgrade", "status"))
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parse_args(sys.argv[1:]).command))
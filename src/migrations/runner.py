@@ -0,0 +1,127 @@
+import importlib
+import logging
+import pkgutil
+from types import ModuleType
+from typing import List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_PACKAGE = "src.migrations.versions"
+MIGRATIONS_TABLE = "schema_migrations"
+# Key of the advisory lock that keeps concurrent runs (e.g. several containers starting together) from racing
+MIGRATIONS_LOCK_KEY = 7_340_112
+
+
+class Migration:
+    """
+    A revision module of src.migrations.versions.
+
+    The module defines `upgrade(connection)`, and `transactional = False` when its statements can't run
+    in a transaction block (e.g. CREATE INDEX CONCURRENTLY). A non-transactional migration is recorded
+    after it finished, so its statements have to be safe to repeat when a run was interrupted.
+    """
+    __slots__ = ("revision", "description", "transactional", "module")
+
+    def __init__(self, module: ModuleType):
+        self.revision: str = module.__name__.rsplit(".", 1)[-1]
+        self.description: str = (module.__doc__ or "").strip()
+        self.transactional: bool = getattr(module, "transactional", True)
+        self.module = module
+
+    async def upgrade(self, connection: AsyncConnection) -> None:
+        await self.module.upgrade(connection)
+
+
+def load_migrations(package: str = VERSIONS_PACKAGE) -> List[Migration]:
+    """
+    Returns the migrations of the package ordered by revision, revisions are named `<number>_<name>`.
+    """
+    names = sorted(info.name for info in pkgutil.iter_modules(importlib.import_module(package).__path__))
+    return [Migration(importlib.import_module(f"{package}.{name}")) for name in names]
+
+
+async def _ensure_migrations_table(connection: AsyncConnection) -> None:
+    await connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "revision VARCHAR(128) PRIMARY KEY, "
+        "applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+    ))
+
+
+async def _record(connection: AsyncConnection, migration: Migration) -> None:
+    await connection.execute(
+        text(f"INSERT INTO {MIGRATIONS_TABLE} (revision) VALUES (:revision)"), {"revision": migration.revision},
+    )
+
+
+async def applied_revisions(engine: AsyncEngine) -> Set[str]:
+    async with engine.begin() as connection:
+        await _ensure_migrations_table(connection)
+        result = await connection.execute(text(f"SELECT revision FROM {MIGRATIONS_TABLE}"))
+        return set(result.scalars())
+
+
+async def upgrade(engine: AsyncEngine, migrations: List[Migration] = None) -> List[str]:
+    """
+    Applies the migrations that weren't applied yet, in order.
+
+    :return: Applied revisions.
+    """
+    migrations = load_migrations() if migrations is None else migrations
+    applied = []
+
+    # The lock is held by a connection outside any transaction, so it doesn't hold back concurrent index builds
+    async with engine.connect() as lock_connection:
+        await lock_connection.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        try:
+            done = await applied_revisions(engine)
+            for migration in migrations:
+                if migration.revision in done:
+                    continue
+
+                logger.info("Applying migration %s: %s", migration.revision, migration.description)
+                if migration.transactional:
+                    async with engine.begin() as connection:
+                        await migration.upgrade(connection)
+                        await _record(connection, migration)
+                else:
+                    async with engine.connect() as connection:
+                        await connection.execution_options(isolation_level="AUTOCOMMIT")
+                        await migration.upgrade(connection)
+                        await _record(connection, migration)
+                applied.append(migration.revision)
+        finally:
+            await lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+
+    return applied
+
+
+async def create_index_concurrently(connection: AsyncConnection, name: str, table: str, columns: str,
+                                    unique: bool = False, using: Optional[str] = None,
+                                    where: Optional[str] = None) -> None:
+    """
+    Builds an index without blocking writes to the table, the connection must be in autocommit mode.
+    An interrupted build leaves an invalid index behind, it's dropped and built again.
+
+    :param using: Index method, e.g. gin, btree by default.
+    :param where: Predicate of a partial index.
+    """
+    # The index is looked up in the schema of the table, which may not be the first one of search_path
+    valid = (await connection.execute(text(
+        "SELECT pg_index.indisvalid FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND pg_index.indrelid = to_regclass(:table)"
+    ), {"name": name, "table": table})).scalar()
+    if valid:
+        return
+    if valid is not None:
+        logger.warning("Index %s is invalid, building it again", name)
+        await connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    await connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name} ON {table} "
+        f"{f'USING {using} ' if using else ''}({columns}){f' WHERE {where}' if where else ''}"
+    ))
@@ -0,0 +1,86 @@
+"""
+Baseline, the tables created by create_all before migrations were introduced.
+The statements skip what exists, so databases created by create_all are adopted,
+older ones get the columns added since they were created. Only the adds that don't rewrite
+the table are here, the search vectors are added by 0006 and the indexes built by 0007.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL NOT NULL,
+        email VARCHAR(256),
+        first_name VARCHAR(128),
+        last_name VARCHAR(128),
+        password VARCHAR(256),
+        date_of_birth DATE,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS posts (
+        id SERIAL NOT NULL,
+        title VARCHAR(256) NOT NULL,
+        content VARCHAR NOT NULL,
+        draft BOOLEAN NOT NULL,
+        author_id INTEGER NOT NULL,
+        auto_reply BOOLEAN NOT NULL,
+        reply_after INTEGER,
+        comment_count INTEGER DEFAULT '0' NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        deleted_at TIMESTAMP WITH TIME ZONE,
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B')
+        ) STORED,
+        PRIMARY KEY (id),
+        FOREIGN KEY (author_id) REFERENCES users (id)
+    )
+    """,
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS comment_count INTEGER DEFAULT '0' NOT NULL",
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE",
+    """
+    CREATE TABLE IF NOT EXISTS comments (
+        id SERIAL NOT NULL,
+        content VARCHAR NOT NULL,
+        likes INTEGER NOT NULL,
+        post_id INTEGER NOT NULL,
+        owner_id INTEGER NOT NULL,
+        parent_id INTEGER,
+        path VARCHAR COLLATE "C" DEFAULT '/' NOT NULL,
+        reply_count INTEGER DEFAULT '0' NOT NULL,
+        blocked BOOLEAN NOT NULL,
+        blocked_at TIMESTAMP WITH TIME ZONE,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+        PRIMARY KEY (id),
+        FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE,
+        FOREIGN KEY (owner_id) REFERENCES users (id),
+        FOREIGN KEY (parent_id) REFERENCES comments (id) ON DELETE CASCADE
+    )
+    """,
+    # The paths of existing comments are backfilled by 0004_cascade_foreign_keys
+    """ALTER TABLE comments ADD COLUMN IF NOT EXISTS path VARCHAR COLLATE "C" DEFAULT '/' NOT NULL""",
+    "ALTER TABLE comments ADD COLUMN IF NOT EXISTS reply_count INTEGER DEFAULT '0' NOT NULL",
+    """
+    CREATE TABLE IF NOT EXISTS likes (
+        id SERIAL NOT NULL,
+        comment_id INTEGER NOT NULL,
+        owner_id INTEGER NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY (comment_id) REFERENCES comments (id) ON DELETE CASCADE,
+        FOREIGN KEY (owner_id) REFERENCES users (id)
+    )
+    """,
+)
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await connection.execute(text(statement))
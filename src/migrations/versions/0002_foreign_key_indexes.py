@@ -0,0 +1,23 @@
+"""
+Indexes of the foreign keys, used by the lookups of comments and likes and by the delete cascades.
+"""
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.migrations.runner import create_index_concurrently
+
+# CREATE INDEX CONCURRENTLY can't run in a transaction block
+transactional = False
+
+INDEXES = (
+    ("ix_comments_post_id", "comments", "post_id"),
+    ("ix_comments_parent_id", "comments", "parent_id"),
+    ("ix_comments_owner_id", "comments", "owner_id"),
+    ("ix_posts_author_id", "posts", "author_id"),
+    ("ix_likes_comment_id", "likes", "comment_id"),
+    ("ix_likes_owner_id", "likes", "owner_id"),
+)
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    for name, table, columns in INDEXES:
+        await create_index_concurrently(connection, name, table, columns)
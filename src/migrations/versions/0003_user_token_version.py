@@ -0,0 +1,12 @@
+"""
+Version of the user's tokens, bumped on password change to revoke the tokens issued before.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    # A constant default doesn't rewrite the table
+    await connection.execute(text(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER DEFAULT '0' NOT NULL"
+    ))
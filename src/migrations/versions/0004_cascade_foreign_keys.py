@@ -0,0 +1,66 @@
+"""
+Delete cascades of the foreign keys of comments and likes, and paths of the comments created before the paths.
+The baseline doesn't alter the tables create_all built before the cascades were added to the models.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# VALIDATE CONSTRAINT has to run after the constraint was committed to not block writes while it scans the table
+transactional = False
+
+FOREIGN_KEYS = (
+    ("comments", "post_id", "posts"),
+    ("comments", "parent_id", "comments"),
+    ("likes", "comment_id", "comments"),
+)
+
+BACKFILL_PATHS = """
+    WITH RECURSIVE tree (id, path) AS (
+        SELECT id, '/'::varchar COLLATE "C" FROM comments WHERE parent_id IS NULL
+        UNION ALL
+        SELECT comments.id, tree.path || lpad(comments.parent_id::text, 10, '0') || '/'
+        FROM comments JOIN tree ON comments.parent_id = tree.id
+    )
+    UPDATE comments SET path = tree.path FROM tree WHERE comments.id = tree.id AND comments.path <> tree.path
+"""
+
+
+async def cascade_foreign_key(connection: AsyncConnection, table: str, column: str, referred: str) -> None:
+    """
+    Replaces the foreign key of the column with one that cascades deletes, keeping its name.
+    The constraint is added NOT VALID and validated afterwards, which only takes a lock that lets writes through,
+    so an interrupted run is finished by the next one.
+    """
+    # The constraint is looked up in the schema of the table, which may not be the first one of search_path
+    constraint = (await connection.execute(text(
+        "SELECT conname, confdeltype::text, convalidated FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:table) AND contype = 'f' AND conkey = ARRAY[("
+        "SELECT attnum FROM pg_attribute WHERE attrelid = to_regclass(:table) AND attname = :column)]"
+    ), {"table": table, "column": column})).first()
+    name, on_delete, validated = constraint if constraint is not None else (f"{table}_{column}_fkey", None, False)
+
+    if on_delete != "c":
+        logger.info("Adding delete cascade to %s", name)
+        drop = f"DROP CONSTRAINT {name}, " if constraint is not None else ""
+        # Dropping and adding in one statement leaves no moment without the constraint
+        await connection.execute(text(
+            f"ALTER TABLE {table} {drop}ADD CONSTRAINT {name} "
+            f"FOREIGN KEY ({column}) REFERENCES {referred} (id) ON DELETE CASCADE NOT VALID"
+        ))
+    elif validated:
+        return
+
+    await connection.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"))
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    for table, column, referred in FOREIGN_KEYS:
+        await cascade_foreign_key(connection, table, column, referred)
+
+    # Comments are never moved, so only the rows left with the default path are updated
+    result = await connection.execute(text(BACKFILL_PATHS))
+    logger.info("Backfilled the paths of %d comments", result.rowcount)
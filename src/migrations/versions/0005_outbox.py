@@ -0,0 +1,26 @@
+"""
+Outbox of the Celery tasks, written in the transactions of the changes that ask for them and published by a relay.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id SERIAL NOT NULL,
+        task VARCHAR(128) NOT NULL,
+        args JSONB NOT NULL,
+        eta TIMESTAMP WITH TIME ZONE,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        sent_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    # The table is new, so the index is built before it has rows to block
+    "CREATE INDEX IF NOT EXISTS ix_outbox_unsent ON outbox (id) WHERE sent_at IS NULL",
+)
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await connection.execute(text(statement))
@@ -0,0 +1,25 @@
+"""
+Full-text search vectors of the posts and comments created before the search was added.
+Adding a stored generated column rewrites the whole table under an ACCESS EXCLUSIVE lock,
+which blocks reads and writes of the table until it's done, so run it in a maintenance window.
+A table that has the column already, e.g. created by the baseline, isn't touched.
+"""
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+STATEMENTS = (
+    """
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') || setweight(to_tsvector('english', content), 'B')
+    ) STORED
+    """,
+    """
+    ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+        GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+    """,
+)
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await connection.execute(text(statement))
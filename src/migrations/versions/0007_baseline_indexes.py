@@ -0,0 +1,46 @@
+"""
+Indexes of the baseline tables: the unique emails, the search vectors, the thread paths,
+and the trigram indexes of the user search when the server has pg_trgm.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.migrations.runner import create_index_concurrently
+
+logger = logging.getLogger(__name__)
+
+# CREATE INDEX CONCURRENTLY can't run in a transaction block
+transactional = False
+
+INDEXES = (
+    ("ix_users_email", "users", "email", {"unique": True}),
+    ("ix_posts_search_vector", "posts", "search_vector", {"using": "gin", "where": "NOT draft"}),
+    ("ix_posts_draft", "posts", "draft", {}),
+    ("ix_comments_search_vector", "comments", "search_vector", {"using": "gin", "where": "NOT blocked"}),
+    ("ix_comments_created_at", "comments", "created_at", {}),
+    ("ix_comments_path", "comments", "path", {}),
+)
+
+# Columns searched by the user lookup
+TRIGRAM_SEARCH_COLUMNS = ("first_name", "last_name", "email")
+
+
+async def upgrade(connection: AsyncConnection) -> None:
+    for name, table, columns, options in INDEXES:
+        await create_index_concurrently(connection, name, table, columns, **options)
+
+    # pg_trgm ships with the contrib package of Postgres, servers without it can't run the user search
+    available = (await connection.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    )).first() is not None
+    if not available:
+        logger.warning("The pg_trgm extension is not available, the user search indexes are not created")
+        return
+
+    await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for column in TRIGRAM_SEARCH_COLUMNS:
+        await create_index_concurrently(
+            connection, f"ix_users_{column}_trgm", "users", f"{column} gin_trgm_ops", using="gin",
+        )
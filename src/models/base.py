@@ -2,6 +2,9 @@ from sqlmodel import SQLModel, Field, Column, Integer
 
 from src.utils.str_utils import to_camel_case
 
+# Text search configuration of the search_vector columns and of the search queries
+TEXT_SEARCH_CONFIG = "english"
+
 
 class BaseModel(SQLModel):
     """Base SQL model class.
@@ -9,6 +12,9 @@ class BaseModel(SQLModel):
 
     id: int | None = Field(sa_column=Column("id", Integer, primary_key=True, autoincrement=True))
 
+    # Server-generated values are fetched via RETURNING in the same INSERT/UPDATE statement
+    __mapper_args__ = {"eager_defaults": True}
+
     class Config:
         alias_generator = to_camel_case
         allow_population_by_field_name = True
@@ -1,9 +1,11 @@
 from datetime import datetime, UTC
 from typing import Optional, List
 from pydantic import conint
+from sqlalchemy import Computed, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Column, Integer, String, Relationship, ForeignKey, BOOLEAN, TIMESTAMP
 
-from .base import BaseModel
+from .base import BaseModel, TEXT_SEARCH_CONFIG
 from .post import Post
 from .user import User
 
@@ -15,30 +17,55 @@ class Comment(BaseModel, table=True):
     content: str = Field(sa_column=Column("content", String, nullable=False))
 
     likes_count: conint(ge=0) = Field(sa_column=Column("likes", Integer, default=0, nullable=False))
-    likes: List["Like"] = Relationship(back_populates="comment", sa_relationship_kwargs={"cascade": "all, delete-orphan"})
+    # The database deletes the likes with the comment, see Like.comment_id
+    likes: List["Like"] = Relationship(
+        back_populates="comment",
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "passive_deletes": True},
+    )
 
     # Relationship to the Post model
-    post_id: int = Field(sa_column=Column("post_id", Integer, ForeignKey("posts.id"), nullable=False))
+    post_id: int = Field(
+        sa_column=Column("post_id", Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
+    )
     post: Optional[Post] = Relationship(back_populates="comments")
 
     # Owner of the comment (User)
-    owner_id: int = Field(sa_column=Column("owner_id", Integer, ForeignKey("users.id"), nullable=False))
+    owner_id: int = Field(sa_column=Column("owner_id", Integer, ForeignKey("users.id"), nullable=False, index=True))
     owner: User = Relationship(back_populates="comments")  # Back-populates 'comments' in User model
 
     # Reply functionality
-    parent_id: Optional[int] = Field(sa_column=Column("parent_id", Integer, ForeignKey("comments.id"), nullable=True))
+    # Replies are deleted by the database together with the parent, the indexes of the foreign keys
+    # keep the cascades from scanning the tables
+    parent_id: Optional[int] = Field(
+        default=None,
+        sa_column=Column("parent_id", Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True, index=True),
+    )
     replies: List["Comment"] = Relationship(
         back_populates="parent",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "passive_deletes": True}
     )
     parent: Optional["Comment"] = Relationship(
         back_populates="replies",
         sa_relationship_kwargs={"remote_side": "Comment.id"}
     )
 
+    # Materialized path: ids of the ancestors, "/0000000001/0000000005/" for a reply to a reply of comment 1.
+    # The "C" collation makes the paths compare byte-wise, so a subtree is a range of the path index
+    path: str = Field(
+        default="/",
+        sa_column=Column("path", String(collation="C"), default="/", server_default="/", nullable=False, index=True),
+    )
+
+    # Number of non-blocked direct replies, kept up to date by the comment service
+    reply_count: int = Field(
+        default=0,
+        sa_column=Column("reply_count", Integer, default=0, server_default="0", nullable=False),
+    )
+
     # Block functionality
     blocked: bool = Field(sa_column=Column("blocked", BOOLEAN, default=False, nullable=False))
     blocked_at: Optional[datetime] = Field(
+        default=None,
         sa_column=Column("blocked_at", TIMESTAMP(timezone=True), nullable=True),
         description="Timestamp when the comment was blocked."
     )
@@ -63,4 +90,16 @@ class Comment(BaseModel, table=True):
 
     def block_comment(self):
         self.blocked = True
-        self.blocked_at = datetime.now(UTC)
\ No newline at end of file
+        self.blocked_at = datetime.now(UTC)
+
+
+# Full-text search document of the comment, see post_search_vector
+comment_search_vector = Column(
+    "search_vector", TSVECTOR,
+    Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', content)", persisted=True),
+)
+Comment.__table__.append_column(comment_search_vector)
+# Blocked comments are never searched, so they are left out of the index
+Index(
+    "ix_comments_search_vector", comment_search_vector, postgresql_using="gin", postgresql_where=text("NOT blocked"),
+)
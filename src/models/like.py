@@ -17,11 +17,13 @@ class Like(BaseModel, table=True):
     id: int | None = Field(sa_column=Column("id", Integer, primary_key=True, autoincrement=True))
 
     # Relationship to the Comment model
-    comment_id: int = Field(sa_column=Column("comment_id", Integer, ForeignKey("comments.id"), nullable=False))
+    comment_id: int = Field(
+        sa_column=Column("comment_id", Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=False, index=True)
+    )
     comment: Optional[Comment] = Relationship(back_populates="likes")
 
     # Owner of the like (User)
-    owner_id: int = Field(sa_column=Column("owner_id", Integer, ForeignKey("users.id"), nullable=False))
+    owner_id: int = Field(sa_column=Column("owner_id", Integer, ForeignKey("users.id"), nullable=False, index=True))
     owner: Optional[User] = Relationship(back_populates="likes")
 
     # Timestamps
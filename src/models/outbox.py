@@ -0,0 +1,37 @@
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from sqlalchemy import Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, Column, Integer, String, TIMESTAMP
+
+from .base import BaseModel
+
+
+class OutboxMessage(BaseModel, table=True):
+    """
+    A Celery task call written in the same transaction as the change that asks for it, so the call is published
+    if and only if the change is committed. The outbox relay publishes the messages and marks them sent.
+    """
+    __tablename__ = 'outbox'
+
+    id: int | None = Field(sa_column=Column("id", Integer, primary_key=True, autoincrement=True))
+    task: str = Field(sa_column=Column("task", String(128), nullable=False))
+    args: List = Field(default=[], sa_column=Column("args", JSONB, nullable=False))
+    # When the task should run, it runs right away without it
+    eta: Optional[datetime] = Field(default=None, sa_column=Column("eta", TIMESTAMP(timezone=True), nullable=True))
+    created_at: datetime | None = Field(
+        sa_column=Column(
+            "created_at", TIMESTAMP(timezone=True),
+            default=lambda: datetime.now(UTC),
+            nullable=False
+        )
+    )
+    # Set by the relay once the task was published
+    sent_at: Optional[datetime] = Field(
+        default=None, sa_column=Column("sent_at", TIMESTAMP(timezone=True), nullable=True),
+    )
+
+
+# The relay reads the unsent messages in id order, the sent ones stay out of the index
+Index("ix_outbox_unsent", OutboxMessage.__table__.c.id, postgresql_where=text("sent_at IS NULL"))
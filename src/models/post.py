@@ -1,9 +1,11 @@
 from datetime import datetime, UTC
+from sqlalchemy import Computed, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Column, Integer, String, TIMESTAMP, Relationship, ForeignKey, BOOLEAN
 from typing import Optional, List
 
 from .user import User
-from .base import BaseModel
+from .base import BaseModel, TEXT_SEARCH_CONFIG
 
 class Post(BaseModel, table=True):
     __tablename__ = 'posts'
@@ -20,7 +22,7 @@ class Post(BaseModel, table=True):
     )
 
     # Relationship to the User model
-    author_id: int = Field(sa_column=Column("author_id", Integer, ForeignKey("users.id"), nullable=False))
+    author_id: int = Field(sa_column=Column("author_id", Integer, ForeignKey("users.id"), nullable=False, index=True))
     author: User = Relationship(back_populates="posts")
     # Auto-Reply feature
     auto_reply: bool = Field(
@@ -37,6 +39,11 @@ class Post(BaseModel, table=True):
         ),
         description="Time duration after which to auto-reply (in minutes)."
     )
+    # Number of non-blocked comments of the post (replies included), kept up to date by the comment service
+    comment_count: int = Field(
+        default=0,
+        sa_column=Column("comment_count", Integer, default=0, server_default="0", nullable=False),
+    )
     # Timestamps
     created_at: datetime | None = Field(
         sa_column=Column(
@@ -54,8 +61,30 @@ class Post(BaseModel, table=True):
         )
     )
 
-    # Relationship with Comment model
+    # Set when the post was deleted, but its comments are still being purged in the background.
+    # Such posts are hidden by the post repository and removed at the end of the purge
+    deleted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("deleted_at", TIMESTAMP(timezone=True), nullable=True),
+    )
+
+    # Relationship with Comment model, the database deletes the comments with the post
     comments: List["Comment"] = Relationship(
         back_populates="post",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "passive_deletes": True}
     )
+
+
+# Full-text search document of the post, the title weighs more than the content.
+# It's a column of the table only, not a field of the model, so the ORM never loads or writes it
+post_search_vector = Column(
+    "search_vector", TSVECTOR,
+    Computed(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', title), 'A') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', content), 'B')",
+        persisted=True,
+    ),
+)
+Post.__table__.append_column(post_search_vector)
+# Drafts are never searched, so they are left out of the index
+Index("ix_posts_search_vector", post_search_vector, postgresql_using="gin", postgresql_where=text("NOT draft"))
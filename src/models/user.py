@@ -2,7 +2,7 @@ from datetime import datetime, date, UTC
 from typing import List
 
 from pydantic import EmailStr
-from sqlmodel import Field, Column, String, Date, TIMESTAMP, Relationship
+from sqlmodel import Field, Column, String, Date, TIMESTAMP, Integer, Relationship
 
 from .base import BaseModel
 
@@ -14,6 +14,11 @@ class User(BaseModel, table=True):
     first_name: str = Field(sa_column=Column("first_name", String(128)))
     last_name: str = Field(sa_column=Column("last_name", String(128)))
     password: str = Field(sa_column=Column("password", String(256)))
+    # Carried by the tokens, bumping it revokes the tokens issued before
+    token_version: int = Field(
+        default=0,
+        sa_column=Column("token_version", Integer, default=0, server_default="0", nullable=False),
+    )
 
     date_of_birth: date | None = Field(sa_column=Column("date_of_birth", Date, nullable=True))
 
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Generic, Optional, TypeVar, List
+from typing import Generic, Optional, TypeVar, List, Sequence, Dict, Any
 from src.models.base import BaseModel
 
 
@@ -26,6 +26,7 @@ class AbstractGenericRepository(Generic[T], ABC):
         Gets a list of records
 
         :param filters: Filter conditions, several criteria are linked with a logical 'and'.
+                        A list, tuple or set value matches any of its items.
 
          Raises:
             ValueError: Invalid filter condition.
@@ -33,20 +34,24 @@ class AbstractGenericRepository(Generic[T], ABC):
         raise NotImplementedError()
 
     @abstractmethod
-    async def add(self, record: T) -> T:
+    async def add(self, record: T, refresh: bool = False) -> T:
         """
         Creates a new record.
+        Generated id and default values are populated from the INSERT statement itself.
 
         :param record: The record to be created.
+        :param refresh: Whether to reload the record from the database after the flush.
         """
         raise NotImplementedError()
 
     @abstractmethod
-    async def update(self, record: T) -> T:
+    async def update(self, record: T, refresh: bool = False) -> T:
         """
         Updates an existing record.
+        Onupdate values are populated from the UPDATE statement itself.
 
         :param record: The record to be updated incl. record id.
+        :param refresh: Whether to reload the record from the database after the flush.
         """
         raise NotImplementedError()
 
@@ -57,4 +62,44 @@ class AbstractGenericRepository(Generic[T], ABC):
 
         :param record: (int): Record id.
         """
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def add_many(self, records: Sequence[T]) -> List[int]:
+        """
+        Creates records in bulk with INSERT ... RETURNING, the rows are sent in as few statements as possible.
+        Foreign keys must be set as ids, relationships are not synchronized and
+        the records are not attached to the session.
+
+        :param records: The records to be created.
+        :return: Ids of the created records in the same order as the records.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def update_many(self, values: Dict[str, Any], **filters) -> List[int]:
+        """
+        Applies the same values to all records matching the filters with a single UPDATE ... RETURNING.
+
+        :param values: New column values keyed by attribute name.
+        :param filters: Filter conditions, the same as for list(). At least one is required.
+        :return: Ids of the updated records.
+
+         Raises:
+            ValueError: Invalid column name or no filter conditions.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def delete_where(self, **filters) -> List[int]:
+        """
+        Deletes all records matching the filters with a single DELETE ... RETURNING.
+        ORM cascades are not applied.
+
+        :param filters: Filter conditions, the same as for list(). At least one is required.
+        :return: Ids of the deleted records.
+
+         Raises:
+            ValueError: Invalid column name or no filter conditions.
+        """
+        raise NotImplementedError()
@@ -1,7 +1,8 @@
 from abc import ABC
-from typing import TypeVar, Type, Optional, List
+from typing import TypeVar, Type, Optional, List, Sequence, Dict, Any
 
-from sqlmodel import select, and_
+from sqlalchemy import inspect
+from sqlmodel import select, insert, update, delete, and_
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.models.base import BaseModel
@@ -39,6 +40,35 @@ class GenericRepositoryImplementation(AbstractGenericRepository[T], ABC):
         result = await self._session.exec(stmt)
         return result.first()
 
+    def _get_column(self, name: str):
+        """Returns the model attribute for the column name.
+
+        Raises:
+            ValueError: Invalid column name.
+        """
+        if not hasattr(self._model_cls, name):
+            raise ValueError(f"Invalid column name {name}")
+        return getattr(self._model_cls, name)
+
+    def _construct_where_clauses(self, **filters) -> list:
+        """Creates WHERE clauses from the filter conditions.
+        A list, tuple or set value is turned into an IN condition.
+
+        Raises:
+            ValueError: Invalid column name.
+
+        Returns:
+            list: WHERE clauses.
+        """
+        where_clauses = []
+        for c, v in filters.items():
+            column = self._get_column(c)
+            if isinstance(v, (list, tuple, set)):
+                where_clauses.append(column.in_(v))
+            else:
+                where_clauses.append(column == v)
+        return where_clauses
+
     def _construct_list_stmt(self, **filters):
         """Creates a SELECT query for retrieving a multiple records.
 
@@ -49,11 +79,7 @@ class GenericRepositoryImplementation(AbstractGenericRepository[T], ABC):
             SelectOfScalar: SELECT statment.
         """
         stmt = select(self._model_cls)
-        where_clauses = []
-        for c, v in filters.items():
-            if not hasattr(self._model_cls, c):
-                raise ValueError(f"Invalid column name {c}")
-            where_clauses.append(getattr(self._model_cls, c) == v)
+        where_clauses = self._construct_where_clauses(**filters)
 
         if len(where_clauses) == 1:
             stmt = stmt.where(where_clauses[0])
@@ -66,19 +92,78 @@ class GenericRepositoryImplementation(AbstractGenericRepository[T], ABC):
         result = await self._session.exec(stmt)
         return result.all()
 
-    async def add(self, record: T) -> T:
-        self._session.add(record)
-        await self._session.flush()
-        await self._session.refresh(record)
-        return record
+    async def _flush(self, record: T, refresh: bool) -> T:
+        """Flushes the record and, only if requested, reloads it with an extra SELECT.
+
+        Args:
+            record (T): Record to flush.
+            refresh (bool): Whether to reload the record after the flush.
 
-    async def update(self, record: T) -> T:
+        Returns:
+            T: The flushed record.
+        """
         self._session.add(record)
         await self._session.flush()
-        await self._session.refresh(record)
+        if refresh:
+            await self._session.refresh(record)
         return record
 
+    async def add(self, record: T, refresh: bool = False) -> T:
+        return await self._flush(record, refresh)
+
+    async def update(self, record: T, refresh: bool = False) -> T:
+        return await self._flush(record, refresh)
+
     async def delete(self, record: T) -> None:
         if record is not None:
             await self._session.delete(record)
             await self._session.flush()
+
+    def _record_to_row(self, record: T) -> Dict[str, Any]:
+        """Returns the column values which were set on the record, the primary key is left to the database.
+
+        Args:
+            record (T): Record to convert.
+
+        Returns:
+            Dict[str, Any]: Column values keyed by attribute name.
+        """
+        row = {}
+        for attribute in inspect(self._model_cls).column_attrs:
+            value = record.__dict__.get(attribute.key)
+            if value is not None and attribute.key != "id":
+                row[attribute.key] = value
+        return row
+
+    def _construct_filtered_stmt(self, stmt, **filters):
+        """Applies the filter conditions to the UPDATE or DELETE statement.
+
+        Raises:
+            ValueError: No filter conditions or invalid column name.
+        """
+        if not filters:
+            raise ValueError("At least one filter condition is required")
+
+        return stmt.where(*self._construct_where_clauses(**filters))
+
+    async def add_many(self, records: Sequence[T]) -> List[int]:
+        if not records:
+            return []
+
+        stmt = insert(self._model_cls).returning(self._model_cls.id, sort_by_parameter_order=True)
+        result = await self._session.exec(stmt, params=[self._record_to_row(record) for record in records])
+        return list(result.scalars())
+
+    async def update_many(self, values: Dict[str, Any], **filters) -> List[int]:
+        stmt = self._construct_filtered_stmt(update(self._model_cls), **filters)
+        stmt = (
+            stmt.values({self._get_column(c): v for c, v in values.items()})
+            .returning(self._model_cls.id)
+        )
+        result = await self._session.exec(stmt)
+        return list(result.scalars())
+
+    async def delete_where(self, **filters) -> List[int]:
+        stmt = self._construct_filtered_stmt(delete(self._model_cls), **filters)
+        result = await self._session.exec(stmt.returning(self._model_cls.id))
+        return list(result.scalars())
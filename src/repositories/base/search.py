@@ -0,0 +1,34 @@
+from typing import Tuple
+
+from sqlalchemy import func, tuple_, cast, REAL, Column
+from sqlalchemy.sql.elements import ColumnElement
+
+from src.models.base import TEXT_SEARCH_CONFIG
+
+# Options of ts_headline for the snippets, the matches are wrapped in <mark> tags.
+# The rest of the text is not escaped, clients have to escape it before rendering it as HTML
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2, FragmentDelimiter=\" … \""
+
+
+def to_tsquery(query: str) -> ColumnElement:
+    """
+    Parses the query like web search engines do: quoted phrases, "or" and "-" for negation are supported.
+    """
+    return func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, query)
+
+
+def rank(search_vector: Column, ts_query: ColumnElement) -> ColumnElement:
+    return func.ts_rank(search_vector, ts_query)
+
+
+def after_position(rank_expression: ColumnElement, id_column, after: Tuple[float, int]) -> ColumnElement:
+    """
+    Keyset condition for the results ordered by (rank DESC, id DESC).
+    ts_rank returns real, so the rank from the cursor is compared as real too.
+    """
+    after_rank, after_id = after
+    return tuple_(rank_expression, id_column) < tuple_(cast(after_rank, REAL), after_id)
+
+
+def headline(document, ts_query: ColumnElement) -> ColumnElement:
+    return func.ts_headline(TEXT_SEARCH_CONFIG, document, ts_query, HEADLINE_OPTIONS)
@@ -0,0 +1,13 @@
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def rows_digest(order_by, *columns) -> ColumnElement:
+    """
+    Aggregate hash of the state of every row, `md5(string_agg(id:counters:updated_at, ',' ORDER BY id))`.
+    Unlike sums and maxima, it changes when counters move between rows or a row is replaced by another,
+    and NULL when there are no rows.
+    """
+    row_state = func.concat_ws(":", *columns)
+    return func.md5(func.string_agg(row_state, aggregate_order_by(literal(","), order_by)))
@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Sequence, Optional, List
+from datetime import timedelta
+from typing import Sequence, Optional, List, Tuple
 
+from src.dto.comment import CommentDTO, CommentWithRepliesDTO
+from src.dto.search import CommentSearchHitDTO
+from src.dto.validator import ValidatorDTO
 from src.models.comment import Comment
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 from src.repositories.base.abstract import AbstractGenericRepository
 from src.schemes.comment.read import DailyCommentAnalyticItem
 from src.schemes.common import DateRange
@@ -10,16 +14,31 @@ from src.schemes.common import DateRange
 
 class AbstractCommentRepository(AbstractGenericRepository[Comment], ABC):
     @abstractmethod
-    async def get_top_level_comments(self, post_id: int) -> Sequence[Comment]:
+    async def get_top_level_comments(self, post_id: int) -> Sequence[CommentDTO]:
         """
         Returns only comments without parent_id (Comment that is not reply to another comment)
         """
         pass
 
     @abstractmethod
-    async def get_comment_details_and_replies(self, comment_id: int) -> Optional[Comment]:
+    async def get_comment_details_and_replies(self, comment_id: int) -> Optional[CommentWithRepliesDTO]:
         """
-        Returns the comment and its replies
+        Returns the comment and its non-blocked replies
+        """
+        pass
+
+    @abstractmethod
+    async def get_top_level_comments_validator(self, post_id: int) -> ValidatorDTO:
+        """
+        Returns the freshness of the non-blocked top level comments of the post without loading them.
+        """
+        pass
+
+    @abstractmethod
+    async def get_comment_validator(self, comment_id: int) -> Optional[ValidatorDTO]:
+        """
+        Returns the freshness of the comment and its non-blocked replies without loading them,
+        None when the comment doesn't exist or is blocked.
         """
         pass
 
@@ -31,10 +50,92 @@ class AbstractCommentRepository(AbstractGenericRepository[Comment], ABC):
     async def decrement_like_counter(self, record: Comment) -> Comment:
         pass
 
+    @abstractmethod
+    async def change_reply_counter(self, comment_id: int, delta: int) -> None:
+        """
+        Atomically adds delta to the reply counter of the comment.
+        """
+        pass
+
+    @abstractmethod
+    async def get_subtree(self, comment_id: int, max_depth: Optional[int] = None) -> Sequence[CommentDTO]:
+        """
+        Returns the non-blocked comments among the comment and all its replies,
+        every comment is followed by its replies.
+
+        :param max_depth: Depth of the deepest replies, 1 returns only the direct replies. All of them when it's None.
+        """
+        pass
+
+    @abstractmethod
+    async def count_visible_in_subtree(self, comment_id: int) -> int:
+        """
+        Returns the number of non-blocked comments among the comment and all its replies (at any depth).
+        """
+        pass
+
+    @abstractmethod
+    async def delete_subtree(self, comment_id: int) -> int:
+        """
+        Deletes the comment with all its replies and their likes in one statement.
+
+        :return: Number of deleted comments.
+        """
+        pass
+
+    @abstractmethod
+    async def count_post_comments(self, post_id: int, limit: int) -> int:
+        """
+        Counts the comments of the post, blocked ones included, but stops counting at limit.
+        """
+        pass
+
+    @abstractmethod
+    async def delete_post_comments_chunk(self, post_id: int, limit: int) -> int:
+        """
+        Deletes up to limit newest comments of the post together with their likes.
+
+        :return: Number of deleted comments, 0 when the post has no comments left.
+        """
+        pass
+
+    @abstractmethod
+    async def reconcile_counters(self) -> int:
+        """
+        Recomputes the comment counters of the posts and the reply counters of the comments
+        where they drifted from the comments table.
+
+        :return: Number of fixed rows.
+        """
+        pass
+
     @abstractmethod
     async def get_comment_with_post(self, comment_id: int) -> Optional[Comment]:
         pass
 
     @abstractmethod
-    async def daily_comment_analytic(self, date_range: DateRange, user: User) -> List[DailyCommentAnalyticItem]:
+    async def get_comments_around(self, comment: Comment, replier_id: int,
+                                  window: timedelta, limit: int) -> List[Tuple[Comment, bool]]:
+        """
+        Returns the non-blocked comments of the owner of the comment in the same thread, created within `limit`
+        windows before and after the comment, and whether the replier replied to them, ordered by creation time.
+        """
+        pass
+
+    @abstractmethod
+    async def daily_comment_analytic(self, date_range: DateRange,
+                                     user: PrincipalDTO) -> List[DailyCommentAnalyticItem]:
+        pass
+
+    @abstractmethod
+    async def search_comments(self, query: str, limit: int,
+                              after: Optional[Tuple[float, int]] = None) -> Sequence[CommentSearchHitDTO]:
+        """
+        Full-text search over non-blocked comments of published posts,
+        ordered by rank and id (both descending).
+
+        :param query: Search query in the web search syntax.
+        :param limit: Max number of hits.
+        :param after: (rank, id) of the last hit of the previous page.
+        """
         pass
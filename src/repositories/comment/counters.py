@@ -0,0 +1,42 @@
+"""
+Statements that recompute the denormalized comment counters from the comments table.
+Only rows whose counter drifted are written, so a run over consistent data is read-only.
+Counters aren't content, so updated_at keeps its value.
+"""
+from sqlalchemy import Update
+from sqlmodel import select, update, func, not_
+
+from src.models.comment import Comment
+from src.models.post import Post
+
+
+def post_comment_count_fix() -> Update:
+    counts = (
+        select(Comment.post_id, func.count().label("actual"))
+        .where(not_(Comment.blocked))
+        .group_by(Comment.post_id)
+        .subquery()
+    )
+    actual = func.coalesce(counts.c.actual, 0)
+    drifted = (
+        select(Post.id, actual.label("actual"))
+        .outerjoin(counts, counts.c.post_id == Post.id)
+        .where(Post.comment_count != actual)
+        .subquery()
+    )
+    return update(Post).where(Post.id == drifted.c.id).values(comment_count=drifted.c.actual, updated_at=Post.updated_at)
+
+
+def comment_reply_count_fix() -> Update:
+    replies = select(Comment.parent_id, func.count().label("actual")).where(
+        Comment.parent_id.is_not(None), not_(Comment.blocked),
+    ).group_by(Comment.parent_id).subquery()
+    parents = select(Comment.id, Comment.reply_count).subquery()
+    actual = func.coalesce(replies.c.actual, 0)
+    drifted = (
+        select(parents.c.id, actual.label("actual"))
+        .outerjoin(replies, replies.c.parent_id == parents.c.id)
+        .where(parents.c.reply_count != actual)
+        .subquery()
+    )
+    return update(Comment).where(Comment.id == drifted.c.id).values(reply_count=drifted.c.actual, updated_at=Comment.updated_at)
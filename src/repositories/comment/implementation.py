@@ -1,25 +1,56 @@
-from typing import Sequence, Optional, List
-from sqlalchemy.orm import joinedload
-from sqlmodel import select, case, func, cast, Date
+from datetime import timedelta
+from typing import Sequence, Optional, List, Tuple
+from sqlalchemy import String
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import select, update, delete, case, func, cast, Date, or_, and_, not_
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.models.comment import Comment
+from src.dto.comment import CommentDTO, CommentWithRepliesDTO
+from src.dto.search import CommentSearchHitDTO
+from src.dto.validator import ValidatorDTO
+from src.models.comment import Comment, comment_search_vector
 from src.repositories.base.implementation import GenericRepositoryImplementation
+from src.repositories.base.search import to_tsquery, rank, after_position, headline
+from src.repositories.base.validator import rows_digest
 from .abstract import AbstractCommentRepository
+from .counters import post_comment_count_fix, comment_reply_count_fix
 from src.models.post import Post
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 from src.schemes.common import DateRange
 from src.schemes.comment.read import DailyCommentAnalyticItem
+from src.utils.comment.comment_path import PATH_ID_WIDTH, PATH_SEGMENT_LENGTH
+
+# Columns selected on the read paths, the order must match the CommentDTO constructor
+COMMENT_COLUMNS = (
+    Comment.id, Comment.content, Comment.likes_count, Comment.post_id, Comment.owner_id,
+    Comment.parent_id, Comment.reply_count, Comment.blocked, Comment.blocked_at,
+    Comment.created_at, Comment.updated_at,
+)
+
+
+def _padded_id(id_column):
+    return func.lpad(cast(id_column, String), PATH_ID_WIDTH, "0")
+
+
+def _in_subtree(root):
+    """
+    Condition matching the root comment and all its replies at any depth.
+    The descendants are one range of the path index: paths starting with the path of the root extended
+    with its id, "0" is the character right after the "/" separator.
+    """
+    root_path = root.path + _padded_id(root.id)
+    return or_(Comment.id == root.id, and_(Comment.path >= root_path + "/", Comment.path < root_path + "0"))
 
 
 class CommentRepositoryImplementation(GenericRepositoryImplementation[Comment], AbstractCommentRepository):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session, Comment)
 
-    async def get_top_level_comments(self, post_id: int) -> Sequence[Comment]:
+    async def get_top_level_comments(self, post_id: int) -> Sequence[CommentDTO]:
         # Fetch top-level comments for the specified post
         stmt = (
-            select(Comment)
+            select(*COMMENT_COLUMNS)
             .where(Comment.post_id == post_id)
             .where(Comment.parent_id.is_(None))  # Only top-level comments
             .where(Comment.blocked == False)  # Filter out blocked comments
@@ -27,31 +58,156 @@ class CommentRepositoryImplementation(GenericRepositoryImplementation[Comment],
 
         # Execute the statement
         top_comments = await self._session.exec(stmt)
-        comments_list = top_comments.all()
 
-        return comments_list
+        return [CommentDTO(*row) for row in top_comments]
 
-    async def get_comment_details_and_replies(self, comment_id: int) -> Optional[Comment]:
+    async def get_comment_details_and_replies(self, comment_id: int) -> Optional[CommentWithRepliesDTO]:
+        # Fetch the comment and its direct replies in one round trip
         stmt = (
-            select(Comment)
-            .options(joinedload(Comment.replies))
-            .where(Comment.id == comment_id)
+            select(*COMMENT_COLUMNS)
+            .where(or_(Comment.id == comment_id, Comment.parent_id == comment_id))
             .where(Comment.blocked == False)
         )
 
-        comment_result = await self._session.exec(stmt)
+        result = await self._session.exec(stmt)
 
-        comment = comment_result.first()
+        comment = None
+        replies = []
+        for row in result:
+            if row.id == comment_id:
+                comment = CommentDTO(*row)
+            else:
+                replies.append(CommentDTO(*row))
 
-        return comment
+        if comment is None:
+            return None
+
+        return CommentWithRepliesDTO(comment=comment, replies=replies)
+
+    async def get_top_level_comments_validator(self, post_id: int) -> ValidatorDTO:
+        stmt = (
+            select(
+                func.count(),
+                rows_digest(Comment.id, Comment.id, Comment.likes_count, Comment.reply_count, Comment.updated_at),
+            )
+            .where(Comment.post_id == post_id, Comment.parent_id.is_(None), not_(Comment.blocked))
+        )
+
+        row = (await self._session.exec(stmt)).one()
+
+        # Counter changes keep updated_at, so the time of the last change doesn't tell whether the list changed
+        return ValidatorDTO(None, tuple(row))
+
+    async def get_comment_validator(self, comment_id: int) -> Optional[ValidatorDTO]:
+        # The same rows as get_comment_details_and_replies
+        stmt = (
+            select(
+                func.bool_or(Comment.id == comment_id), func.count(),
+                rows_digest(Comment.id, Comment.id, Comment.likes_count, Comment.reply_count, Comment.updated_at),
+            )
+            .where(or_(Comment.id == comment_id, Comment.parent_id == comment_id), not_(Comment.blocked))
+        )
+
+        row = (await self._session.exec(stmt)).one()
+        if not row[0]:
+            return None
+
+        return ValidatorDTO(None, tuple(row[1:]))
+
+    async def _change_like_counter(self, record: Comment, delta: int) -> Comment:
+        """
+        Atomically changes the like counter and reads the new value back with UPDATE ... RETURNING.
+        """
+        stmt = (
+            update(Comment)
+            .where(Comment.id == record.id)
+            .values({Comment.likes_count: Comment.likes_count + delta})
+            .returning(Comment.likes_count)
+        )
+
+        result = await self._session.exec(stmt)
+        # The new value is already in the database, so it must not mark the record as dirty
+        set_committed_value(record, "likes_count", result.scalar_one())
 
-    async def increment_like_counter(self, record: Comment) -> Comment:
-        record.likes_count = Comment.likes_count + 1
         return record
 
+    async def increment_like_counter(self, record: Comment) -> Comment:
+        return await self._change_like_counter(record, 1)
+
     async def decrement_like_counter(self, record: Comment) -> Comment:
-        record.likes_count = Comment.likes_count - 1
-        return record
+        return await self._change_like_counter(record, -1)
+
+    async def change_reply_counter(self, comment_id: int, delta: int) -> None:
+        # The counter isn't content, so updated_at keeps its value
+        stmt = (
+            update(Comment)
+            .where(Comment.id == comment_id)
+            .values({Comment.reply_count: Comment.reply_count + delta, Comment.updated_at: Comment.updated_at})
+        )
+        await self._session.exec(stmt)
+
+    async def get_subtree(self, comment_id: int, max_depth: Optional[int] = None) -> Sequence[CommentDTO]:
+        root = aliased(Comment)
+        stmt = (
+            select(*COMMENT_COLUMNS)
+            .join(root, root.id == comment_id)
+            .where(_in_subtree(root), not_(Comment.blocked))
+            # Every comment is followed by its replies, siblings are ordered by id
+            .order_by(Comment.path + _padded_id(Comment.id))
+        )
+        if max_depth is not None:
+            stmt = stmt.where(func.length(Comment.path) <= func.length(root.path) + max_depth * PATH_SEGMENT_LENGTH)
+
+        result = await self._session.exec(stmt)
+
+        return [CommentDTO(*row) for row in result]
+
+    async def count_visible_in_subtree(self, comment_id: int) -> int:
+        root = aliased(Comment)
+        stmt = (
+            select(func.count())
+            .select_from(Comment)
+            .join(root, root.id == comment_id)
+            .where(_in_subtree(root), not_(Comment.blocked))
+        )
+
+        result = await self._session.exec(stmt)
+        return result.one()
+
+    async def delete_subtree(self, comment_id: int) -> int:
+        # The likes are deleted by the foreign key cascade
+        root = aliased(Comment)
+        subtree_ids = select(Comment.id).join(root, root.id == comment_id).where(_in_subtree(root))
+
+        result = await self._session.exec(delete(Comment).where(Comment.id.in_(subtree_ids)))
+
+        return result.rowcount
+
+    async def count_post_comments(self, post_id: int, limit: int) -> int:
+        # The limit keeps a huge thread from being counted entirely, the index on post_id answers the rest
+        comments = select(Comment.id).where(Comment.post_id == post_id).limit(limit).subquery()
+        result = await self._session.exec(select(func.count()).select_from(comments))
+        return result.one()
+
+    async def delete_post_comments_chunk(self, post_id: int, limit: int) -> int:
+        # Replies have greater ids than their parents, so newest first the cascades never reach past the chunk
+        chunk_ids = (
+            select(Comment.id)
+            .where(Comment.post_id == post_id)
+            .order_by(Comment.id.desc())
+            .limit(limit)
+        )
+
+        result = await self._session.exec(delete(Comment).where(Comment.id.in_(chunk_ids)))
+
+        return result.rowcount
+
+    async def reconcile_counters(self) -> int:
+        fixed = 0
+        for stmt in (post_comment_count_fix(), comment_reply_count_fix()):
+            result = await self._session.exec(stmt)
+            fixed += result.rowcount
+        return fixed
 
     async def get_comment_with_post(self, comment_id: int) -> Optional[Comment]:
         # Define the query to get the comment along with its related post
@@ -75,7 +231,27 @@ class CommentRepositoryImplementation(GenericRepositoryImplementation[Comment],
 
         return comment
 
-    async def daily_comment_analytic(self, date_range: DateRange, user: User) -> List[DailyCommentAnalyticItem]:
+    async def get_comments_around(self, comment: Comment, replier_id: int,
+                                  window: timedelta, limit: int) -> List[Tuple[Comment, bool]]:
+        reply = aliased(Comment)
+        answered = select(reply.id).where(reply.parent_id == Comment.id, reply.owner_id == replier_id).exists()
+        stmt = (
+            select(Comment, answered)
+            .where(
+                Comment.post_id == comment.post_id,
+                Comment.owner_id == comment.owner_id,
+                Comment.parent_id.is_not_distinct_from(comment.parent_id),
+                not_(Comment.blocked),
+                Comment.created_at.between(comment.created_at - window * limit, comment.created_at + window * limit),
+            )
+            .order_by(Comment.created_at, Comment.id)
+        )
+
+        result = await self._session.exec(stmt)
+        return [(other, is_answered) for other, is_answered in result.all()]
+
+    async def daily_comment_analytic(self, date_range: DateRange,
+                                     user: PrincipalDTO) -> List[DailyCommentAnalyticItem]:
         # Query to get the count of comments and blocked comments per day
         query = (
             select(
@@ -108,3 +284,34 @@ class CommentRepositoryImplementation(GenericRepositoryImplementation[Comment],
         ]
 
         return response_data
+
+    async def search_comments(self, query: str, limit: int,
+                              after: Optional[Tuple[float, int]] = None) -> Sequence[CommentSearchHitDTO]:
+        ts_query = to_tsquery(query)
+        rank_expression = rank(comment_search_vector, ts_query)
+
+        # The partial GIN index covers only non-blocked comments, so the blocked condition must stay in this query
+        matches = (
+            select(Comment.id, rank_expression.label("rank"))
+            .join(Post, Post.id == Comment.post_id)
+            .where(not_(Comment.blocked), not_(Post.draft), comment_search_vector.op("@@")(ts_query))
+            .order_by(rank_expression.desc(), Comment.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            matches = matches.where(after_position(rank_expression, Comment.id, after))
+        page = matches.subquery()
+
+        # Snippets are built only for the rows of the page
+        stmt = (
+            select(
+                Comment.id, Comment.post_id, Comment.owner_id, Comment.parent_id, Comment.created_at, page.c.rank,
+                headline(Comment.content, ts_query),
+            )
+            .join(page, page.c.id == Comment.id)
+            .order_by(page.c.rank.desc(), Comment.id.desc())
+        )
+
+        result = await self._session.exec(stmt)
+
+        return [CommentSearchHitDTO(*row) for row in result]
@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List
+
+from src.models.outbox import OutboxMessage
+from src.repositories.base.abstract import AbstractGenericRepository
+
+
+class AbstractOutboxRepository(AbstractGenericRepository[OutboxMessage], ABC):
+
+    @abstractmethod
+    async def claim_unsent(self, limit: int) -> List[OutboxMessage]:
+        """
+        Returns the oldest unsent messages and locks them until the end of the transaction.
+        Messages locked by another transaction are skipped, so concurrent relays claim different messages.
+        """
+        pass
+
+    @abstractmethod
+    async def delete_sent_before(self, before: datetime) -> int:
+        """
+        Deletes the messages sent before the time.
+
+        :return: Number of deleted messages.
+        """
+        pass
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List
+
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.outbox import OutboxMessage
+from src.repositories.base.implementation import GenericRepositoryImplementation
+from .abstract import AbstractOutboxRepository
+
+
+class OutboxRepositoryImplementation(GenericRepositoryImplementation[OutboxMessage], AbstractOutboxRepository):
+    def __init__(self, session: AsyncSession) -> None:
+        super().__init__(session, OutboxMessage)
+
+    async def claim_unsent(self, limit: int) -> List[OutboxMessage]:
+        stmt = (
+            select(OutboxMessage)
+            .where(OutboxMessage.sent_at.is_(None))
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        result = await self._session.exec(stmt)
+        return list(result.all())
+
+    async def delete_sent_before(self, before: datetime) -> int:
+        stmt = delete(OutboxMessage).where(OutboxMessage.sent_at < before)
+
+        result = await self._session.exec(stmt)
+        return result.rowcount
@@ -1,17 +1,73 @@
 from abc import ABC, abstractmethod
-from typing import Sequence, Optional, Tuple
+from typing import Sequence, Optional, Tuple, List
 
+from src.dto.post import PostDTO, PostWithAuthorDTO
+from src.dto.search import PostSearchHitDTO
+from src.dto.validator import ValidatorDTO
 from src.models.post import Post
-from src.models.user import User
 from src.repositories.base.abstract import AbstractGenericRepository
 
 
 class AbstractPostRepository(AbstractGenericRepository[Post], ABC):
 
     @abstractmethod
-    async def get_posts_with_authors(self) -> Sequence[tuple[Post, User]]:
+    async def get_posts_by_author(self, author_id: int) -> Sequence[PostDTO]:
+        """
+        Returns all posts of the specific author.
+        Only the columns needed for the response are selected.
+        """
         pass
 
     @abstractmethod
-    async def get_post_by_id_with_related_objects(self, post_id: int) -> Optional[Tuple[Post, User]]:
-        pass
\ No newline at end of file
+    async def get_post_ids_by_author(self, author_id: int) -> List[int]:
+        pass
+
+    @abstractmethod
+    async def get_posts_with_authors(self) -> Sequence[PostWithAuthorDTO]:
+        pass
+
+    @abstractmethod
+    async def get_post_by_id_with_related_objects(self, post_id: int) -> Optional[PostWithAuthorDTO]:
+        pass
+
+    @abstractmethod
+    async def get_post_validator(self, post_id: int) -> Optional[ValidatorDTO]:
+        """
+        Returns the freshness of the post with its author without loading them, None when the post doesn't exist.
+        """
+        pass
+
+    @abstractmethod
+    async def get_posts_validator(self, author_id: Optional[int] = None) -> ValidatorDTO:
+        """
+        Returns the freshness of the list of published posts with their authors,
+        or of the list of the posts of the author when author_id is given.
+        """
+        pass
+
+    @abstractmethod
+    async def change_comment_counter(self, post_id: int, delta: int) -> None:
+        """
+        Atomically adds delta to the comment counter of the post.
+        """
+        pass
+
+    @abstractmethod
+    async def get_deleted_post_ids(self) -> List[int]:
+        """
+        Returns the ids of the deleted posts whose comments haven't been purged yet, the oldest deletions first.
+        """
+        pass
+
+    @abstractmethod
+    async def search_posts(self, query: str, limit: int,
+                           after: Optional[Tuple[float, int]] = None) -> Sequence[PostSearchHitDTO]:
+        """
+        Full-text search over the title and the content of published posts,
+        ordered by rank and id (both descending).
+
+        :param query: Search query in the web search syntax.
+        :param limit: Max number of hits.
+        :param after: (rank, id) of the last hit of the previous page.
+        """
+        pass
@@ -1,46 +1,160 @@
-from typing import Sequence, Tuple, Optional
+from typing import Sequence, Optional, Tuple, List
 
-from sqlmodel import select
+from sqlmodel import select, update, not_, func
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.dto.post import PostDTO, PostWithAuthorDTO, AuthorDTO
+from src.dto.search import PostSearchHitDTO
+from src.dto.validator import ValidatorDTO
 from src.repositories.base.implementation import GenericRepositoryImplementation
+from src.repositories.base.search import to_tsquery, rank, after_position, headline
+from src.repositories.base.validator import rows_digest
 from .abstract import AbstractPostRepository
-from src.models.post import Post
+from src.models.post import Post, post_search_vector
 from src.models.user import User
 
+# Columns selected on the read paths, the order must match the PostDTO constructor
+POST_COLUMNS = (
+    Post.id, Post.title, Post.content, Post.draft, Post.auto_reply,
+    Post.author_id, Post.reply_after, Post.comment_count, Post.created_at, Post.updated_at,
+)
+AUTHOR_COLUMNS = (User.first_name, User.last_name)
+
+
+def _post_with_author_from_row(row) -> PostWithAuthorDTO:
+    post_columns_count = len(POST_COLUMNS)
+    return PostWithAuthorDTO(
+        *row[:post_columns_count],
+        author=AuthorDTO(*row[post_columns_count:]),
+    )
+
 
 class PostRepositoryImplementation(GenericRepositoryImplementation[Post], AbstractPostRepository):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session, Post)
 
-    async def get_posts_with_authors(self) -> Sequence[tuple[Post, User]]:
+    def _construct_get_stmt(self, id: int):
+        # Deleted posts whose comments are being purged don't exist for the services
+        return super()._construct_get_stmt(id).where(Post.deleted_at.is_(None))
+
+    async def get_posts_by_author(self, author_id: int) -> Sequence[PostDTO]:
+        stmt = (
+            select(*POST_COLUMNS)
+            .where(Post.author_id == author_id, Post.deleted_at.is_(None))
+        )
+
+        result = await self._session.exec(stmt)
+
+        return [PostDTO(*row) for row in result]
+
+    async def get_post_ids_by_author(self, author_id: int) -> List[int]:
+        stmt = select(Post.id).where(Post.author_id == author_id, Post.deleted_at.is_(None))
+        result = await self._session.exec(stmt)
+        return list(result)
+
+    async def get_posts_with_authors(self) -> Sequence[PostWithAuthorDTO]:
         stmt = (
-            select(Post, User).
-            where(Post.draft == False).
+            select(*POST_COLUMNS, *AUTHOR_COLUMNS).
+            where(Post.draft == False, Post.deleted_at.is_(None)).
             join(User)
         )
 
         result = await self._session.exec(stmt)
 
         # Fetch all posts with authors
-        posts_with_authors = result.all()
+        return [_post_with_author_from_row(row) for row in result]
+
+    async def get_post_by_id_with_related_objects(self, post_id: int) -> Optional[PostWithAuthorDTO]:
+        stmt = (
+            select(*POST_COLUMNS, *AUTHOR_COLUMNS)
+            .join(User)
+            .where(Post.id == post_id, Post.deleted_at.is_(None))
+        )
+
+        result = await self._session.exec(stmt)
+
+        # Fetch the single post with the author
+        row = result.one_or_none()
 
-        return posts_with_authors
+        if row is None:
+            return None  # No post found
 
-    async def get_post_by_id_with_related_objects(self, post_id: int) -> Optional[Tuple[Post, User]]:
+        return _post_with_author_from_row(row)
+
+    async def get_post_validator(self, post_id: int) -> Optional[ValidatorDTO]:
+        stmt = (
+            select(Post.updated_at, Post.comment_count, User.updated_at)
+            .join(User)
+            .where(Post.id == post_id, Post.deleted_at.is_(None))
+        )
+
+        row = (await self._session.exec(stmt)).one_or_none()
+        if row is None:
+            return None
+
+        # comment_count changes keep updated_at, so the time of the last edit doesn't tell whether the post changed
+        return ValidatorDTO(None, tuple(row))
+
+    async def get_posts_validator(self, author_id: Optional[int] = None) -> ValidatorDTO:
+        # Counter changes keep updated_at, so the time of the last change doesn't tell whether the list changed
+        if author_id is not None:
+            stmt = (
+                select(func.count(), rows_digest(Post.id, Post.id, Post.comment_count, Post.updated_at))
+                .where(Post.author_id == author_id, Post.deleted_at.is_(None))
+            )
+            row = (await self._session.exec(stmt)).one()
+            return ValidatorDTO(None, tuple(row))
+
+        # Renaming an author changes the list too
         stmt = (
-            select(Post, User)
+            select(func.count(), rows_digest(Post.id, Post.id, Post.comment_count, Post.updated_at, User.updated_at))
             .join(User)
+            .where(Post.draft == False, Post.deleted_at.is_(None))
+        )
+        row = (await self._session.exec(stmt)).one()
+
+        return ValidatorDTO(None, tuple(row))
+
+    async def change_comment_counter(self, post_id: int, delta: int) -> None:
+        # The counter isn't content, so updated_at keeps its value
+        stmt = (
+            update(Post)
             .where(Post.id == post_id)
+            .values({Post.comment_count: Post.comment_count + delta, Post.updated_at: Post.updated_at})
         )
+        await self._session.exec(stmt)
 
+    async def get_deleted_post_ids(self) -> List[int]:
+        stmt = select(Post.id).where(Post.deleted_at.is_not(None)).order_by(Post.deleted_at)
         result = await self._session.exec(stmt)
+        return list(result)
 
-        # Fetch the single post with the author
-        post_with_related_data = result.one_or_none()  # This returns a tuple or None
+    async def search_posts(self, query: str, limit: int,
+                           after: Optional[Tuple[float, int]] = None) -> Sequence[PostSearchHitDTO]:
+        ts_query = to_tsquery(query)
+        rank_expression = rank(post_search_vector, ts_query)
+
+        # The partial GIN index covers only published posts, so the draft condition must stay in this query
+        matches = (
+            select(Post.id, rank_expression.label("rank"))
+            .where(not_(Post.draft), Post.deleted_at.is_(None), post_search_vector.op("@@")(ts_query))
+            .order_by(rank_expression.desc(), Post.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            matches = matches.where(after_position(rank_expression, Post.id, after))
+        page = matches.subquery()
 
-        if post_with_related_data:
-            post, user = post_with_related_data  # Unpack the tuple
-            return post, user  # Returning the tuple (Post, User)
+        # Snippets are built only for the rows of the page
+        stmt = (
+            select(
+                Post.id, Post.title, Post.author_id, Post.created_at, page.c.rank,
+                headline(Post.content, ts_query),
+            )
+            .join(page, page.c.id == Post.id)
+            .order_by(page.c.rank.desc(), Post.id.desc())
+        )
+
+        result = await self._session.exec(stmt)
 
-        return None  # No post found
\ No newline at end of file
+        return [PostSearchHitDTO(*row) for row in result]
@@ -4,6 +4,7 @@ from src.repositories.comment.abstract import AbstractCommentRepository
 from src.repositories.post.abstract import AbstractPostRepository
 from src.repositories.user.abstract import AbstractUserRepository
 from src.repositories.like.abstract import AbstractLikeRepository
+from src.repositories.outbox.abstract import AbstractOutboxRepository
 
 
 class AbstractUnitOfWork(ABC):
@@ -11,6 +12,7 @@ class AbstractUnitOfWork(ABC):
     post_repository: AbstractPostRepository
     comment_repository: AbstractCommentRepository
     like_repository: AbstractLikeRepository
+    outbox_repository: AbstractOutboxRepository
 
     @abstractmethod
     async def commit(self) -> None:
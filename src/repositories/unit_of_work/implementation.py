@@ -6,18 +6,21 @@ from src.repositories.user.abstract import AbstractUserRepository
 from src.repositories.comment.abstract import AbstractCommentRepository
 from src.repositories.post.abstract import AbstractPostRepository
 from src.repositories.like.abstract import AbstractLikeRepository
+from src.repositories.outbox.abstract import AbstractOutboxRepository
 
 
 class UnitOfWork(AbstractUnitOfWork):
     def __init__(self, session: AsyncSession,
                  user_repository: AbstractUserRepository, post_repository: AbstractPostRepository,
                  comment_repository: AbstractCommentRepository, like_repository: AbstractLikeRepository,
+                 outbox_repository: AbstractOutboxRepository,
                  ):
         self._session = session
         self.user_repository = user_repository
         self.post_repository = post_repository
         self.comment_repository = comment_repository
         self.like_repository = like_repository
+        self.outbox_repository = outbox_repository
 
 
     async def commit(self) -> None:
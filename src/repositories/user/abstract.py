@@ -1,6 +1,7 @@
 from abc import abstractmethod, ABC
-from typing import Optional
+from typing import Optional, Sequence
 
+from src.dto.user import UserSearchHitDTO
 from src.models.user import User
 from src.repositories.base.abstract import AbstractGenericRepository
 
@@ -10,3 +11,20 @@ class AbstractUserRepository(AbstractGenericRepository[User], ABC):
     @abstractmethod
     async def get_by_email(self, name: str) -> Optional[User]:
         raise NotImplementedError()
+
+    @abstractmethod
+    async def get_token_version(self, user_id: int) -> Optional[int]:
+        """
+        Returns the current version of the user's tokens, None when the user doesn't exist.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def search_users(self, query: str, limit: int) -> Sequence[UserSearchHitDTO]:
+        """
+        Finds users whose first name or last name starts with the query or is similar to it,
+        or whose email is the query. Prefix and email matches come first, then the closest fuzzy matches.
+
+        :param query: Lowercase query without the leading "@".
+        """
+        raise NotImplementedError()
@@ -1,8 +1,12 @@
-from typing import Optional
-from sqlmodel import select
+from typing import Optional, Sequence
+
+from sqlalchemy import func, case, literal
+from sqlmodel import select, or_
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from src.dto.user import UserSearchHitDTO
 from src.models.user import User
+from src.utils.str_utils import escape_like
 from src.repositories.base.implementation import GenericRepositoryImplementation
 from .abstract import AbstractUserRepository
 
@@ -15,3 +19,35 @@ class UserRepositoryImplementation(GenericRepositoryImplementation[User], Abstra
         stmt = select(User).where(User.email == email)
         result = await self._session.exec(stmt)
         return result.first()
+
+    async def get_token_version(self, user_id: int) -> Optional[int]:
+        stmt = select(User.token_version).where(User.id == user_id)
+        result = await self._session.exec(stmt)
+        return result.first()
+
+    async def search_users(self, query: str, limit: int) -> Sequence[UserSearchHitDTO]:
+        columns = (User.first_name, User.last_name)
+        pattern = escape_like(query) + "%"
+
+        # Every condition can be answered by the trigram index of its column, so the planner combines
+        # the index scans with BitmapOr. %> is true when the query is similar to a word of the column
+        prefix_match = or_(*(column.ilike(pattern, escape="\\") for column in columns))
+        fuzzy_match = or_(*(column.op("%>")(query) for column in columns))
+        similarity = func.greatest(*(func.word_similarity(literal(query), column) for column in columns))
+        match = or_(prefix_match, fuzzy_match)
+        if "@" in query:
+            # Only a whole address finds a user by email, so the lookup can't be used to enumerate emails
+            exact_email = User.email.ilike(escape_like(query), escape="\\")
+            match = or_(match, exact_email)
+            prefix_match = or_(prefix_match, exact_email)
+
+        stmt = (
+            select(User.id, User.first_name, User.last_name)
+            .where(match)
+            .order_by(case((prefix_match, 0), else_=1), similarity.desc(), User.id)
+            .limit(limit)
+        )
+
+        result = await self._session.exec(stmt)
+
+        return [UserSearchHitDTO(*row) for row in result]
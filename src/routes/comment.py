@@ -1,15 +1,17 @@
-from typing import List, Annotated
+from typing import List, Annotated, Optional
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 
 from src.core.containers import Container
-from src.dependencies.auth import get_current_user
-from src.models.user import User
+from src.dependencies.auth import get_current_principal
+from src.dto.user import PrincipalDTO
 from src.schemes.comment.create import CreateCommentSchema
 from src.schemes.comment.update import CommentUpdateSchema
 from src.schemes.comment.read import CommentReadSchema, CommentWithRepliesSchema, DailyCommentAnalyticItem
+from src.schemes.comment.search import CommentSearchPage
 from src.schemes.common import DateRange
 from src.services.comment.abstract import AbstractCommentService
+from src.utils.conditional_get import check_not_modified
 
 router = APIRouter(
     prefix='/comments',
@@ -22,36 +24,63 @@ router = APIRouter(
 @inject
 async def get_all_top_level_comments(
         post_id: int,
+        request: Request,
+        response: Response,
         comment_service: AbstractCommentService = Depends(Provide[Container.comment_service]),
 ):
     """
     Retrieve all top level comments for a specific post
     """
+    check_not_modified(request, response, await comment_service.get_top_level_comments_validator(post_id))
     return await comment_service.get_top_level_comments(post_id)
 
 @router.post('/', status_code=status.HTTP_201_CREATED, response_model=CommentReadSchema)
 @inject
 async def create_comment(
     comment_data: CreateCommentSchema,
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     comment_service: AbstractCommentService = Depends(Provide[Container.comment_service]),
 ):
     return await comment_service.create_comment(user, comment_data)
 
+@router.get('/search', response_model=CommentSearchPage,
+            summary="Full-text search over the comments of published posts")
+@inject
+async def search_comments(
+        q: str = Query(min_length=1, max_length=256, description="Search query, supports quotes, 'or' and '-'"),
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+        comment_service: AbstractCommentService = Depends(Provide[Container.comment_service]),
+):
+    return await comment_service.search_comments(q, limit, cursor)
+
 @router.get('/{comment_id}', response_model=CommentWithRepliesSchema)
 @inject
 async def get_specific_comment(
     comment_id: int,
+    request: Request,
+    response: Response,
     comment_service: AbstractCommentService = Depends(Provide[Container.comment_service])
 ):
+    check_not_modified(request, response, await comment_service.get_comment_validator(comment_id))
     return await comment_service.get_comment_details(comment_id)
 
+@router.get('/{comment_id}/thread', response_model=List[CommentReadSchema],
+            summary="Retrieve a comment with all its replies, each comment is followed by its replies")
+@inject
+async def get_comment_thread(
+    comment_id: int,
+    depth: Optional[int] = Query(default=None, ge=1, description="Depth of the deepest replies, all when omitted"),
+    comment_service: AbstractCommentService = Depends(Provide[Container.comment_service])
+):
+    return await comment_service.get_comment_thread(comment_id, depth)
+
 @router.put('/{comment_id}', response_model=CommentReadSchema)
 @inject
 async def edit_comment(
     comment_id: int,
     update_data: CommentUpdateSchema,
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     comment_service: AbstractCommentService = Depends(Provide[Container.comment_service])
 ):
     return await comment_service.update_comment(comment_id, user, update_data)
@@ -60,7 +89,7 @@ async def edit_comment(
 @inject
 async def like_comment(
     comment_id: int,
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     comment_service: AbstractCommentService = Depends(Provide[Container.comment_service])
 ):
     await comment_service.like_comment(comment_id, user)
@@ -69,7 +98,7 @@ async def like_comment(
 @inject
 async def block_comment(
     comment_id: int,
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     comment_service: AbstractCommentService = Depends(Provide[Container.comment_service]),
 ):
     return await comment_service.block_comment(comment_id, user)
@@ -78,7 +107,7 @@ async def block_comment(
 @inject
 async def delete_comment(
         comment_id: int,
-        user: User = Depends(get_current_user),
+        user: PrincipalDTO = Depends(get_current_principal),
         comment_service: AbstractCommentService = Depends(Provide[Container.comment_service]),
 ):
     return await comment_service.delete_comment(comment_id, user)
@@ -88,7 +117,7 @@ async def delete_comment(
 @inject
 async def get_daily_comment_breakdown(
     date_range: Annotated[DateRange, Depends()],
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     comment_service: AbstractCommentService = Depends(Provide[Container.comment_service]),
 ):
     return await comment_service.daily_comment_analytic(date_range, user)
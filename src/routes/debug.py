@@ -0,0 +1,39 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from src.core.profiler import profile_event_loop
+from src.core.settings import settings
+from src.dependencies.auth import get_current_admin
+from src.models.user import User
+
+router = APIRouter(
+    prefix='/debug',
+    tags=['debug']
+)
+
+# One profile at a time, the samples of concurrent profiles would overlap
+_profiler_lock = asyncio.Lock()
+
+
+@router.get('/profile', response_class=PlainTextResponse, include_in_schema=False)
+async def profile(
+        seconds: float = Query(default=10, gt=0, le=60),
+        interval: float = Query(default=0.01, ge=0.001, le=1),
+        admin: User = Depends(get_current_admin),
+):
+    """
+    Samples the event loop of the worker that handles the request and returns collapsed stacks.
+    Stacks starting with "loop-blocked" ran on the loop and stalled it, stacks starting with "awaiting-io"
+    are the await chains of tasks waiting for I/O.
+    """
+    if not settings.profiler_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if _profiler_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The worker is already being profiled")
+
+    async with _profiler_lock:
+        sampler = await profile_event_loop(seconds, interval)
+
+    return PlainTextResponse(sampler.collapsed(), headers={"x-profile-samples": str(sampler.samples)})
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.core.metrics import registry
+
+router = APIRouter(
+    tags=['metrics']
+)
+
+@router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Returns the metrics of the process in the Prometheus text format.
+    """
+    return PlainTextResponse(await registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from dependency_injector.wiring import inject, Provide
 
-from src.dependencies.auth import get_current_user
-from src.models.user import User
+from src.dependencies.auth import get_current_principal
+from src.dto.user import PrincipalDTO
 from src.schemes.post.create import PostCreateSchema
 from src.schemes.post.list import PostListItemSchema, PostListItemWithAuthorSchema
 from src.schemes.post.details import PostDetails
+from src.schemes.post.search import PostSearchPage
 from src.schemes.post.update import UpdatePostSchema
 from src.services.post.abstraction import AbstractPostService
 from src.core.containers import Container
+from src.utils.conditional_get import check_not_modified
 
 router = APIRouter(
     prefix='/posts',
@@ -19,7 +23,7 @@ router = APIRouter(
 @inject
 async def create_post(
         create_post_schema: PostCreateSchema,
-        user: User = Depends(get_current_user),
+        user: PrincipalDTO = Depends(get_current_principal),
         post_service: AbstractPostService = Depends(Provide[Container.post_service])
 ):
     return await post_service.create_post(user, create_post_schema)
@@ -28,24 +32,48 @@ async def create_post(
 @router.get('/me', response_model=list[PostListItemSchema])
 @inject
 async def your_posts(
-        user: User = Depends(get_current_user),
+        request: Request,
+        response: Response,
+        user: PrincipalDTO = Depends(get_current_principal),
         post_service: AbstractPostService = Depends(Provide[Container.post_service]),
 ):
+    # The list belongs to the user, shared caches must not store it
+    check_not_modified(request, response, await post_service.get_user_posts_validator(user), "private, no-cache")
     return await post_service.get_user_posts(user)
 
 
 @router.get('/', response_model=list[PostListItemWithAuthorSchema])
 @inject
-async def get_all_posts(post_service: AbstractPostService = Depends(Provide[Container.post_service])):
+async def get_all_posts(
+        request: Request,
+        response: Response,
+        post_service: AbstractPostService = Depends(Provide[Container.post_service]),
+):
+    check_not_modified(request, response, await post_service.get_posts_validator())
     return await post_service.get_all_posts_with_authors()
 
 
+@router.get('/search', response_model=PostSearchPage,
+            summary="Full-text search over the titles and the content of published posts")
+@inject
+async def search_posts(
+        q: str = Query(min_length=1, max_length=256, description="Search query, supports quotes, 'or' and '-'"),
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+        post_service: AbstractPostService = Depends(Provide[Container.post_service]),
+):
+    return await post_service.search_posts(q, limit, cursor)
+
+
 @router.get('/{post_id}', response_model=PostDetails)
 @inject
 async def get_specific_post(
         post_id: int,
+        request: Request,
+        response: Response,
         post_service: AbstractPostService = Depends(Provide[Container.post_service])
 ):
+    check_not_modified(request, response, await post_service.get_post_validator(post_id))
     return await post_service.get_post_with_related_data(post_id)
 
 @router.put('/{post_id}', response_model=PostListItemSchema)
@@ -53,7 +81,7 @@ async def get_specific_post(
 async def update_post(
     post_id: int,
     update_post_scheme: UpdatePostSchema,
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     post_service: AbstractPostService = Depends(Provide[Container.post_service]),
 ):
     return await post_service.update_post(user, post_id, update_post_scheme)
@@ -62,7 +90,7 @@ async def update_post(
 @inject
 async def delete_post(
     post_id: int,
-    user: User = Depends(get_current_user),
+    user: PrincipalDTO = Depends(get_current_principal),
     post_service: AbstractPostService = Depends(Provide[Container.post_service]),
 ):
     await post_service.delete_post(user, post_id)
\ No newline at end of file
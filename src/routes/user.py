@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, status
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, status
 from dependency_injector.wiring import inject, Provide
 
 from src.core.containers import Container
+from src.dto.user import PrincipalDTO
 from src.models.user import User
-from src.schemes.user import UserCreate, UserReadSchema, UserUpdateSchema, ChangePasswordSchema
+from src.schemes.user import (
+    UserCreate, UserReadSchema, UserUpdateSchema, ChangePasswordSchema, UserSearchHitSchema,
+)
 from src.services.user.abstract import AbstractUserService
-from src.dependencies.auth import get_current_user
+from src.dependencies.auth import get_current_user, get_current_principal
 
 router = APIRouter(
     prefix='/users',
@@ -25,6 +30,17 @@ async def signup(user_data: UserCreate,
 async def get_user_details(user: User = Depends(get_current_user)):
     return UserReadSchema(**user.model_dump())
 
+@router.get('/search', response_model=List[UserSearchHitSchema],
+            summary="Find users by the beginning of their name or by their email, e.g. for mentions")
+@inject
+async def search_users(
+        q: str = Query(min_length=1, max_length=64, description="What was typed after @"),
+        limit: int = Query(default=10, ge=1, le=50),
+        user: PrincipalDTO = Depends(get_current_principal),
+        user_service: AbstractUserService = Depends(Provide[Container.user_service]),
+):
+    return await user_service.search_users(q, limit)
+
 @router.put('/update', response_model=UserReadSchema)
 @inject
 async def update_user(
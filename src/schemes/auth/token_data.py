@@ -7,6 +7,7 @@ class TokenPayload(BaseModel):
     token_type: str
     exp: int
     id: int
+    token_version: int = 0 # Tokens issued before the versions carry none
 
 
 class AuthTokens(BaseModel):
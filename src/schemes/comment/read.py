@@ -11,6 +11,7 @@ class CommentReadSchema(BaseModel):
     post_id: int
     owner_id: int
     parent_id: Optional[int]
+    reply_count: int = 0
     blocked: bool
     blocked_at: Optional[datetime]
     created_at: datetime
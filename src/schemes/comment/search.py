@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class CommentSearchHit(BaseModel):
+    id: int
+    post_id: int
+    owner_id: int
+    parent_id: Optional[int]
+    created_at: datetime
+    rank: float
+    snippet: str
+
+
+class CommentSearchPage(BaseModel):
+    items: List[CommentSearchHit]
+    next_cursor: Optional[str] = None
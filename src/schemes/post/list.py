@@ -14,6 +14,7 @@ class PostListItemSchema(BaseModel):
     auto_reply: bool = False
     author_id: int
     reply_after: Optional[int] = None
+    comment_count: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class PostSearchHit(BaseModel):
+    id: int
+    title: str
+    author_id: int
+    created_at: datetime
+    rank: float
+    snippet: str
+
+
+class PostSearchPage(BaseModel):
+    items: List[PostSearchHit]
+    next_cursor: Optional[str] = None
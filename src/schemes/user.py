@@ -42,6 +42,12 @@ class UserReadSchema(BaseModel):
     updated_at: datetime
 
 
+class UserSearchHitSchema(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+
+
 class ChangePasswordSchema(BaseModel):
     old_password: str
     new_password1: str
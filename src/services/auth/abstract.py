@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 
 from fastapi.security import OAuth2PasswordRequestForm
 
+from src.dto.user import PrincipalDTO
 from src.models.user import User
 from src.schemes.auth.token_data import AuthTokens
 
@@ -16,6 +17,13 @@ class AbstractAuthService(ABC):
     async def get_user_from_token(self, token: str) -> User:
         pass
 
+    @abstractmethod
+    async def get_principal_from_token(self, token: str) -> PrincipalDTO:
+        """
+        Returns the identity of the token's user, in the stateless mode without loading the user.
+        """
+        pass
+
     @abstractmethod
     async def refresh_access_token(self, refresh_token: str) -> str:
         pass
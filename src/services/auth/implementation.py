@@ -1,20 +1,46 @@
+from typing import Optional
+
 import jwt
 from fastapi import HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from .abstract import AbstractAuthService
 from src.core.exceptions.tokens import InvalidTokenType
+from src.dto.user import PrincipalDTO
 from src.repositories.unit_of_work.abstract import AbstractUnitOfWork
 from src.utils.auth.jwt_handler import JWTHandler
+from src.utils.cache import TTLCache
 from src.utils.password_utils import verify_password
 from src.schemes.auth.token_data import AuthTokens, TokenPayload
 from src.models.user import User
 
 
+def _token_payload(user: User) -> dict:
+    return {"id": user.id, "token_version": user.token_version}
+
+
+def _check_token_version(token_data: TokenPayload, current_version: int) -> None:
+    if token_data.token_version != current_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 class AuthServiceImplementation(AbstractAuthService):
-    def __init__(self, jwt_handler: JWTHandler, uow: AbstractUnitOfWork):
+    def __init__(self, jwt_handler: JWTHandler, uow: AbstractUnitOfWork,
+                 token_versions: Optional[TTLCache[int]] = None, stateless: bool = False):
+        """
+        :param token_versions: Cached token versions by user id, shared with the user service which drops
+            the version of a user who changed the password.
+        :param stateless: Authenticate principals by the claims of the token and the token version,
+            without loading the user.
+        """
         self._jwt_handler = jwt_handler
         self._uow = uow
+        self._token_versions = token_versions
+        self._stateless = stateless
 
     async def provide_tokens(self, form_data: OAuth2PasswordRequestForm) -> AuthTokens:
         async with self._uow:
@@ -34,9 +60,7 @@ class AuthServiceImplementation(AbstractAuthService):
                     detail="Incorrect email or password"
                 )
 
-            token_payload = {
-                "id": user.id,
-            }
+            token_payload = _token_payload(user)
 
             access_token = self._jwt_handler.create_access_token(token_payload.copy())
             refresh_token = self._jwt_handler.create_refresh_token(token_payload.copy())
@@ -85,9 +109,35 @@ class AuthServiceImplementation(AbstractAuthService):
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Could not find user",
                 )
+            _check_token_version(token_data, user.token_version)
 
             return user
 
+    async def _get_token_version(self, user_id: int) -> Optional[int]:
+        version = self._token_versions.get(user_id) if self._token_versions is not None else None
+        if version is None:
+            async with self._uow:
+                version = await self._uow.user_repository.get_token_version(user_id)
+            if version is not None and self._token_versions is not None:
+                self._token_versions.set(user_id, version)
+        return version
+
+    async def get_principal_from_token(self, token: str) -> PrincipalDTO:
+        if not self._stateless:
+            user = await self.get_user_from_token(token)
+            return PrincipalDTO(user.id)
+
+        token_data = self._decode_token(token, token_type='access')
+        version = await self._get_token_version(token_data.id)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Could not find user",
+            )
+        _check_token_version(token_data, version)
+
+        return PrincipalDTO(token_data.id)
+
 
     async def refresh_access_token(self, refresh_token: str) -> str:
         token_data = self._decode_token(refresh_token, token_type='refresh')
@@ -100,7 +150,6 @@ class AuthServiceImplementation(AbstractAuthService):
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Could not find user",
                 )
+            _check_token_version(token_data, user.token_version)
 
-            payload = {"id": user.id}
-
-            return self._jwt_handler.create_access_token(payload)
+            return self._jwt_handler.create_access_token(_token_payload(user))
@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
-from src.models.user import User
+from src.dto.comment import CommentDTO, CommentWithRepliesDTO
+from src.dto.search import SearchPageDTO
+from src.dto.validator import ValidatorDTO
+from src.dto.user import PrincipalDTO
 from src.schemes.comment.create import CreateCommentSchema
-from src.schemes.comment.read import CommentReadSchema, CommentWithRepliesSchema, DailyCommentAnalyticItem
+from src.schemes.comment.read import CommentReadSchema, DailyCommentAnalyticItem
 from src.schemes.comment.update import CommentUpdateSchema
 from src.schemes.common import DateRange
 
@@ -11,36 +14,78 @@ from src.schemes.common import DateRange
 class AbstractCommentService(ABC):
 
     @abstractmethod
-    async def create_comment(self, user: User, comment_data: CreateCommentSchema) -> CommentReadSchema:
+    async def create_comment(self, user: PrincipalDTO, comment_data: CreateCommentSchema) -> CommentReadSchema:
         pass
 
     async def auto_reply_comment(self, comment_id: int) -> None:
         pass
 
     @abstractmethod
-    async def get_top_level_comments(self, post_id: int):
+    async def get_top_level_comments(self, post_id: int) -> List[CommentDTO]:
         pass
 
     @abstractmethod
-    async def get_comment_details(self, comment_id: int) -> CommentWithRepliesSchema:
+    async def search_comments(self, query: str, limit: int, cursor: Optional[str] = None) -> SearchPageDTO:
+        """
+        :param query: Search query in the web search syntax.
+        :param limit: Page size.
+        :param cursor: next_cursor of the previous page.
+        :returns Non-blocked comments of published posts matching the query, the most relevant first.
+        """
         pass
 
     @abstractmethod
-    async def update_comment(self, comment_id: int, user: User, update_data: CommentUpdateSchema) -> CommentReadSchema:
+    async def get_comment_details(self, comment_id: int) -> CommentWithRepliesDTO:
         pass
 
     @abstractmethod
-    async def like_comment(self, comment_id: int, user: User):
+    async def get_top_level_comments_validator(self, post_id: int) -> ValidatorDTO:
+        """
+        Returns the freshness of the response of get_top_level_comments.
+        """
         pass
 
     @abstractmethod
-    async def block_comment(self, comment_id: int, user: User) -> CommentReadSchema:
+    async def get_comment_validator(self, comment_id: int) -> Optional[ValidatorDTO]:
+        """
+        Returns the freshness of the response of get_comment_details, None when there's no such response.
+        """
         pass
 
     @abstractmethod
-    async def delete_comment(self, comment_id: int, user: User) -> None:
+    async def get_comment_thread(self, comment_id: int, max_depth: Optional[int] = None) -> List[CommentDTO]:
+        """
+        Returns the comment followed by its non-blocked replies at any depth, every reply is followed by its own replies.
+
+        :param max_depth: Depth of the deepest replies, 1 returns only the direct replies.
+        """
+        pass
+
+    @abstractmethod
+    async def update_comment(self, comment_id: int, user: PrincipalDTO, update_data: CommentUpdateSchema) -> CommentReadSchema:
+        pass
+
+    @abstractmethod
+    async def like_comment(self, comment_id: int, user: PrincipalDTO):
+        pass
+
+    @abstractmethod
+    async def block_comment(self, comment_id: int, user: PrincipalDTO) -> CommentReadSchema:
         pass
 
     @abstractmethod
-    async def daily_comment_analytic(self, date_range: DateRange, user: User) -> List[DailyCommentAnalyticItem]:
-        pass
\ No newline at end of file
+    async def delete_comment(self, comment_id: int, user: PrincipalDTO) -> None:
+        pass
+
+    @abstractmethod
+    async def daily_comment_analytic(self, date_range: DateRange, user: PrincipalDTO) -> List[DailyCommentAnalyticItem]:
+        pass
+
+    @abstractmethod
+    async def reconcile_counters(self) -> int:
+        """
+        Fixes the comment and reply counters that drifted from the comments, e.g. after manual changes in the database.
+
+        :return: Number of fixed posts and comments.
+        """
+        pass
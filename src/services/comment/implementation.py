@@ -1,47 +1,81 @@
-from typing import List
+from datetime import datetime, timedelta, UTC
+from typing import List, Optional
 
 from fastapi import HTTPException, status
 
 from .abstract import AbstractCommentService
+from src.core.metrics import auto_replies_skipped, auto_replies_merged
+from src.core.settings import settings
+from src.dto.comment import CommentDTO, CommentWithRepliesDTO
+from src.dto.search import SearchPageDTO
+from src.dto.validator import ValidatorDTO
 from src.repositories.unit_of_work.abstract import AbstractUnitOfWork
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 from src.models.comment import Comment
+from src.models.post import Post
 from src.schemes.comment.create import CreateCommentSchema
 from src.utils.comment.comment_model import create_comment_from_schema
-from src.schemes.comment.read import CommentReadSchema, CommentWithRepliesSchema, DailyCommentAnalyticItem
+from src.utils.comment.comment_path import child_path
+from src.schemes.comment.read import CommentReadSchema, DailyCommentAnalyticItem
 from src.schemes.comment.update import CommentUpdateSchema
 from src.utils.comment.ownership import is_user_owner_of_comment
 from src.utils.post.ownership import is_user_owner_of_post
 from src.models.like import Like
 from src.schemes.common import DateRange
 from src.utils.content_moderator.abstract import AbstractContentModerator
-from src.utils.comment.auto_reply import schedule_auto_reply
+from src.utils.comment.auto_reply import (
+    schedule_auto_reply, auto_reply_skip_reason, burst_around, defer_auto_reply, AUTO_REPLY_BURST_LIMIT,
+    AUTO_REPLY_DEFER_SLACK,
+)
 from src.utils.reply_generator.abstract import AbstractReplyGenerator
+from src.utils.post.post_cache import PostCacheEntry, invalidate_posts
+from src.utils.post.prompt_context import PromptContext, estimate_tokens, fit_comments, get_prompt_context
+from src.utils.search import decode_cursor, make_search_page
+from src.utils.single_flight import SingleFlight, coalesce
+from src.utils.tiered_cache import TieredCache
 
 
 class CommentServiceImplementation(AbstractCommentService):
     def __init__(self, uow: AbstractUnitOfWork, content_moderator: AbstractContentModerator,
-                 reply_generator: AbstractReplyGenerator):
+                 reply_generator: AbstractReplyGenerator, post_cache: Optional[TieredCache[PostCacheEntry]] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 prompt_context_cache: Optional[TieredCache[PromptContext]] = None):
+        """
+        :param post_cache: Cached post details, the comment counters of the posts are part of them.
+        :param single_flight: Shares the result of identical reads running concurrently in the process.
+        :param prompt_context_cache: Condensed posts of the auto reply prompts, a post is condensed per reply without it.
+        """
         self._uow = uow
         self._content_moderator = content_moderator
         self._reply_generator = reply_generator
+        self._post_cache = post_cache
+        self._single_flight = single_flight
+        self._prompt_context_cache = prompt_context_cache
 
-    def _create_prompt_from_post_and_comment(self, comment: Comment) -> str:
+    async def _create_prompt_from_post_and_comments(self, instructions: str, post: Post,
+                                                    comments: List[Comment]) -> str:
         """
-        Returns prompt created from post and comment objects
-        :param comment: Comment object, make sure that you have joined a post to the comment
+        Returns prompt created from the post and the comments it answers, within auto_reply_prompt_max_tokens.
+        The post is condensed to auto_reply_post_tokens, the oldest comments are left out of the rest of the budget.
+        :param comments: Comments of one user, ordered by creation time
         """
-        prompt = (
-            f"Post Title: {comment.post.title}\n"
-            f"Post Text: {comment.post.content}\n\n"
-            f"Comment: {comment.content}\n"
-        )
-
+        context = await get_prompt_context(self._prompt_context_cache, post, settings.auto_reply_post_tokens)
+        budget = settings.auto_reply_prompt_max_tokens - estimate_tokens(instructions + context.text)
+        lines = [f"Comment: {comment.content}\n" for comment in comments]
+        prompt = instructions + context.text + "".join(fit_comments(lines, max(budget, 0)))
 
         return prompt
 
+    async def _change_counters(self, post_id: int, parent_id: Optional[int], delta: int) -> None:
+        """
+        Changes the comment counter of the post and the reply counter of the parent comment in the current transaction.
+        The post is always updated first, so concurrent transactions lock the rows in the same order.
+        """
+        await self._uow.post_repository.change_comment_counter(post_id, delta)
+        if parent_id is not None:
+            await self._uow.comment_repository.change_reply_counter(parent_id, delta)
 
-    async def create_comment(self, user: User, comment_data: CreateCommentSchema) -> CommentReadSchema:
+    async def create_comment(self, user: PrincipalDTO, comment_data: CreateCommentSchema) -> CommentReadSchema:
         block_comment = False
 
         text_to_moderate = comment_data.content
@@ -58,6 +92,7 @@ class CommentServiceImplementation(AbstractCommentService):
                     detail="Not able to create comment for non-existent post",
                 )
 
+            parent_comment = None
             if comment_data.parent_id is not None:
 
                 parent_comment = await self._uow.comment_repository.get_by_id(comment_data.parent_id)
@@ -67,33 +102,65 @@ class CommentServiceImplementation(AbstractCommentService):
                         detail="Not able to create comment for non-existent parent comment",
                     )
 
-            comment_object = create_comment_from_schema(user, comment_data)
+            comment_object = create_comment_from_schema(user, comment_data, parent_comment)
             if block_comment:
                 comment_object.block_comment()
 
             created_comment = await self._uow.comment_repository.add(comment_object)
-            await self._uow.commit()
-
             # If comment is not blocked and auto_reply feature for a specific post is enabled
-            # Then schedule auto reply
+            # Then schedule auto reply, in the same transaction, so it's scheduled if and only if the comment is saved
             if not block_comment and post.auto_reply:
-                schedule_auto_reply(post, created_comment)
+                await schedule_auto_reply(self._uow.outbox_repository, post, created_comment)
+            if not block_comment:
+                await self._change_counters(post.id, created_comment.parent_id, 1)
+            await self._uow.commit()
+            if not block_comment:
+                await invalidate_posts(self._post_cache, post.id)
 
             return CommentReadSchema(**created_comment.model_dump())
 
     async def auto_reply_comment(self, comment_id: int) -> None:
         """
         Automatically responds to the specified comment under the post.
+        A burst of comments of the same user is answered with one reply, to the last comment of the burst.
+        The earlier comments of a burst wait for the reply to the last one, and answer the burst themselves
+        when it didn't come, e.g. because the last comment was deleted or blocked meanwhile.
         :param comment_id: ID of a comment that needs to be answered.
         """
         async with self._uow:
             comment = await self._uow.comment_repository.get_comment_with_post(comment_id)
+            # The comment, the post or its settings may have changed since the reply was scheduled
+            skip_reason = auto_reply_skip_reason(comment)
+            if skip_reason is not None:
+                auto_replies_skipped.labels(skip_reason).inc()
+                return
+
+            window = timedelta(seconds=settings.auto_reply_burst_seconds)
+            around = await self._uow.comment_repository.get_comments_around(
+                comment, comment.post.author_id, window, AUTO_REPLY_BURST_LIMIT,
+            )
+            # The task may run twice, e.g. after a lost acknowledgement
+            if any(other.id == comment.id and is_answered for other, is_answered in around):
+                auto_replies_skipped.labels("already_replied").inc()
+                return
+            burst = burst_around(comment, around, window)
+            if burst is None:
+                auto_replies_merged.labels().inc()
+                return
+
+            last = burst[-1]
+            last_due = last.created_at + timedelta(minutes=comment.post.reply_after or 0) + AUTO_REPLY_DEFER_SLACK
+            if last.id != comment.id and datetime.now(UTC) < last_due:
+                await defer_auto_reply(self._uow.outbox_repository, comment, last_due)
+                await self._uow.commit()
+                return
 
-            prompt = (
+            prompt = await self._create_prompt_from_post_and_comments(
                 "Given a post title and post text.\n"
-                "You need to answer the comment. Answer should be compact.\n"
-                "DON'T USE LISTS, TABLES, ETC. \n"
-            ) + self._create_prompt_from_post_and_comment(comment)
+                "You need to answer the comments of a user. Answer should be compact.\n"
+                "DON'T USE LISTS, TABLES, ETC. \n",
+                comment.post, burst,
+            )
 
             response = await self._reply_generator.generate_reply(prompt)
 
@@ -101,21 +168,36 @@ class CommentServiceImplementation(AbstractCommentService):
                 content=response,
                 post_id=comment.post_id,
                 owner_id=comment.post.author_id,
-                parent_id=comment.id,
+                parent_id=last.id,
+                path=child_path(last),
             )
 
             await self._uow.comment_repository.add(auto_generated_comment)
+            await self._change_counters(comment.post_id, last.id, 1)
             await self._uow.commit()
+            await invalidate_posts(self._post_cache, comment.post_id)
+
+    async def _get_top_level_comments(self, post_id: int) -> List[CommentDTO]:
+        async with self._uow:
+            comments = await self._uow.comment_repository.get_top_level_comments(post_id)
+            return comments
 
-    async def get_top_level_comments(self, post_id: int):
+    async def get_top_level_comments(self, post_id: int) -> List[CommentDTO]:
         """
         Returns comments as a tree with replies, etc.
         """
+        return await coalesce(
+            self._single_flight, ("top_level_comments", post_id), lambda: self._get_top_level_comments(post_id),
+        )
+
+    async def search_comments(self, query: str, limit: int, cursor: Optional[str] = None) -> SearchPageDTO:
+        after = decode_cursor(cursor)
         async with self._uow:
-            comments = await self._uow.comment_repository.get_top_level_comments(post_id)
-            return comments
+            # One extra hit tells whether there's a next page
+            hits = await self._uow.comment_repository.search_comments(query, limit + 1, after)
+            return make_search_page(hits, limit)
 
-    async def get_comment_details(self, comment_id: int) -> CommentWithRepliesSchema:
+    async def _get_comment_details(self, comment_id: int) -> CommentWithRepliesDTO:
         async with self._uow:
             comment = await self._uow.comment_repository.get_comment_details_and_replies(comment_id)
 
@@ -125,12 +207,45 @@ class CommentServiceImplementation(AbstractCommentService):
                     detail="Not able to get comment details for non-existent comment",
                 )
 
-            return CommentWithRepliesSchema(
-                comment=comment.model_dump(),
-                replies=[reply.model_dump() for reply in comment.replies if reply.blocked == False]
-            )
+            return comment
 
-    async def update_comment(self, comment_id: int, user: User ,update_data: CommentUpdateSchema) -> CommentReadSchema:
+    async def get_comment_details(self, comment_id: int) -> CommentWithRepliesDTO:
+        return await coalesce(
+            self._single_flight, ("comment_details", comment_id), lambda: self._get_comment_details(comment_id),
+        )
+
+    async def _get_top_level_comments_validator(self, post_id: int) -> ValidatorDTO:
+        async with self._uow:
+            return await self._uow.comment_repository.get_top_level_comments_validator(post_id)
+
+    async def get_top_level_comments_validator(self, post_id: int) -> ValidatorDTO:
+        return await coalesce(
+            self._single_flight, ("top_level_comments_validator", post_id),
+            lambda: self._get_top_level_comments_validator(post_id),
+        )
+
+    async def _get_comment_validator(self, comment_id: int) -> Optional[ValidatorDTO]:
+        async with self._uow:
+            return await self._uow.comment_repository.get_comment_validator(comment_id)
+
+    async def get_comment_validator(self, comment_id: int) -> Optional[ValidatorDTO]:
+        return await coalesce(
+            self._single_flight, ("comment_validator", comment_id), lambda: self._get_comment_validator(comment_id),
+        )
+
+    async def get_comment_thread(self, comment_id: int, max_depth: Optional[int] = None) -> List[CommentDTO]:
+        async with self._uow:
+            thread = await self._uow.comment_repository.get_subtree(comment_id, max_depth)
+
+            if not thread:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Not able to get the thread of non-existent comment",
+                )
+
+            return thread
+
+    async def update_comment(self, comment_id: int, user: PrincipalDTO ,update_data: CommentUpdateSchema) -> CommentReadSchema:
         block_comment = False
 
         text_to_moderate = update_data.content
@@ -155,15 +270,20 @@ class CommentServiceImplementation(AbstractCommentService):
 
             comment.content = update_data.content
 
+            newly_blocked = block_comment and not comment.blocked
             if block_comment:
                 comment.block_comment()
 
             updated_comment = await self._uow.comment_repository.update(comment)
+            if newly_blocked:
+                await self._change_counters(comment.post_id, comment.parent_id, -1)
             await self._uow.commit()
+            if newly_blocked:
+                await invalidate_posts(self._post_cache, comment.post_id)
 
             return CommentReadSchema(**updated_comment.model_dump())
 
-    async def like_comment(self, comment_id: int, user: User):
+    async def like_comment(self, comment_id: int, user: PrincipalDTO):
         async with self._uow:
             comment = await self._uow.comment_repository.get_by_id(comment_id)
             if comment is None:
@@ -190,7 +310,7 @@ class CommentServiceImplementation(AbstractCommentService):
             await self._uow.comment_repository.decrement_like_counter(comment)
             await self._uow.commit()
 
-    async def block_comment(self, comment_id: int, user: User) -> CommentReadSchema:
+    async def block_comment(self, comment_id: int, user: PrincipalDTO) -> CommentReadSchema:
         async with self._uow:
             comment = await self._uow.comment_repository.get_comment_with_post(comment_id)
             if comment is None:
@@ -205,14 +325,19 @@ class CommentServiceImplementation(AbstractCommentService):
                     detail="Only owner of the post can block comments under the post",
                 )
 
+            newly_blocked = not comment.blocked
             comment.block_comment()
 
             updated_comment = await self._uow.comment_repository.update(comment)
+            if newly_blocked:
+                await self._change_counters(comment.post_id, comment.parent_id, -1)
             await self._uow.commit()
+            if newly_blocked:
+                await invalidate_posts(self._post_cache, comment.post_id)
 
             return CommentReadSchema(**updated_comment.model_dump())
 
-    async def delete_comment(self, comment_id: int, user: User) -> None:
+    async def delete_comment(self, comment_id: int, user: PrincipalDTO) -> None:
         async with self._uow:
             comment = await self._uow.comment_repository.get_by_id(comment_id)
             if comment is None:
@@ -227,11 +352,26 @@ class CommentServiceImplementation(AbstractCommentService):
                     detail="Only owner of the comment can delete the comment",
                 )
 
-            await self._uow.comment_repository.delete(comment)
+            # The replies are deleted with the comment, so the post loses all their visible comments
+            visible_comments = await self._uow.comment_repository.count_visible_in_subtree(comment.id)
+
+            await self._uow.comment_repository.delete_subtree(comment.id)
+
+            await self._uow.post_repository.change_comment_counter(comment.post_id, -visible_comments)
+            if comment.parent_id is not None and not comment.blocked:
+                await self._uow.comment_repository.change_reply_counter(comment.parent_id, -1)
             await self._uow.commit()
+            if visible_comments:
+                await invalidate_posts(self._post_cache, comment.post_id)
 
-    async def daily_comment_analytic(self, date_range: DateRange, user: User) -> List[DailyCommentAnalyticItem]:
+    async def daily_comment_analytic(self, date_range: DateRange, user: PrincipalDTO) -> List[DailyCommentAnalyticItem]:
         async with self._uow:
             daily_analytic = await self._uow.comment_repository.daily_comment_analytic(date_range, user)
 
             return daily_analytic
+
+    async def reconcile_counters(self) -> int:
+        async with self._uow:
+            fixed = await self._uow.comment_repository.reconcile_counters()
+            await self._uow.commit()
+            return fixed
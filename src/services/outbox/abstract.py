@@ -0,0 +1,13 @@
+from abc import ABC, abstractmethod
+
+
+class AbstractOutboxService(ABC):
+
+    @abstractmethod
+    async def relay_messages(self) -> int:
+        """
+        Publishes the unsent messages of the outbox in batches and marks them sent.
+
+        :return: Number of published messages.
+        """
+        pass
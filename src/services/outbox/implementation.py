@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+from typing import Callable, List
+
+from .abstract import AbstractOutboxService
+from src.repositories.unit_of_work.abstract import AbstractUnitOfWork
+from src.utils.task_queue import TaskMessage, send_to_celery
+
+
+class OutboxServiceImplementation(AbstractOutboxService):
+    def __init__(self, uow: AbstractUnitOfWork, batch_size: int, retention: timedelta,
+                 publish: Callable[[List[TaskMessage]], None] = send_to_celery, publish_timeout: float = 5.0):
+        """
+        :param batch_size: Messages claimed and published per transaction.
+        :param retention: How long the sent messages are kept.
+        :param publish: Sends the messages to the broker, it's called in a thread.
+        :param publish_timeout: How long a batch may take to publish (in seconds). The claimed messages stay locked
+            meanwhile, so a hung broker fails the run and releases them instead of holding the locks.
+        """
+        self._uow = uow
+        self._batch_size = batch_size
+        self._retention = retention
+        self._publish = publish
+        self._publish_timeout = publish_timeout
+
+    async def relay_messages(self) -> int:
+        relayed = 0
+        while True:
+            # Every batch is a transaction of its own. The messages stay locked until they're marked sent,
+            # so concurrent relays skip them, and a failed publish leaves them for the next run.
+            # A relay dying between the publish and the commit publishes the batch again,
+            # a timed out publish rolls the transaction back and may reach the broker too
+            async with self._uow:
+                messages = await self._uow.outbox_repository.claim_unsent(self._batch_size)
+                if not messages:
+                    break
+                await asyncio.wait_for(asyncio.to_thread(self._publish, [
+                    TaskMessage(message.task, tuple(message.args), message.eta) for message in messages
+                ]), self._publish_timeout)
+                await self._uow.outbox_repository.update_many(
+                    {"sent_at": datetime.now(UTC)}, id=[message.id for message in messages],
+                )
+                await self._uow.commit()
+            relayed += len(messages)
+            if len(messages) < self._batch_size:
+                break
+
+        async with self._uow:
+            await self._uow.outbox_repository.delete_sent_before(datetime.now(UTC) - self._retention)
+            await self._uow.commit()
+
+        return relayed
@@ -1,37 +1,79 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
-from src.models.user import User
+from src.dto.post import PostDTO, PostWithAuthorDTO
+from src.dto.search import SearchPageDTO
+from src.dto.validator import ValidatorDTO
+from src.dto.user import PrincipalDTO
 from src.schemes.post.create import PostCreateSchema
-from src.schemes.post.details import PostDetails
-from src.schemes.post.list import PostListItemSchema, PostListItemWithAuthorSchema
+from src.schemes.post.list import PostListItemSchema
 from src.schemes.post.update import UpdatePostSchema
 
 
 class AbstractPostService(ABC):
     @abstractmethod
-    async def create_post(self, user: User ,create_post_schema: PostCreateSchema) -> PostListItemSchema:
+    async def create_post(self, user: PrincipalDTO ,create_post_schema: PostCreateSchema) -> PostListItemSchema:
         pass
 
     @abstractmethod
-    async def get_user_posts(self, user: User) -> List[PostListItemSchema]:
+    async def get_user_posts(self, user: PrincipalDTO) -> List[PostDTO]:
         """
         :returns All posts related to specific user.
         """
         pass
 
     @abstractmethod
-    async def get_all_posts_with_authors(self) -> List[PostListItemWithAuthorSchema]:
+    async def get_all_posts_with_authors(self) -> List[PostWithAuthorDTO]:
         pass
 
     @abstractmethod
-    async def get_post_with_related_data(self, post_id: int) -> PostDetails:
+    async def get_post_with_related_data(self, post_id: int) -> PostWithAuthorDTO:
         pass
 
     @abstractmethod
-    async def update_post(self, user: User, post_id: int, update_post_data: UpdatePostSchema) -> PostListItemSchema:
+    async def get_post_validator(self, post_id: int) -> Optional[ValidatorDTO]:
+        """
+        :returns Freshness of the response of get_post_with_related_data, None when the post doesn't exist.
+        """
+        pass
+
+    @abstractmethod
+    async def get_posts_validator(self) -> ValidatorDTO:
+        """
+        :returns Freshness of the response of get_all_posts_with_authors.
+        """
+        pass
+
+    @abstractmethod
+    async def get_user_posts_validator(self, user: PrincipalDTO) -> ValidatorDTO:
+        """
+        :returns Freshness of the response of get_user_posts.
+        """
+        pass
+
+    @abstractmethod
+    async def search_posts(self, query: str, limit: int, cursor: Optional[str] = None) -> SearchPageDTO:
+        """
+        :param query: Search query in the web search syntax.
+        :param limit: Page size.
+        :param cursor: next_cursor of the previous page.
+        :returns Published posts matching the query, the most relevant first.
+        """
+        pass
+
+    @abstractmethod
+    async def update_post(self, user: PrincipalDTO, post_id: int, update_post_data: UpdatePostSchema) -> PostListItemSchema:
         pass
 
     @abstractmethod
-    async def delete_post(self, user: User, post_id: int) -> None:
+    async def delete_post(self, user: PrincipalDTO, post_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def purge_deleted_posts(self) -> int:
+        """
+        Deletes the comments of the posts deleted in the background chunk by chunk, then the posts themselves.
+
+        :return: Number of purged posts.
+        """
         pass
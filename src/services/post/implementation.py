@@ -1,25 +1,48 @@
-from typing import List
+from datetime import datetime, UTC
+from typing import List, Optional
 from fastapi import HTTPException, status
 
-from src.models.user import User
+from src.core.settings import settings
+from src.dto.post import PostDTO, PostWithAuthorDTO
+from src.dto.search import SearchPageDTO
+from src.dto.validator import ValidatorDTO
+from src.dto.user import PrincipalDTO
 from src.repositories.unit_of_work.abstract import AbstractUnitOfWork
 from src.schemes.post.create import PostCreateSchema
-from src.schemes.post.details import PostDetails
-from src.schemes.post.list import PostListItemSchema, PostListItemWithAuthorSchema
-from src.schemes.post.common import Author
+from src.schemes.post.list import PostListItemSchema
 from src.schemes.post.update import UpdatePostSchema
 from src.services.post.abstraction import AbstractPostService
 from src.utils.content_moderator.abstract import AbstractContentModerator
 from src.utils.post.ownership import is_user_owner_of_post
+from src.utils.post.post_cache import PostCacheEntry, invalidate_posts
+from src.utils.post.prompt_context import PromptContext, invalidate_prompt_contexts
 from src.utils.post.post_model import create_post_from_schema, update_post_from_schema
+from src.utils.post.purge import schedule_posts_purge
+from src.utils.search import decode_cursor, make_search_page
+from src.utils.single_flight import SingleFlight, coalesce
+from src.utils.task_queue import TaskEnqueuer
+from src.utils.tiered_cache import TieredCache
 
 
 class PostServiceImplementation(AbstractPostService):
-    def __init__(self, uow: AbstractUnitOfWork, content_moderator: AbstractContentModerator):
+    def __init__(self, uow: AbstractUnitOfWork, content_moderator: AbstractContentModerator,
+                 post_cache: Optional[TieredCache[PostCacheEntry]] = None,
+                 single_flight: Optional[SingleFlight] = None, task_enqueuer: Optional[TaskEnqueuer] = None,
+                 prompt_context_cache: Optional[TieredCache[PromptContext]] = None):
+        """
+        :param post_cache: Read-through cache of the post details, the details are read from the database without it.
+        :param single_flight: Shares the result of identical reads running concurrently in the process.
+        :param task_enqueuer: Sends the Celery tasks without waiting for the broker, they aren't scheduled without it.
+        :param prompt_context_cache: Condensed posts of the auto reply prompts, dropped when a post is updated.
+        """
         self._uow = uow
         self._content_moderator = content_moderator
+        self._post_cache = post_cache
+        self._single_flight = single_flight
+        self._task_enqueuer = task_enqueuer
+        self._prompt_context_cache = prompt_context_cache
 
-    async def create_post(self, user: User ,create_post_schema: PostCreateSchema) -> PostListItemSchema:
+    async def create_post(self, user: PrincipalDTO ,create_post_schema: PostCreateSchema) -> PostListItemSchema:
         text_to_moderate = (
             f"{create_post_schema.title}\n"
             f"{create_post_schema.content}"
@@ -40,80 +63,74 @@ class PostServiceImplementation(AbstractPostService):
 
             return PostListItemSchema(**created_post.model_dump())
 
-    async def get_user_posts(self, user: User) -> List[PostListItemSchema]:
-        posts = []
-
+    async def get_user_posts(self, user: PrincipalDTO) -> List[PostDTO]:
         async with self._uow:
-            post_list = await self._uow.post_repository.list(author_id=user.id)
-
-            await self._uow.commit()
+            return await self._uow.post_repository.get_posts_by_author(user.id)
 
-            # Convert each post into PostListItemSchema
-            for post in post_list:
-                post_schema = PostListItemSchema(
-                    id=post.id,  # Assuming `post` has an `id` attribute
-                    title=post.title,
-                    content=post.content,
-                    draft=post.draft,
-                    author_id=post.author_id,
-                    auto_reply=post.auto_reply,
-                    reply_after=post.reply_after,
-                    created_at=post.created_at,
-                    updated_at=post.updated_at,
-                )
-                posts.append(post_schema)
+    async def _get_all_posts_with_authors(self) -> List[PostWithAuthorDTO]:
+        async with self._uow:
+            return await self._uow.post_repository.get_posts_with_authors()
 
-            await self._uow.commit()
+    async def get_all_posts_with_authors(self) -> List[PostWithAuthorDTO]:
+        return await coalesce(self._single_flight, "posts", self._get_all_posts_with_authors)
 
-        return posts
+    async def search_posts(self, query: str, limit: int, cursor: Optional[str] = None) -> SearchPageDTO:
+        after = decode_cursor(cursor)
+        async with self._uow:
+            # One extra hit tells whether there's a next page
+            hits = await self._uow.post_repository.search_posts(query, limit + 1, after)
+            return make_search_page(hits, limit)
 
-    async def get_all_posts_with_authors(self) -> List[PostListItemWithAuthorSchema]:
-        posts_with_authors = []
+    async def _load_post_entry(self, post_id: int) -> Optional[PostCacheEntry]:
         async with self._uow:
-            post_list = await self._uow.post_repository.get_posts_with_authors()
+            # The validator is read first, so it's never newer than the details it describes
+            validator = await self._uow.post_repository.get_post_validator(post_id)
+            if validator is None:
+                return None
+            post_details = await self._uow.post_repository.get_post_by_id_with_related_objects(post_id)
+            if post_details is None:
+                return None
+            return PostCacheEntry(post_details, validator)
+
+    async def _get_cached_post(self, post_id: int) -> Optional[PostCacheEntry]:
+        return await self._post_cache.get_or_load(str(post_id), lambda: self._load_post_entry(post_id))
+
+    async def get_post_with_related_data(self, post_id: int) -> PostWithAuthorDTO:
+        if self._post_cache is None:
+            async with self._uow:
+                post_details = await self._uow.post_repository.get_post_by_id_with_related_objects(post_id)
+        else:
+            entry = await self._get_cached_post(post_id)
+            post_details = entry.details if entry is not None else None
+
+        if post_details is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Post not found"
+            )
 
-            for post, author in post_list:
-                # Create Author object
-                author = Author(
-                    first_name=author.first_name,
-                    last_name=author.last_name,
-                )
-                # Create PostListItemWithAuthorSchema object
-                post_schema = PostListItemWithAuthorSchema(
-                    id=post.id,
-                    title=post.title,
-                    content=post.content,
-                    draft=post.draft,
-                    auto_reply=post.auto_reply,
-                    author_id=post.author_id,
-                    reply_after=post.reply_after,
-                    created_at=post.created_at,
-                    updated_at=post.updated_at,
-                    author=author  # Include author information
-                )
-                posts_with_authors.append(post_schema)
+        return post_details
 
-        return posts_with_authors
+    async def get_post_validator(self, post_id: int) -> Optional[ValidatorDTO]:
+        if self._post_cache is not None:
+            entry = await self._get_cached_post(post_id)
+            return entry.validator if entry is not None else None
 
-    async def get_post_with_related_data(self, post_id: int) -> PostDetails:
         async with self._uow:
-            post_with_related_data = await self._uow.post_repository.get_post_by_id_with_related_objects(post_id)
+            return await self._uow.post_repository.get_post_validator(post_id)
 
-            if post_with_related_data is None:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Post not found"
-                )
+    async def _get_posts_validator(self) -> ValidatorDTO:
+        async with self._uow:
+            return await self._uow.post_repository.get_posts_validator()
 
-            post, user = post_with_related_data
-            post_details = PostDetails(
-                **post.model_dump(),
-                author=Author(**user.model_dump())
-            )
+    async def get_posts_validator(self) -> ValidatorDTO:
+        return await coalesce(self._single_flight, "posts_validator", self._get_posts_validator)
 
-            return post_details
+    async def get_user_posts_validator(self, user: PrincipalDTO) -> ValidatorDTO:
+        async with self._uow:
+            return await self._uow.post_repository.get_posts_validator(author_id=user.id)
 
-    async def update_post(self, user: User, post_id: int, update_post_data: UpdatePostSchema) -> PostListItemSchema:
+    async def update_post(self, user: PrincipalDTO, post_id: int, update_post_data: UpdatePostSchema) -> PostListItemSchema:
         text_to_moderate = (
             f"{update_post_data.title}\n"
             f"{update_post_data.content}"
@@ -146,10 +163,12 @@ class PostServiceImplementation(AbstractPostService):
             updated_post = await self._uow.post_repository.update(post)
 
             await self._uow.commit()
+            await invalidate_posts(self._post_cache, post_id)
+            await invalidate_prompt_contexts(self._prompt_context_cache, post_id)
 
             return PostListItemSchema(**updated_post.model_dump())
 
-    async def delete_post(self, user: User, post_id: int) -> None:
+    async def delete_post(self, user: PrincipalDTO, post_id: int) -> None:
         async with self._uow:
             post = await self._uow.post_repository.get_by_id(post_id)
             if post is None:
@@ -165,6 +184,44 @@ class PostServiceImplementation(AbstractPostService):
                     detail="Only owner can delete the post"
                 )
 
-            await self._uow.post_repository.delete(post)
-
+            # comment_count leaves out the blocked comments, which the cascade has to delete too
+            comments = await self._uow.comment_repository.count_post_comments(post.id, settings.post_purge_threshold)
+            if comments < settings.post_purge_threshold:
+                # The database deletes the comments and their likes with the post
+                await self._uow.post_repository.delete_where(id=post.id)
+                await self._uow.commit()
+                await invalidate_posts(self._post_cache, post_id)
+                return
+
+            # Deleting a large thread in one transaction would hold the request and the locks for long,
+            # so the post is hidden now and deleted chunk by chunk in the background
+            post.deleted_at = datetime.now(UTC)
+            await self._uow.post_repository.update(post)
             await self._uow.commit()
+
+        await invalidate_posts(self._post_cache, post_id)
+        schedule_posts_purge(self._task_enqueuer)
+
+    async def purge_deleted_posts(self) -> int:
+        purged = 0
+        async with self._uow:
+            post_ids = await self._uow.post_repository.get_deleted_post_ids()
+
+        for post_id in post_ids:
+            # Every chunk is a short transaction of its own
+            while True:
+                async with self._uow:
+                    deleted = await self._uow.comment_repository.delete_post_comments_chunk(
+                        post_id, settings.purge_chunk_size,
+                    )
+                    await self._uow.commit()
+                if not deleted:
+                    break
+
+            async with self._uow:
+                await self._uow.post_repository.delete_where(id=post_id)
+                await self._uow.commit()
+            await invalidate_posts(self._post_cache, post_id)
+            purged += 1
+
+        return purged
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import List
 
+from src.dto.user import UserSearchHitDTO
 from src.models.user import User
 from src.schemes.user import UserCreate, UserReadSchema, UserUpdateSchema, ChangePasswordSchema
 
@@ -17,3 +19,13 @@ class AbstractUserService(ABC):
     @abstractmethod
     async def change_password(self, user: User, change_password_data: ChangePasswordSchema) -> None:
         pass
+
+    @abstractmethod
+    async def search_users(self, query: str, limit: int) -> List[UserSearchHitDTO]:
+        """
+        Looks up users by the prefix of their name, or by their whole email, for mention autocomplete.
+
+        :param query: What the user typed, with or without the leading "@".
+        :param limit: Max number of users.
+        """
+        pass
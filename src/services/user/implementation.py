@@ -1,16 +1,33 @@
+from typing import List, Optional
+
 from fastapi import HTTPException, status
 
 from .abstract import AbstractUserService
+from src.dto.user import UserSearchHitDTO
 from src.schemes.user import UserCreate, UserReadSchema, UserUpdateSchema, ChangePasswordSchema
 from src.repositories.unit_of_work.abstract import AbstractUnitOfWork
+from src.utils.cache import TTLCache
+from src.utils.post.post_cache import PostCacheEntry, invalidate_posts
 from src.utils.password_utils import hash_password, verify_password
+from src.utils.user.user_search import normalize_user_query, USER_SEARCH_MIN_LENGTH
 from src.utils.user.user_model import create_user_from_signup_data, apply_updates_to_user
 from src.models.user import User
+from src.utils.tiered_cache import TieredCache
 
 
 class UserServiceImplementation(AbstractUserService):
-    def __init__(self, uow: AbstractUnitOfWork):
+    def __init__(self, uow: AbstractUnitOfWork, search_cache: TTLCache[List[UserSearchHitDTO]],
+                 post_cache: Optional[TieredCache[PostCacheEntry]] = None,
+                 token_versions: Optional[TTLCache[int]] = None):
+        """
+        :param search_cache: Results of the user lookup per (query, limit), shared by the requests of the process.
+        :param post_cache: Cached post details, they include the names of the authors.
+        :param token_versions: Cached token versions by user id, see AuthServiceImplementation.
+        """
         self._uow = uow
+        self._search_cache = search_cache
+        self._post_cache = post_cache
+        self._token_versions = token_versions
 
     async def user_signup(self, user_create_data: UserCreate) -> UserReadSchema:
 
@@ -30,6 +47,7 @@ class UserServiceImplementation(AbstractUserService):
             created_user = await self._uow.user_repository.add(user_model)
 
             await self._uow.commit()
+            self._search_cache.clear()
 
             return UserReadSchema(**created_user.model_dump())
 
@@ -44,11 +62,18 @@ class UserServiceImplementation(AbstractUserService):
                 )
 
         async with self._uow:
+            old_name = (user.first_name, user.last_name)
             apply_updates_to_user(user, user_update_data)
 
             updated_user = await self._uow.user_repository.update(user)
 
             await self._uow.commit()
+            # Names and emails may have changed, other processes catch up when their entries expire
+            self._search_cache.clear()
+
+            if (updated_user.first_name, updated_user.last_name) != old_name:
+                post_ids = await self._uow.post_repository.get_post_ids_by_author(updated_user.id)
+                await invalidate_posts(self._post_cache, *post_ids)
 
             return UserReadSchema(**updated_user.model_dump())
 
@@ -69,8 +94,25 @@ class UserServiceImplementation(AbstractUserService):
         new_hashed_password = hash_password(change_password_data.new_password1)
 
         user.password = new_hashed_password
+        # Revokes the tokens issued with the old password
+        user.token_version += 1
 
         async with self._uow:
             await self._uow.user_repository.update(user)
             await self._uow.commit()
 
+        if self._token_versions is not None:
+            # Other processes accept the old tokens until their cached versions expire
+            self._token_versions.delete(user.id)
+
+    async def search_users(self, query: str, limit: int) -> List[UserSearchHitDTO]:
+        query = normalize_user_query(query)
+        if len(query) < USER_SEARCH_MIN_LENGTH:
+            return []
+
+        hits = self._search_cache.get((query, limit))
+        if hits is None:
+            async with self._uow:
+                hits = list(await self._uow.user_repository.search_users(query, limit))
+            self._search_cache.set((query, limit), hits)
+        return hits
@@ -1,5 +1,9 @@
 from .comments import reply_automatically
+from .posts import purge_deleted_posts
+from .outbox import relay_outbox
 
 __all__ = [
-    'reply_automatically'
+    'reply_automatically',
+    'purge_deleted_posts',
+    'relay_outbox',
 ]
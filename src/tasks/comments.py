@@ -3,7 +3,8 @@ import asyncio
 from asgiref.sync import async_to_sync
 
 from src.celery_worker import celery
-from src.dependencies.comments import get_comment_service
+from src.dependencies.comments import get_comment_service, task_prompt_context_cache
+from src.dependencies.posts import task_post_cache
 from src.services.comment.abstract import AbstractCommentService
 
 
@@ -19,7 +20,26 @@ def reply_automatically(comment_id: int):
 
     :param comment_id: Commentary identifier.
     """
-    comment_service: AbstractCommentService = async_to_sync(get_comment_service)()
+    async_to_sync(_reply_automatically)(comment_id)
+
+
+async def _reply_automatically(comment_id: int) -> None:
+    # The reply changes the comment counters of the post, so its cached details are invalidated
+    async with task_post_cache() as post_cache, task_prompt_context_cache() as prompt_context_cache:
+        comment_service: AbstractCommentService = await get_comment_service(
+            post_cache=post_cache, prompt_context_cache=prompt_context_cache,
+        )
+        await comment_service.auto_reply_comment(comment_id)
+
 
-    async_to_sync(comment_service.auto_reply_comment)(comment_id)
+@celery.task(name="reconcile-comment-counters")
+def reconcile_comment_counters() -> int:
+    """
+    Fixes comment counters of posts and reply counters of comments that drifted from the comments table.
+    Runs periodically with celery beat, see celery_worker.
+
+    :return: Number of fixed rows.
+    """
+    comment_service: AbstractCommentService = async_to_sync(get_comment_service)()
 
+    return async_to_sync(comment_service.reconcile_counters)()
@@ -0,0 +1,18 @@
+from asgiref.sync import async_to_sync
+
+from src.celery_worker import celery
+from src.dependencies.outbox import get_outbox_service
+from src.services.outbox.abstract import AbstractOutboxService
+
+
+@celery.task(name="relay-outbox")
+def relay_outbox() -> int:
+    """
+    Publishes the task calls written to the outbox by the API, e.g. the auto replies.
+    Runs periodically with celery beat, see celery_worker.
+
+    :return: Number of published calls.
+    """
+    outbox_service: AbstractOutboxService = async_to_sync(get_outbox_service)()
+
+    return async_to_sync(outbox_service.relay_messages)()
@@ -0,0 +1,22 @@
+from asgiref.sync import async_to_sync
+
+from src.celery_worker import celery
+from src.dependencies.posts import get_post_service, task_post_cache
+from src.services.post.abstraction import AbstractPostService
+
+
+@celery.task(name="purge-deleted-posts")
+def purge_deleted_posts() -> int:
+    """
+    Deletes the comments of large deleted posts in chunks, then the posts.
+    Scheduled when such a post is deleted and periodically by celery beat, in case a run was lost.
+
+    :return: Number of purged posts.
+    """
+    return async_to_sync(_purge_deleted_posts)()
+
+
+async def _purge_deleted_posts() -> int:
+    async with task_post_cache() as post_cache:
+        post_service: AbstractPostService = await get_post_service(post_cache=post_cache)
+        return await post_service.purge_deleted_posts()
@@ -1,8 +1,75 @@
+from datetime import datetime, timedelta, UTC
+from typing import List, Optional, Tuple
+
 from src.models.comment import Comment
+from src.models.outbox import OutboxMessage
 from src.models.post import Post
+from src.repositories.outbox.abstract import AbstractOutboxRepository
+
+# Most comments of a burst answered by one auto reply
+AUTO_REPLY_BURST_LIMIT = 10
+# How long after the auto reply to the last comment of a burst was due the earlier comments wait for it
+AUTO_REPLY_DEFER_SLACK = timedelta(minutes=1)
+
+
+async def schedule_auto_reply(outbox_repository: AbstractOutboxRepository, post: Post, comment: Comment) -> None:
+    """
+    Schedules the auto reply to the comment reply_after minutes from now. The task call is written to the outbox
+    in the transaction of the comment, the outbox relay publishes it once the transaction is committed.
+    """
+    eta = datetime.now(UTC) + timedelta(minutes=post.reply_after)
+    await outbox_repository.add(OutboxMessage(task="auto-reply", args=[comment.id], eta=eta))
+
+
+def auto_reply_skip_reason(comment: Optional[Comment]) -> Optional[str]:
+    """
+    Returns why the scheduled auto reply to the comment is no longer due, None when it is.
+    Things may have changed between the scheduling and the reply, so it's checked before the reply is generated.
+
+    :param comment: The comment with its post joined, None when the comment was deleted.
+    """
+    if comment is None:
+        return "comment_deleted"
+    if comment.blocked:
+        return "comment_blocked"
+    if comment.post.deleted_at is not None:
+        return "post_deleted"
+    if not comment.post.auto_reply:
+        return "auto_reply_off"
+    if comment.owner_id == comment.post.author_id:
+        return "own_post"
+    return None
+
+
+def burst_around(comment: Comment, around: List[Tuple[Comment, bool]],
+                 window: timedelta) -> Optional[List[Comment]]:
+    """
+    Returns the burst of comments the comment belongs to: the comments before and after it that follow each other
+    within the window, from the first one after the last answered comment. None when a later comment
+    of the burst was answered, its auto reply answered the comment too.
+
+    :param around: Comments of the same owner around the comment and whether they were answered,
+        ordered by creation time.
+    """
+    comments = [other for other, _ in around]
+    answered = {other.id for other, is_answered in around if is_answered}
+    position = next(index for index, other in enumerate(comments) if other.id == comment.id)
+
+    end = position
+    while end + 1 < len(comments) and comments[end + 1].created_at - comments[end].created_at <= window:
+        end += 1
+        if comments[end].id in answered:
+            return None
+
+    start = position
+    while (start > 0 and comments[start].created_at - comments[start - 1].created_at <= window
+           and comments[start - 1].id not in answered):
+        start -= 1
+    return comments[start:end + 1]
 
-def schedule_auto_reply(post: Post, comment: Comment):
-    from src.tasks.comments import reply_automatically
 
-    countdown = post.reply_after * 60
-    return reply_automatically.apply_async((comment.id, ), countdown=countdown)
+async def defer_auto_reply(outbox_repository: AbstractOutboxRepository, comment: Comment, eta: datetime) -> None:
+    """
+    Schedules the auto reply to the comment again, for when the last comment of its burst should have been answered.
+    """
+    await outbox_repository.add(OutboxMessage(task="auto-reply", args=[comment.id], eta=eta))
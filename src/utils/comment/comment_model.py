@@ -1,12 +1,20 @@
+from typing import Optional
+
 from src.models.comment import Comment
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 from src.schemes.comment.create import CreateCommentSchema
+from src.utils.comment.comment_path import child_path
 
 
-def create_comment_from_schema(user: User, create_comment_schema: CreateCommentSchema) -> Comment:
+def create_comment_from_schema(user: PrincipalDTO, create_comment_schema: CreateCommentSchema,
+                               parent: Optional[Comment] = None) -> Comment:
+    """
+    :param parent: Parent comment loaded from the database, its path is extended with its id.
+    """
     return Comment(
-        owner=user,
+        owner_id=user.id,
         content=create_comment_schema.content,
         post_id=create_comment_schema.post_id,
         parent_id=create_comment_schema.parent_id,
+        path=child_path(parent),
     )
\ No newline at end of file
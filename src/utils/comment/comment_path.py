@@ -0,0 +1,25 @@
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.models.comment import Comment
+
+# Path of top level comments
+ROOT_PATH = "/"
+# Ids are zero-padded, so the paths sort like the ids and the depth follows from the length of the path
+PATH_ID_WIDTH = 10
+PATH_SEGMENT_LENGTH = PATH_ID_WIDTH + 1
+
+
+def path_segment(comment_id: int) -> str:
+    return f"{comment_id:0{PATH_ID_WIDTH}d}/"
+
+
+def child_path(parent: Optional["Comment"]) -> str:
+    """
+    Returns the path of a new comment: the ids of all its ancestors from the top level comment down to the parent.
+
+    :param parent: Parent comment, None for a top level comment.
+    """
+    if parent is None:
+        return ROOT_PATH
+    return parent.path + path_segment(parent.id)
@@ -1,6 +1,6 @@
 from src.models.comment import Comment
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 
 
-def is_user_owner_of_comment(user: User, comment: Comment):
+def is_user_owner_of_comment(user: PrincipalDTO, comment: Comment):
     return user.id == comment.owner_id
@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from src.dto.validator import ValidatorDTO
+
+
+def make_etag(validator: ValidatorDTO) -> str:
+    """
+    Weak ETag of the validator state, equal states give equal responses but not necessarily equal bytes.
+    """
+    digest = hashlib.blake2b(repr(validator.state).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # The weak comparison ignores the W/ prefix
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    # HTTP dates have a precision of one second
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(request: Request, validator: ValidatorDTO) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since when the request has no If-None-Match (RFC 9110, 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, make_etag(validator))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        return _not_modified_since(if_modified_since, validator.last_modified)
+
+    return False
+
+
+def check_not_modified(request: Request, response: Response, validator: Optional[ValidatorDTO],
+                       cache_control: str = "no-cache") -> None:
+    """
+    Sets ETag and Last-Modified of the response, raises 304 Not Modified when the copy of the client is fresh.
+    Call it before loading the response, a request without a validator (e.g. 404) is handled as usual.
+
+    :param cache_control: Caches may store the response, but must revalidate it before every use.
+    """
+    if validator is None:
+        return
+
+    headers = {"ETag": make_etag(validator), "Cache-Control": cache_control}
+    if validator.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(validator.last_modified.astimezone(UTC), usegmt=True)
+
+    if is_not_modified(request, validator):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
@@ -1,5 +1,6 @@
 import httpx
 from .abstract import AbstractContentModerator
+from src.core.metrics import track_external_call
 from src.core.configs.content_moderator_config import ContentModeratorConfig
 
 
@@ -26,8 +27,9 @@ class ContentModerator(AbstractContentModerator):
 
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.post(url, data=data)
-                response_data = response.json()
+                with track_external_call("sightengine", "moderate_text"):
+                    response = await client.post(url, data=data)
+                    response_data = response.json()
 
                 if response_data.get('status') == 'success':
                     moderation_classes = response_data.get('moderation_classes', {})
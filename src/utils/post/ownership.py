@@ -1,6 +1,6 @@
 from src.models.post import Post
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 
 
-def is_user_owner_of_post(user: User, post: Post):
+def is_user_owner_of_post(user: PrincipalDTO, post: Post):
     return user.id == post.author_id
\ No newline at end of file
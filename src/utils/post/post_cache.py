@@ -0,0 +1,72 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from src.dto.post import PostWithAuthorDTO, AuthorDTO, PostDTO
+from src.dto.validator import ValidatorDTO
+from src.utils.cache import TTLCache
+from src.utils.tiered_cache import TieredCache
+
+
+class PostCacheEntry:
+    """
+    The details of the post and their validator, cached together so a conditional GET of a cached post
+    doesn't query the database at all.
+    """
+    __slots__ = ("details", "validator")
+
+    def __init__(self, details: PostWithAuthorDTO, validator: ValidatorDTO):
+        self.details = details
+        self.validator = validator
+
+
+def _encode(value):
+    return {"datetime": value.isoformat()} if isinstance(value, datetime) else value
+
+
+def _decode(value):
+    return datetime.fromisoformat(value["datetime"]) if isinstance(value, dict) else value
+
+
+def dump_entry(entry: PostCacheEntry) -> str:
+    details, validator = entry.details, entry.validator
+    return json.dumps({
+        "post": [_encode(getattr(details, column)) for column in PostDTO.__slots__],
+        "author": [details.author.first_name, details.author.last_name],
+        "last_modified": _encode(validator.last_modified),
+        "state": [_encode(value) for value in validator.state],
+    })
+
+
+def load_entry(raw: str) -> PostCacheEntry:
+    data = json.loads(raw)
+    return PostCacheEntry(
+        details=PostWithAuthorDTO(*map(_decode, data["post"]), author=AuthorDTO(*data["author"])),
+        validator=ValidatorDTO(_decode(data["last_modified"]), tuple(map(_decode, data["state"]))),
+    )
+
+
+def make_post_cache(redis_url: Optional[str], size: int, ttl: int,
+                    lock_seconds: float = 0) -> TieredCache[PostCacheEntry]:
+    """
+    Cache of PostCacheEntry by post id. Without redis_url the cache lives in the process only.
+
+    :param size: Max number of posts cached in the process.
+    :param ttl: Lifetime of the entries in both tiers (in seconds).
+    :param lock_seconds: Lifetime of the lock that lets one process load a missed post, 0 turns the lock off.
+    """
+    client = aioredis.from_url(redis_url, decode_responses=True) if redis_url else None
+    return TieredCache(
+        "post_details", TTLCache(max_size=size, ttl=ttl), client, ttl, dumps=dump_entry, loads=load_entry,
+        lock_seconds=lock_seconds,
+    )
+
+
+async def invalidate_posts(post_cache: Optional[TieredCache[PostCacheEntry]], *post_ids: int) -> None:
+    """
+    Drops the cached posts in all processes, call it after the change is committed.
+    """
+    if post_cache is not None:
+        await post_cache.invalidate(*(str(post_id) for post_id in post_ids))
@@ -1,15 +1,15 @@
 from src.models.post import Post
-from src.models.user import User
+from src.dto.user import PrincipalDTO
 from src.schemes.post.create import PostCreateSchema
 from src.schemes.post.update import UpdatePostSchema
 
 
-def create_post_from_schema(user: User, create_post_data: PostCreateSchema) -> Post:
+def create_post_from_schema(user: PrincipalDTO, create_post_data: PostCreateSchema) -> Post:
     return Post(
             title=create_post_data.title,
             content=create_post_data.content,
             draft=create_post_data.draft,
-            author=user,
+            author_id=user.id,
             auto_reply=create_post_data.auto_reply,
             reply_after=create_post_data.reply_after,
         )
@@ -0,0 +1,123 @@
+import json
+import math
+from typing import List, Optional
+
+import redis.asyncio as aioredis
+
+from src.models.post import Post
+from src.utils.cache import TTLCache
+from src.utils.tiered_cache import TieredCache
+
+# Rough number of characters per token of the reply generator, the prompts are budgeted with it
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARK = " [...]"
+
+
+class PromptContext:
+    """
+    The condensed post the auto reply prompts of its comments start with, and the version of the post
+    it was condensed from. An entry of an older version is condensed again.
+    """
+    __slots__ = ("version", "text")
+
+    def __init__(self, version: str, text: str):
+        self.version = version
+        self.text = text
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Returns the text cut to about max_tokens, at the last sentence or word boundary that fits.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARK), 0)
+    cut = text[:limit]
+    # A sentence boundary in the second half of the cut, a word boundary otherwise
+    boundary = max(cut.rfind(". "), cut.rfind(".\n"))
+    if boundary >= limit // 2:
+        return cut[:boundary + 1] + TRUNCATION_MARK
+    boundary = max(cut.rfind(" "), cut.rfind("\n"))
+    return (cut[:boundary] if boundary > 0 else cut).rstrip() + TRUNCATION_MARK
+
+
+def post_version(post: Post) -> str:
+    # updated_at changes with the title and the content only, the comment counters keep it
+    return post.updated_at.isoformat()
+
+
+def condense_post(post: Post, max_tokens: int) -> PromptContext:
+    """
+    Condenses the post to the title and as much of the text as fits into max_tokens.
+    """
+    title = f"Post Title: {post.title}\n"
+    text = truncate_to_tokens(post.content, max(max_tokens - estimate_tokens(title + "Post Text: \n\n"), 0))
+    return PromptContext(post_version(post), f"{title}Post Text: {text}\n\n")
+
+
+def fit_comments(comments: List[str], max_tokens: int) -> List[str]:
+    """
+    Returns the latest comments that fit into max_tokens, the last one is kept and cut when it alone doesn't fit.
+
+    :param comments: Texts of the comments, ordered by creation time.
+    """
+    fitted = [truncate_to_tokens(comments[-1], max_tokens)]
+    budget = max_tokens - estimate_tokens(fitted[0])
+    for comment in reversed(comments[:-1]):
+        budget -= estimate_tokens(comment)
+        if budget < 0:
+            break
+        fitted.insert(0, comment)
+    return fitted
+
+
+def dump_context(context: PromptContext) -> str:
+    return json.dumps([context.version, context.text])
+
+
+def load_context(raw: str) -> PromptContext:
+    return PromptContext(*json.loads(raw))
+
+
+def make_prompt_context_cache(redis_url: Optional[str], size: int, ttl: int) -> TieredCache[PromptContext]:
+    """
+    Cache of PromptContext by post id. Without redis_url the cache lives in the process only.
+
+    :param size: Max number of posts cached in the process.
+    :param ttl: Lifetime of the entries in both tiers (in seconds).
+    """
+    client = aioredis.from_url(redis_url, decode_responses=True) if redis_url else None
+    return TieredCache(
+        "post_prompt_context", TTLCache(max_size=size, ttl=ttl), client, ttl, dumps=dump_context, loads=load_context,
+    )
+
+
+async def get_prompt_context(cache: Optional[TieredCache[PromptContext]], post: Post,
+                             max_tokens: int) -> PromptContext:
+    """
+    Returns the condensed post, it's condensed once per version of the post while it's cached.
+    """
+    if cache is None:
+        return condense_post(post, max_tokens)
+
+    async def condense() -> PromptContext:
+        return condense_post(post, max_tokens)
+
+    context = await cache.get_or_load(str(post.id), condense)
+    if context.version != post_version(post):
+        # Cached before the post was updated in a process the invalidation didn't reach
+        await cache.invalidate(str(post.id))
+        context = await cache.get_or_load(str(post.id), condense)
+    return context
+
+
+async def invalidate_prompt_contexts(cache: Optional[TieredCache[PromptContext]], *post_ids: int) -> None:
+    """
+    Drops the condensed posts, call it after the change of the posts is committed.
+    """
+    if cache is not None:
+        await cache.invalidate(*(str(post_id) for post_id in post_ids))
@@ -0,0 +1,12 @@
+from typing import Optional
+
+from src.utils.task_queue import TaskEnqueuer
+
+
+def schedule_posts_purge(task_enqueuer: Optional[TaskEnqueuer]) -> None:
+    """
+    Asks the workers to purge the deleted posts now. The call doesn't wait for the broker,
+    and celery beat runs the purge periodically anyway.
+    """
+    if task_enqueuer is not None:
+        task_enqueuer.enqueue("purge-deleted-posts")
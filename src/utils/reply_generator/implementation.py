@@ -1,5 +1,6 @@
 import google.generativeai as genai
 from src.core.configs.reply_generator_config import generation_config, chat_history
+from src.core.metrics import track_external_call
 from src.core.settings import settings
 
 
@@ -20,5 +21,6 @@ class ReplyGenerator(AbstractReplyGenerator):
 
     async def generate_reply(self, prompt: str) -> str:
         chat_session = self.model.start_chat(history=chat_history)
-        response = await chat_session.send_message_async(prompt)
+        with track_external_call("gemini", "generate_reply"):
+            response = await chat_session.send_message_async(prompt)
         return response.text
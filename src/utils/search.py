@@ -0,0 +1,39 @@
+import base64
+import json
+from typing import Optional, Tuple, Sequence, Union
+
+from fastapi import HTTPException, status
+
+from src.dto.search import SearchPageDTO, PostSearchHitDTO, CommentSearchHitDTO
+
+# Position after the last hit of a page: (rank, id)
+SearchPosition = Tuple[float, int]
+
+
+def encode_cursor(position: SearchPosition) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[SearchPosition]:
+    """
+    :raises HTTPException: 400 if the cursor wasn't produced by encode_cursor.
+    """
+    if cursor is None:
+        return None
+    try:
+        rank, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def make_search_page(hits: Sequence[Union[PostSearchHitDTO, CommentSearchHitDTO]], limit: int) -> SearchPageDTO:
+    """
+    Builds the page from limit + 1 hits, the extra hit only tells that there's a next page.
+    """
+    items = hits[:limit]
+    next_cursor = encode_cursor((items[-1].rank, items[-1].id)) if len(hits) > limit else None
+    return SearchPageDTO(items=items, next_cursor=next_cursor)
@@ -0,0 +1,89 @@
+import asyncio
+from typing import Dict, Hashable, Tuple, TypeVar, Callable, Awaitable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.core.database import routing_state
+from src.core.metrics import registry
+
+T = TypeVar("T")
+
+coalesced_calls = registry.counter(
+    "coalesced_calls", "Calls that shared the result of an identical call in flight.", labelnames=("name", ),
+)
+
+# Number of transactions committed by the process
+_commits = 0
+
+
+def _count_commit(session: Session) -> None:
+    global _commits
+    _commits += 1
+
+
+if not event.contains(Session, "after_commit", _count_commit):
+    event.listen(Session, "after_commit", _count_commit)
+
+
+def _reads_from_replica() -> bool:
+    state = routing_state.get()
+    return state is not None and state.use_replica
+
+
+class SingleFlight:
+    """
+    Runs concurrent calls with the same key once, the callers that arrive while the call is in flight
+    share its result or its exception. Only the calls of the current process are coalesced.
+
+    The result is shared as is, so it must not be mutated by the callers. A caller joins only the calls
+    started after the last commit of the process, and a call reading from the replicas isn't shared
+    with a request that has to read its own writes from the primary.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Name of the calls in the metrics.
+        """
+        self._name = name
+        self._calls: Dict[Tuple[bool, int, Hashable], asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        key = (_reads_from_replica(), _commits, key)
+
+        while (future := self._calls.get(key)) is not None:
+            coalesced_calls.labels(self._name).inc()
+            try:
+                # A cancelled caller doesn't cancel the call the others wait for
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller running the call was cancelled (e.g. its client disconnected), the next one takes over
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+        except Exception as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved, nobody may be waiting for it
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+async def coalesce(single_flight: Optional[SingleFlight], key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+    """
+    Runs the call through single_flight, or just runs it when single_flight is None.
+    """
+    if single_flight is None:
+        return await call()
+    return await single_flight.do(key, call)
@@ -8,4 +8,13 @@ def to_camel_case(string: str):
     :param string: Input string.
     """
     ret = sub(r"(_|-)+", " ", string).title().replace(" ", "")
-    return ''.join([ret[0].lower(), ret[1:]])
\ No newline at end of file
+    return ''.join([ret[0].lower(), ret[1:]])
+
+
+def escape_like(string: str) -> str:
+    """
+    Escapes the wildcards of a LIKE pattern with backslashes, so they match literally.
+
+    :param string: Input string.
+    """
+    return string.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
\ No newline at end of file
@@ -0,0 +1,240 @@
+import asyncio
+import fcntl
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from src.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+enqueued_tasks = registry.counter(
+    "enqueued_tasks", "Celery tasks enqueued by the process, by what happened to them.", labelnames=("result", ),
+)
+
+
+class BrokerUnavailable(Exception):
+    pass
+
+
+class TaskMessage:
+    """
+    A task call waiting to be sent to the broker. The countdown is kept as an absolute ETA,
+    so a spilled call still runs at the time it was scheduled for.
+    """
+    __slots__ = ("name", "args", "eta")
+
+    def __init__(self, name: str, args: tuple, eta: Optional[datetime] = None):
+        self.name = name
+        self.args = args
+        self.eta = eta
+
+
+def dump_messages(messages: Sequence[TaskMessage]) -> str:
+    return json.dumps([
+        [message.name, list(message.args), message.eta.isoformat() if message.eta else None] for message in messages
+    ])
+
+
+def load_messages(raw: str) -> List[TaskMessage]:
+    return [
+        TaskMessage(name, tuple(args), datetime.fromisoformat(eta) if eta else None)
+        for name, args, eta in json.loads(raw)
+    ]
+
+
+class SpillBuffer:
+    """
+    Batches the broker didn't take, one file per batch in a directory the processes of the host share.
+    A batch is replayed under an exclusive lock of its file, so it's sent by one process,
+    and a process dying while replaying releases the lock, the batch stays for the next replay.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+    def write(self, messages: Sequence[TaskMessage]) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json"
+        # Written under a hidden name and renamed, so a replay never reads a partial batch
+        temporary = os.path.join(self._directory, f".{name}")
+        with open(temporary, "w") as file:
+            file.write(dump_messages(messages))
+        os.replace(temporary, os.path.join(self._directory, name))
+
+    def replay_one(self, send: Callable[[List[TaskMessage]], None]) -> Optional[int]:
+        """
+        Sends the oldest batch nobody else is replaying and deletes it.
+
+        :return: Number of the sent messages, None when no batch is left.
+        """
+        try:
+            names = sorted(name for name in os.listdir(self._directory) if not name.startswith("."))
+        except FileNotFoundError:
+            return None
+
+        for name in names:
+            path = os.path.join(self._directory, name)
+            try:
+                file = open(path)
+            except FileNotFoundError:
+                continue
+            with file:
+                try:
+                    fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                # Replayed and deleted by another process between listing and locking
+                if os.fstat(file.fileno()).st_nlink == 0:
+                    continue
+                try:
+                    messages = load_messages(file.read())
+                except ValueError:
+                    logger.error("Spilled batch %s is corrupted, it's kept as .%s", name, name)
+                    os.replace(path, os.path.join(self._directory, f".{name}"))
+                    continue
+                send(messages)
+                os.unlink(path)
+                return len(messages)
+
+        return None
+
+
+class TaskEnqueuer:
+    """
+    Sends task calls to the broker without blocking the event loop.
+
+    The calls are collected and sent in batches, each batch within a timeout, by a small thread pool of the enqueuer,
+    so sends hung on the broker don't take the threads of the default executor. A batch the broker
+    doesn't take in time is spilled to the SpillBuffer, the broker is skipped for retry_after seconds,
+    and the spilled batches are sent again once it takes calls. A timed out batch may still reach the broker
+    and be sent again, so the tasks have to tolerate running twice.
+    """
+
+    def __init__(self, send_batch: Callable[[List[TaskMessage]], None], spill: SpillBuffer, batch_size: int = 100,
+                 timeout: float = 5.0, linger_seconds: float = 0.01, retry_after: float = 30.0,
+                 max_threads: int = 2):
+        """
+        :param send_batch: Sends the messages to the broker, it's called in a thread.
+        :param batch_size: Max number of messages sent at once.
+        :param timeout: How long a batch may take (in seconds) before it's spilled.
+        :param linger_seconds: How long the first call of a batch waits for the calls of concurrent requests.
+        :param retry_after: How long the broker is skipped after a failure (in seconds),
+            and how often the spilled batches are checked for.
+        :param max_threads: Threads sending to the broker. A send that timed out keeps its thread
+            until the broker connection times out too, the later sends wait for a free one.
+        """
+        self._send_batch = send_batch
+        self._spill = spill
+        self._batch_size = batch_size
+        self._timeout = timeout
+        self._linger_seconds = linger_seconds
+        self._retry_after = retry_after
+        self._pending: List[TaskMessage] = []
+        self._wakeup = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+        self._skip_broker_until = 0.0
+        self._next_replay = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="task-enqueuer")
+
+    def enqueue(self, name: str, args: Sequence = (), countdown: float = 0) -> None:
+        """
+        Schedules the call of the task, it returns right away and is sent with the next batch.
+
+        :param name: Name of the registered task.
+        :param countdown: Delay of the call (in seconds).
+        """
+        eta = datetime.now(UTC) + timedelta(seconds=countdown) if countdown else None
+        self._pending.append(TaskMessage(name, tuple(args), eta))
+        self.start()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.create_task(self._run(), name="task-enqueuer")
+
+    async def stop(self) -> None:
+        """
+        Stops the sender and sends, or spills, the calls enqueued so far.
+        """
+        if self._sender is not None:
+            self._sender.cancel()
+            try:
+                await self._sender
+            except asyncio.CancelledError:
+                pass
+            self._sender = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending[:self._batch_size], self._pending[self._batch_size:]
+            try:
+                await self._call_broker(self._send_batch, batch)
+            except BrokerUnavailable:
+                await asyncio.to_thread(self._spill.write, batch)
+                enqueued_tasks.labels("spilled").inc(len(batch))
+            else:
+                enqueued_tasks.labels("sent").inc(len(batch))
+
+    async def replay(self) -> None:
+        """
+        Sends the spilled batches until none is left or the broker fails.
+        """
+        while True:
+            try:
+                replayed = await self._call_broker(self._spill.replay_one, self._send_batch)
+            except BrokerUnavailable:
+                return
+            if replayed is None:
+                return
+            enqueued_tasks.labels("replayed").inc(replayed)
+
+    async def _call_broker(self, call: Callable[..., T], *args) -> T:
+        """
+        Runs the call in a thread within the timeout, after a failure the broker is skipped for retry_after seconds.
+        """
+        if time.monotonic() < self._skip_broker_until:
+            raise BrokerUnavailable()
+        try:
+            running = asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(call, *args))
+            return await asyncio.wait_for(running, self._timeout)
+        except Exception as e:
+            logger.warning("Couldn't send tasks to the broker, spilling them for %s seconds: %r", self._retry_after, e)
+            self._skip_broker_until = time.monotonic() + self._retry_after
+            raise BrokerUnavailable() from e
+
+    async def _run(self) -> None:
+        while True:
+            # Batches spilled before, e.g. while the broker was down or by a previous run of the process
+            if time.monotonic() >= self._next_replay:
+                self._next_replay = time.monotonic() + self._retry_after
+                await self.replay()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._retry_after)
+            except TimeoutError:
+                continue
+            self._wakeup.clear()
+            # Lets the calls of concurrent requests join the batch
+            await asyncio.sleep(self._linger_seconds)
+            await self.flush()
+
+
+def send_to_celery(messages: List[TaskMessage]) -> None:
+    """
+    Publishes the messages over one broker connection.
+    """
+    from src.celery_worker import celery
+
+    with celery.producer_or_acquire() as producer:
+        for message in messages:
+            # Fails right away when the broker is down instead of retrying the connection
+            celery.send_task(message.name, args=message.args, eta=message.eta, producer=producer, retry=False)
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Generic, TypeVar, Optional, Callable, Awaitable, List, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+from src.core.metrics import registry, Metric, Gauge, Sample
+from src.utils.cache import TTLCache
+from src.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# How often a process waiting for the value loaded by another process checks Redis
+LOCK_POLL_SECONDS = 0.05
+# Stores a loaded value only when the key wasn't invalidated since the load started,
+# KEYS are the value and its version, ARGV the version read before the load, the value and its TTL
+SET_IF_VERSION = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+cache_requests = registry.counter(
+    "cache_requests", "Lookups of the read caches per tier.", labelnames=("cache", "tier", "result"),
+)
+cache_errors = registry.counter("cache_errors", "Failed calls to the shared cache tier.", labelnames=("cache", ))
+# Computed from cache_requests at scrape time
+cache_hit_ratio = Gauge("cache_hit_ratio", "Share of the lookups served by the tier since the process started.",
+                        ("cache", "tier"))
+
+
+def _hit_ratios() -> List[Tuple[Metric, List[Sample]]]:
+    totals = {}
+    for _, labels, value in cache_requests.samples():
+        hits, lookups = totals.get((labels["cache"], labels["tier"]), (0.0, 0.0))
+        totals[(labels["cache"], labels["tier"])] = (hits + value * (labels["result"] == "hit"), lookups + value)
+    samples = [
+        ("", {"cache": cache, "tier": tier}, hits / lookups)
+        for (cache, tier), (hits, lookups) in totals.items() if lookups
+    ]
+    return [(cache_hit_ratio, samples)]
+
+
+registry.register_collector(_hit_ratios)
+
+
+class TieredCache(Generic[V]):
+    """
+    Read-through cache with an in-process LRU tier in front of a Redis tier shared by all processes.
+
+    Invalidations delete the Redis entries and are broadcast on a pub/sub channel, every process that listens
+    drops the entries from its own tier. The in-process tier is used only while the process is subscribed,
+    so a process that may miss invalidations reads from Redis. Without Redis the in-process tier is used alone
+    and invalidations reach only the current process.
+
+    When Redis fails, it's skipped for retry_after seconds and the values are loaded from the source.
+
+    A miss is loaded once per process, and with lock_seconds once per cluster.
+
+    Every invalidation bumps a version of the key in Redis. A loaded value is stored only when the version is still
+    the one read before the load, so a load that overlapped an invalidation by any process doesn't store stale data.
+    """
+
+    def __init__(self, name: str, local: TTLCache, client: Optional[aioredis.Redis], ttl: int,
+                 dumps: Callable[[V], str], loads: Callable[[str], V], retry_after: float = 5.0,
+                 lock_seconds: float = 0):
+        """
+        :param name: Name of the cache in the Redis keys and in the metrics.
+        :param local: The in-process tier.
+        :param client: Redis client with decode_responses, None turns the shared tier off.
+        :param ttl: Lifetime of the Redis entries (in seconds), it bounds how stale a missed invalidation leaves them.
+        :param dumps: Serializes a value for Redis.
+        :param loads: Deserializes a value read from Redis.
+        :param retry_after: How long Redis is skipped after a failure (in seconds).
+        :param lock_seconds: Lifetime of the lock that lets one process of the cluster load a missing value
+            while the others wait for it, 0 turns the lock off. It should exceed the duration of the load.
+        """
+        self._name = name
+        self._local = local
+        self._client = client
+        self._ttl = ttl
+        self._dumps = dumps
+        self._loads = loads
+        self._retry_after = retry_after
+        self._lock_seconds = lock_seconds
+        self._flights = SingleFlight(name)
+        self._channel = f"cache:{name}:invalidations"
+        self._subscribed = False
+        self._down_until = 0.0
+        # Incremented by every invalidation, a load that overlapped one doesn't store its value
+        self._generation = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self._name}:{key}"
+
+    def _version_key(self, key: str) -> str:
+        return self._key(f"{key}:version")
+
+    def _count(self, tier: str, hit: bool) -> None:
+        cache_requests.labels(self._name, tier, "hit" if hit else "miss").inc()
+
+    @property
+    def _local_enabled(self) -> bool:
+        return self._client is None or self._subscribed
+
+    @property
+    def _shared_enabled(self) -> bool:
+        return self._client is not None and time.monotonic() >= self._down_until
+
+    def _shared_failed(self, e: Exception) -> None:
+        cache_errors.labels(self._name).inc()
+        self._down_until = time.monotonic() + self._retry_after
+        logger.warning("Shared tier of the %s cache failed, skipping it for %ss: %s", self._name, self._retry_after, e)
+
+    async def _get_shared(self, key: str) -> Tuple[Optional[V], Optional[str]]:
+        """
+        Returns the value from Redis and the version of the key, None for both when Redis is skipped.
+        """
+        if not self._shared_enabled:
+            return None, None
+        try:
+            raw, version = await self._client.mget(self._key(key), self._version_key(key))
+        except (redis.RedisError, OSError) as e:
+            self._shared_failed(e)
+            return None, None
+        self._count("redis", raw is not None)
+        return self._loads(raw) if raw is not None else None, version or ""
+
+    async def _load_from_source(self, key: str, load: Callable[[], Awaitable[Optional[V]]],
+                                generation: int, version: Optional[str]) -> Optional[V]:
+        value = await load()
+        if value is None or generation != self._generation or version is None or not self._shared_enabled:
+            return value
+        try:
+            await self._client.eval(
+                SET_IF_VERSION, 2, self._key(key), self._version_key(key), version, self._dumps(value), self._ttl,
+            )
+        except (redis.RedisError, OSError) as e:
+            self._shared_failed(e)
+        return value
+
+    async def _load_once_in_cluster(self, key: str, load: Callable[[], Awaitable[Optional[V]]],
+                                    generation: int, version: Optional[str]) -> Optional[V]:
+        """
+        Loads the value in the process that takes the load lock, the others wait for it to appear in Redis.
+        """
+        if not self._lock_seconds or not self._shared_enabled:
+            return await self._load_from_source(key, load, generation, version)
+
+        lock_key = self._key(f"{key}:lock")
+        try:
+            acquired = await self._client.set(lock_key, "1", nx=True, px=int(self._lock_seconds * 1000))
+        except (redis.RedisError, OSError) as e:
+            self._shared_failed(e)
+            return await self._load_from_source(key, load, generation, version)
+
+        if acquired:
+            try:
+                return await self._load_from_source(key, load, generation, version)
+            finally:
+                # Released even when the lock expired and was taken by another process, which costs one extra load
+                try:
+                    await self._client.delete(lock_key)
+                except (redis.RedisError, OSError) as e:
+                    self._shared_failed(e)
+
+        # The lock expires, so a crashed loader delays the others by lock_seconds at most
+        deadline = time.monotonic() + self._lock_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+            value, _ = await self._get_shared(key)
+            if value is not None:
+                self._count("lock", True)
+                return value
+            try:
+                # Released without a value, e.g. load returned None
+                if not self._shared_enabled or not await self._client.exists(lock_key):
+                    break
+            except (redis.RedisError, OSError) as e:
+                self._shared_failed(e)
+                break
+        self._count("lock", False)
+        return await self._load_from_source(key, load, generation, version)
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        generation = self._generation
+        value, version = await self._get_shared(key)
+        if value is None:
+            value = await self._load_once_in_cluster(key, load, generation, version)
+
+        if value is not None and self._local_enabled and generation == self._generation:
+            self._local.set(key, value)
+        return value
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        """
+        Returns the cached value, or loads and caches it. None returned by load isn't cached.
+        Concurrent misses of the key in the process share one load.
+        """
+        if self._local_enabled:
+            value = self._local.get(key)
+            self._count("local", value is not None)
+            if value is not None:
+                return value
+
+        return await self._flights.do(key, lambda: self._load(key, load))
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Drops the entries from all tiers of all processes.
+        """
+        if not keys:
+            return
+        self._drop_local(keys)
+        if self._client is None:
+            return
+        try:
+            async with self._client.pipeline(transaction=False) as pipeline:
+                pipeline.delete(*(self._key(key) for key in keys))
+                for key in keys:
+                    # Outlives the loads that started before, a version that expired fails their check too
+                    pipeline.incr(self._version_key(key))
+                    pipeline.expire(self._version_key(key), self._ttl)
+                pipeline.publish(self._channel, json.dumps(keys))
+                await pipeline.execute()
+        except (redis.RedisError, OSError) as e:
+            # The other processes serve their entries until they expire
+            self._shared_failed(e)
+
+    def _drop_local(self, keys) -> None:
+        self._generation += 1
+        for key in keys:
+            self._local.delete(key)
+
+    async def listen(self) -> None:
+        """
+        Applies the invalidations broadcast by the other processes, reconnects when the subscription fails.
+        """
+        while True:
+            try:
+                async with self._client.pubsub() as pubsub:
+                    await pubsub.subscribe(self._channel)
+                    # Invalidations sent while the process wasn't subscribed are lost
+                    self._local.clear()
+                    self._subscribed = True
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._drop_local(json.loads(message["data"]))
+            except (redis.RedisError, OSError) as e:
+                logger.warning("Lost the invalidations of the %s cache, reconnecting: %s", self._name, e)
+            finally:
+                self._subscribed = False
+            await asyncio.sleep(self._retry_after)
+
+    def start(self) -> None:
+        if self._client is not None and self._listener is None:
+            self._listener = asyncio.create_task(self.listen(), name=f"{self._name}-cache-invalidations")
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def close(self) -> None:
+        """
+        Stops the listener and closes the Redis client, for caches that live as long as one event loop.
+        """
+        await self.stop()
+        if self._client is not None:
+            await self._client.aclose()
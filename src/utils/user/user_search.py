@@ -0,0 +1,12 @@
+# Shorter queries match too many users to be useful for autocomplete
+USER_SEARCH_MIN_LENGTH = 2
+
+
+def normalize_user_query(query: str) -> str:
+    """
+    Turns what the user typed after "@" into the query of the user lookup.
+    The lookup is case-insensitive, so the query is lowercased to share the cache entries.
+
+    :param query: Raw query, e.g. "@Jo".
+    """
+    return " ".join(query.lstrip().lstrip("@").split()).lower()
@@ -1,9 +1,11 @@
 import pytest
+from dependency_injector import providers
 from fastapi import status
 from httpx import AsyncClient
 
-from src.schemes.auth.token_data import RefreshTokenRequest
+from src.schemes.auth.token_data import RefreshTokenRequest, AuthTokens
 from src.models.user import User
+from src.services.auth.implementation import AuthServiceImplementation
 
 
 class TestAuthService:
@@ -81,3 +83,52 @@ class TestAuthService:
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
         assert response.json()["detail"] == "Could not validate credentials"
+
+
+@pytest.fixture
+def stateless_auth(async_client: AsyncClient):
+    container = async_client._transport.app.container
+    container.token_version_cache().clear()
+    with container.auth_service.override(providers.Factory(
+        AuthServiceImplementation,
+        jwt_handler=container.jwt_handler, uow=container.unit_of_work,
+        token_versions=container.token_version_cache, stateless=True,
+    )):
+        yield
+
+
+class TestStatelessAuth:
+
+    @pytest.mark.asyncio
+    async def test_principal_without_user_query(self, async_client: AsyncClient, tokens: AuthTokens,
+                                                stateless_auth, assert_max_queries):
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+        # Caches the token version
+        await async_client.get("/api/v1/posts/me", headers=headers)
+
+        # The validator of the conditional GET and the posts
+        with assert_max_queries(2):
+            response = await async_client.get("/api/v1/posts/me", headers=headers)
+        assert response.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_password_change_revokes_tokens(self, async_client: AsyncClient, async_db_engine, stateless_auth):
+        response = await async_client.post("/api/v1/users/signup", json={
+            "email": "stateless@email.com", "first_name": "Sam", "last_name": "Less",
+            "date_of_birth": "1990-01-01", "password1": "some_pwd", "password2": "some_pwd",
+        })
+        assert response.status_code == 201
+        response = await async_client.post("/api/v1/auth/token",
+                                           data={"username": "stateless@email.com", "password": "some_pwd"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        assert (await async_client.get("/api/v1/posts/me", headers=headers)).status_code == 200
+
+        response = await async_client.put(
+            "/api/v1/users/change-password", headers=headers,
+            json={"old_password": "some_pwd", "new_password1": "new_password123", "new_password2": "new_password123"},
+        )
+        assert response.status_code == 204
+
+        response = await async_client.get("/api/v1/posts/me", headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.json()["detail"] == "Token revoked"
@@ -0,0 +1,77 @@
+from collections import Counter
+
+from benchmarks.dataset import DatasetConfig, SyntheticDataset, zipf_counts, COMMENT_COLUMNS
+from benchmarks.generate import plan_comment_chunks
+from benchmarks.report import LatencyRecorder, compare
+
+
+def build_dataset(seed: int = 1) -> SyntheticDataset:
+    config = DatasetConfig(users=50, posts=20, comments=500, mean_likes_per_comment=3, seed=seed)
+    return SyntheticDataset(config, password_hash="hash")
+
+
+class TestSyntheticDataset:
+
+    def test_dataset_is_deterministic(self):
+        first, second, other = build_dataset(), build_dataset(), build_dataset(seed=2)
+
+        assert list(first.posts()) == list(second.posts())
+        assert first.comments_and_likes(3) == second.comments_and_likes(3)
+        assert list(first.posts()) != list(other.posts())
+
+    def test_comment_trees_and_like_counts_are_consistent(self):
+        dataset = build_dataset()
+        likes_column = COMMENT_COLUMNS.index("likes")
+        path_column = COMMENT_COLUMNS.index("path")
+
+        comment_ids = set()
+        paths = {}
+        for post_index in range(dataset.config.posts):
+            comments, likes = dataset.comments_and_likes(post_index)
+            likes_per_comment = Counter(comment_id for comment_id, _, _ in likes)
+            for comment in comments:
+                comment_id, parent_id = comment[0], comment[5]
+                # Parents are generated before their replies
+                assert parent_id is None or parent_id in comment_ids
+                assert comment[likes_column] == likes_per_comment[comment_id]
+                # The path of a reply extends the path of its parent with the id of the parent
+                expected_path = "/" if parent_id is None else f"{paths[parent_id]}{parent_id:010d}/"
+                assert comment[path_column] == expected_path
+                paths[comment_id] = comment[path_column]
+                comment_ids.add(comment_id)
+            # A user likes a comment at most once
+            assert len(likes) == len({(comment_id, owner_id) for comment_id, owner_id, _ in likes})
+
+        assert comment_ids == set(range(1, 501))
+
+    def test_zipf_counts(self):
+        counts = zipf_counts(1000, 10, 1.1)
+
+        assert sum(counts) == 1000
+        assert counts == sorted(counts, reverse=True)
+
+    def test_comment_chunks_cover_every_post_once(self):
+        dataset = build_dataset()
+
+        chunks = plan_comment_chunks(dataset.comment_counts, 100)
+
+        assert chunks[0][0] == 0 and chunks[-1][1] == dataset.config.posts
+        assert all(previous[1] == following[0] for previous, following in zip(chunks, chunks[1:]))
+        # The most discussed post has more comments than a chunk, it isn't split
+        assert chunks[0] == (0, 1)
+
+
+class TestBenchmarkReport:
+
+    def test_regressions_are_flagged(self):
+        baseline_recorder, current_recorder = LatencyRecorder(), LatencyRecorder()
+        for latency in (0.010, 0.012, 0.015, 0.020):
+            baseline_recorder.record("feed", latency, failed=False)
+            baseline_recorder.record("like", latency, failed=False)
+            current_recorder.record("feed", latency * 3, failed=False)
+            current_recorder.record("like", latency + 0.0005, failed=False)
+
+        regressions = compare(current_recorder.summary(1), baseline_recorder.summary(1))
+
+        assert any(regression.startswith("feed: p95_ms") for regression in regressions)
+        assert not any(regression.startswith("like:") for regression in regressions)
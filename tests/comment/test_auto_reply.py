@@ -0,0 +1,298 @@
+from datetime import datetime, timedelta, UTC
+from typing import List
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.metrics import auto_replies_skipped, auto_replies_merged
+from src.core.settings import settings
+from src.dependencies.comments import task_prompt_context_cache
+from src.dto.user import PrincipalDTO
+from src.models.comment import Comment
+from src.models.outbox import OutboxMessage
+from src.models.post import Post
+from src.models.user import User
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
+from src.repositories.post.implementation import PostRepositoryImplementation
+from src.repositories.unit_of_work.implementation import UnitOfWork
+from src.repositories.user.implementation import UserRepositoryImplementation
+from src.schemes.post.update import UpdatePostSchema
+from src.services.comment.implementation import CommentServiceImplementation
+from src.services.post.implementation import PostServiceImplementation
+from src.utils.post import prompt_context
+from src.utils.post.post_cache import PostCacheEntry
+from src.utils.post.prompt_context import PromptContext, make_prompt_context_cache, estimate_tokens
+from src.utils.tiered_cache import TieredCache
+from tests.core.test_tiered_cache import FakeRedis
+
+
+def make_uow(session: AsyncSession) -> UnitOfWork:
+    return UnitOfWork(
+        session=session,
+        user_repository=UserRepositoryImplementation(session=session),
+        post_repository=PostRepositoryImplementation(session=session),
+        comment_repository=CommentRepositoryImplementation(session=session),
+        like_repository=LikeRepositoryImplementation(session=session),
+        outbox_repository=OutboxRepositoryImplementation(session=session),
+    )
+
+
+def make_comment_service(session: AsyncSession, mocker: MockerFixture,
+                         prompt_context_cache: TieredCache[PromptContext] = None,
+                         post_cache: TieredCache[PostCacheEntry] = None) -> CommentServiceImplementation:
+    reply_generator = mocker.Mock()
+    reply_generator.generate_reply = mocker.AsyncMock(return_value="Thanks for the comments")
+    return CommentServiceImplementation(
+        uow=make_uow(session),
+        content_moderator=mocker.Mock(),
+        reply_generator=reply_generator,
+        post_cache=post_cache,
+        prompt_context_cache=prompt_context_cache,
+    )
+
+
+async def create_discussion(async_db_engine, name: str, comment_offsets: List[int], content: str = None,
+                            **comment_fields) -> List[int]:
+    """
+    Creates a post with auto replies and comments of another user, created the given seconds apart from now.
+
+    :return: Ids of the post, its author and the comments.
+    """
+    async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+        author = User(email=f"{name}-author@email.com", password="-", first_name="Post", last_name="Author")
+        commenter = User(email=f"{name}-commenter@email.com", password="-", first_name="Quick", last_name="Typer")
+        session.add_all([author, commenter])
+        await session.flush()
+        post = Post(title=name, content=content or "A post with auto replies", draft=False, auto_reply=True, reply_after=1,
+                    author_id=author.id)
+        session.add(post)
+        await session.flush()
+        now = datetime.now(UTC)
+        comments = [
+            Comment(content=f"Comment {index}", post_id=post.id, owner_id=commenter.id,
+                    created_at=now + timedelta(seconds=offset), **comment_fields)
+            for index, offset in enumerate(comment_offsets)
+        ]
+        session.add_all(comments)
+        await session.commit()
+        return [post.id, author.id] + [comment.id for comment in comments]
+
+
+async def get_replies(async_db_engine, comment_ids: List[int]) -> List[Comment]:
+    async with AsyncSession(async_db_engine) as session:
+        result = await session.exec(select(Comment).where(Comment.parent_id.in_(comment_ids)))
+        return list(result.scalars())
+
+
+async def get_deferred(async_db_engine, comment_ids: List[int]) -> List[int]:
+    """Returns the comments whose auto reply was scheduled again."""
+    async with async_db_engine.connect() as connection:
+        result = await connection.execute(select(OutboxMessage.args).where(OutboxMessage.task == "auto-reply"))
+        return [args[0] for (args, ) in result.all() if args[0] in comment_ids]
+
+
+def counter_value(counter, *labels) -> float:
+    return counter.labels(*labels).value
+
+
+class TestAutoReply:
+
+    @pytest.mark.asyncio
+    async def test_reply_to_a_comment(self, mocker: MockerFixture, async_db_engine):
+        post_id, author_id, comment_id = await create_discussion(async_db_engine, "single-comment", [0])
+
+        post_cache = mocker.Mock()
+        post_cache.invalidate = mocker.AsyncMock()
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker, post_cache=post_cache)
+            await service.auto_reply_comment(comment_id)
+            # The cached post shows the new comment count
+            post_cache.invalidate.assert_awaited_once_with(str(post_id))
+            # The task may run again, e.g. after a lost acknowledgement
+            skipped = counter_value(auto_replies_skipped, "already_replied")
+            await service.auto_reply_comment(comment_id)
+
+        service._reply_generator.generate_reply.assert_awaited_once()
+        assert counter_value(auto_replies_skipped, "already_replied") == skipped + 1
+        [reply] = await get_replies(async_db_engine, [comment_id])
+        assert (reply.owner_id, reply.content) == (author_id, "Thanks for the comments")
+
+    @pytest.mark.asyncio
+    async def test_burst_is_answered_once(self, mocker: MockerFixture, async_db_engine):
+        """Three quick comments get one reply, to the last of them, a later comment gets its own."""
+        post_id, author_id, *comment_ids = await create_discussion(async_db_engine, "burst", [0, 10, 20, 3600])
+        merged = counter_value(auto_replies_merged)
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker)
+            for comment_id in comment_ids:
+                await service.auto_reply_comment(comment_id)
+            # The first comments waited for the reply to the last comment of the burst
+            deferred = await get_deferred(async_db_engine, comment_ids[:2])
+            assert sorted(deferred) == comment_ids[:2]
+            for comment_id in deferred:
+                await service.auto_reply_comment(comment_id)
+
+        generate_reply = service._reply_generator.generate_reply
+        assert generate_reply.await_count == 2
+        burst_prompt = generate_reply.await_args_list[0].args[0]
+        assert all(f"Comment: Comment {index}\n" in burst_prompt for index in range(3))
+        assert "Comment 3" not in burst_prompt
+        assert counter_value(auto_replies_merged) == merged + 2
+        replies = await get_replies(async_db_engine, comment_ids)
+        assert sorted(reply.parent_id for reply in replies) == [comment_ids[2], comment_ids[3]]
+
+    @pytest.mark.asyncio
+    async def test_burst_is_answered_without_its_deleted_last_comment(self, mocker: MockerFixture, async_db_engine):
+        post_id, author_id, *comment_ids = await create_discussion(async_db_engine, "burst-deleted", [0, 10])
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker)
+            await service.auto_reply_comment(comment_ids[0])
+            await session.delete(await session.get(Comment, comment_ids[1]))
+            await session.commit()
+            # The task of the deleted comment skips itself, the deferred task of the first one answers it
+            await service.auto_reply_comment(comment_ids[1])
+            await service.auto_reply_comment(comment_ids[0])
+
+        service._reply_generator.generate_reply.assert_awaited_once()
+        [reply] = await get_replies(async_db_engine, comment_ids[:1])
+        assert reply.owner_id == author_id
+
+    @pytest.mark.asyncio
+    async def test_burst_is_answered_when_the_last_reply_didnt_come(self, mocker: MockerFixture, async_db_engine):
+        """E.g. the last comment was written while the auto replies were off, so it has no task."""
+        post_id, author_id, *comment_ids = await create_discussion(async_db_engine, "burst-late", [-600, -590])
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker)
+            await service.auto_reply_comment(comment_ids[0])
+            await service.auto_reply_comment(comment_ids[1])
+
+        generate_reply = service._reply_generator.generate_reply
+        generate_reply.assert_awaited_once()
+        assert all(f"Comment: Comment {index}\n" in generate_reply.await_args.args[0] for index in range(2))
+        [reply] = await get_replies(async_db_engine, comment_ids)
+        assert reply.parent_id == comment_ids[1]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("reason", ["comment_deleted", "comment_blocked", "auto_reply_off", "own_post"])
+    async def test_ineligible_comment_is_skipped(self, mocker: MockerFixture, async_db_engine, reason: str):
+        post_id, author_id, comment_id = await create_discussion(
+            async_db_engine, f"skipped-{reason}", [0], blocked=reason == "comment_blocked",
+        )
+        async with AsyncSession(async_db_engine) as session:
+            if reason == "comment_deleted":
+                await session.delete(await session.get(Comment, comment_id))
+            elif reason == "auto_reply_off":
+                (await session.get(Post, post_id)).auto_reply = False
+            elif reason == "own_post":
+                (await session.get(Comment, comment_id)).owner_id = author_id
+            await session.commit()
+        skipped = counter_value(auto_replies_skipped, reason)
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker)
+            await service.auto_reply_comment(comment_id)
+
+        service._reply_generator.generate_reply.assert_not_awaited()
+        assert counter_value(auto_replies_skipped, reason) == skipped + 1
+        assert await get_replies(async_db_engine, [comment_id]) == []
+
+    @pytest.mark.asyncio
+    async def test_post_is_condensed_once_per_version(self, mocker: MockerFixture, async_db_engine,
+                                                      monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(settings, "auto_reply_post_tokens", 50)
+        long_content = "A long sentence of the post. " * 100
+        post_id, author_id, *comment_ids = await create_discussion(
+            async_db_engine, "condensed", [0, 3600, 7200], content=long_content,
+        )
+        cache = make_prompt_context_cache(None, size=10, ttl=60)
+        condense_post = mocker.spy(prompt_context, "condense_post")
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker, cache)
+            await service.auto_reply_comment(comment_ids[0])
+            await service.auto_reply_comment(comment_ids[1])
+        assert condense_post.call_count == 1
+        prompt = service._reply_generator.generate_reply.await_args.args[0]
+        assert "A long sentence of the post. [...]" in prompt
+        assert long_content not in prompt
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            content_moderator = mocker.Mock()
+            content_moderator.moderate_text = mocker.AsyncMock(return_value=True)
+            post_service = PostServiceImplementation(make_uow(session), content_moderator,
+                                                     prompt_context_cache=cache)
+            await post_service.update_post(PrincipalDTO(author_id), post_id, UpdatePostSchema(
+                title="condensed", content="A short post now", auto_reply=True, reply_after=1,
+            ))
+            service = make_comment_service(session, mocker, cache)
+            await service.auto_reply_comment(comment_ids[2])
+
+        assert condense_post.call_count == 2
+        assert "Post Text: A short post now\n" in service._reply_generator.generate_reply.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_update_drops_the_condensed_post_of_the_workers(self, mocker: MockerFixture, async_db_engine,
+                                                                  monkeypatch: pytest.MonkeyPatch):
+        """Every task gets its own Redis client, the API cache only invalidates."""
+        server = {"keys": {}, "channels": {}}
+        monkeypatch.setattr(settings, "cache_redis_url", "redis://cache")
+        monkeypatch.setattr(prompt_context.aioredis, "from_url", lambda *args, **kwargs: FakeRedis(server))
+        post_id, author_id, *comment_ids = await create_discussion(async_db_engine, "shared", [0, 3600, 7200])
+        condense_post = mocker.spy(prompt_context, "condense_post")
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            for comment_id in comment_ids[:2]:
+                async with task_prompt_context_cache() as cache:
+                    await make_comment_service(session, mocker, cache).auto_reply_comment(comment_id)
+        assert condense_post.call_count == 1
+        assert f"cache:post_prompt_context:{post_id}" in server["keys"]
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            content_moderator = mocker.Mock()
+            content_moderator.moderate_text = mocker.AsyncMock(return_value=True)
+            api_cache = make_prompt_context_cache("redis://cache", size=0, ttl=60)
+            post_service = PostServiceImplementation(make_uow(session), content_moderator,
+                                                     prompt_context_cache=api_cache)
+            await post_service.update_post(PrincipalDTO(author_id), post_id, UpdatePostSchema(
+                title="shared", content="An updated post", auto_reply=True, reply_after=1,
+            ))
+            assert f"cache:post_prompt_context:{post_id}" not in server["keys"]
+            async with task_prompt_context_cache() as cache:
+                service = make_comment_service(session, mocker, cache)
+                await service.auto_reply_comment(comment_ids[2])
+
+        assert condense_post.call_count == 2
+        assert "Post Text: An updated post\n" in service._reply_generator.generate_reply.await_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_prompt_is_cut_to_the_token_budget(self, mocker: MockerFixture, async_db_engine,
+                                                     monkeypatch: pytest.MonkeyPatch):
+        """The oldest comments of a burst are left out first, the answered one is always kept."""
+        monkeypatch.setattr(settings, "auto_reply_post_tokens", 100)
+        monkeypatch.setattr(settings, "auto_reply_prompt_max_tokens", 250)
+        post_id, author_id, *comment_ids = await create_discussion(
+            async_db_engine, "budget", [0, 10, 20], content="Post text " * 200,
+        )
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            for comment_id in comment_ids:
+                comment = await session.get(Comment, comment_id)
+                comment.content = f"{comment.content} " + "words " * 40
+            await session.commit()
+
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            service = make_comment_service(session, mocker)
+            for comment_id in comment_ids:
+                await service.auto_reply_comment(comment_id)
+
+        prompt = service._reply_generator.generate_reply.await_args.args[0]
+        assert estimate_tokens(prompt) <= 250
+        assert "Comment: Comment 0 " not in prompt
+        assert "Comment: Comment 2 " in prompt
@@ -0,0 +1,101 @@
+from datetime import datetime, UTC
+
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlalchemy import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.post import Post
+from src.models.user import User
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+from src.schemes.auth.token_data import AuthTokens
+
+
+@pytest.fixture(scope="session")
+async def counted_post(the_user: User, db_session: AsyncSession) -> Post:
+    post = Post(title="Counted post", content="Comments of this post are counted", draft=False, auto_reply=False,
+                created_at=datetime.now(UTC), author_id=the_user.id)
+    db_session.add(post)
+    await db_session.commit()
+    return post
+
+
+class TestCommentCounters:
+
+    @staticmethod
+    async def _comment(async_client: AsyncClient, tokens: AuthTokens, post_id: int, parent_id=None) -> int:
+        response = await async_client.post(
+            "/api/v1/comments/",
+            json={"content": "Counted comment", "post_id": post_id, "parent_id": parent_id},
+            headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    @staticmethod
+    async def _comment_count(async_client: AsyncClient, post_id: int) -> int:
+        response = await async_client.get(f"/api/v1/posts/{post_id}")
+        return response.json()["comment_count"]
+
+    @staticmethod
+    async def _reply_count(async_client: AsyncClient, comment_id: int) -> int:
+        response = await async_client.get(f"/api/v1/comments/{comment_id}")
+        return response.json()["comment"]["reply_count"]
+
+    @pytest.mark.asyncio
+    async def test_counters_follow_comments(self, mocker: MockerFixture, async_client: AsyncClient,
+                                            tokens: AuthTokens, counted_post: Post):
+        """
+        Creating, blocking and deleting comments keeps the comment counter of the post
+        and the reply counters of the parents in sync.
+        """
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+
+        top = await self._comment(async_client, tokens, counted_post.id)
+        reply = await self._comment(async_client, tokens, counted_post.id, parent_id=top)
+        await self._comment(async_client, tokens, counted_post.id, parent_id=reply)
+        await self._comment(async_client, tokens, counted_post.id, parent_id=top)
+
+        assert await self._comment_count(async_client, counted_post.id) == 4
+        assert await self._reply_count(async_client, top) == 2
+        assert await self._reply_count(async_client, reply) == 1
+
+        # Blocking hides the comment, its replies stay visible
+        response = await async_client.put(f"/api/v1/comments/{reply}/block", headers=headers)
+        assert response.status_code == 200
+        assert await self._comment_count(async_client, counted_post.id) == 3
+        assert await self._reply_count(async_client, top) == 1
+
+        # Blocking again changes nothing
+        await async_client.put(f"/api/v1/comments/{reply}/block", headers=headers)
+        assert await self._comment_count(async_client, counted_post.id) == 3
+
+        # Deleting the top comment deletes the whole thread, the blocked reply wasn't counted
+        response = await async_client.delete(f"/api/v1/comments/{top}", headers=headers)
+        assert response.status_code == 204
+        assert await self._comment_count(async_client, counted_post.id) == 0
+
+        response = await async_client.get("/api/v1/posts/")
+        assert {post["id"]: post["comment_count"] for post in response.json()}[counted_post.id] == 0
+
+    @pytest.mark.asyncio
+    async def test_reconcile_counters(self, mocker: MockerFixture, async_client: AsyncClient, tokens: AuthTokens,
+                                      counted_post: Post, async_db_engine):
+        """Counters that drifted are recomputed from the comments."""
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        top = await self._comment(async_client, tokens, counted_post.id)
+        await self._comment(async_client, tokens, counted_post.id, parent_id=top)
+
+        async with AsyncSession(async_db_engine) as session:
+            await session.exec(update(Post).where(Post.id == counted_post.id).values(comment_count=42))
+            repository = CommentRepositoryImplementation(session)
+
+            # Fixtures insert comments directly, so other counters may have drifted too
+            assert await repository.reconcile_counters() >= 1
+            assert await repository.reconcile_counters() == 0
+            await session.commit()
+
+        assert await self._comment_count(async_client, counted_post.id) == 2
+        assert await self._reply_count(async_client, top) == 1
@@ -0,0 +1,194 @@
+import threading
+from datetime import datetime, timedelta, UTC
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlalchemy import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.comment import Comment
+from src.models.outbox import OutboxMessage
+from src.models.post import Post
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
+from src.repositories.post.implementation import PostRepositoryImplementation
+from src.repositories.unit_of_work.implementation import UnitOfWork
+from src.repositories.user.implementation import UserRepositoryImplementation
+from src.schemes.auth.token_data import AuthTokens
+from src.services.outbox.implementation import OutboxServiceImplementation
+
+
+def make_outbox_service(session: AsyncSession, publish, batch_size: int = 100,
+                        publish_timeout: float = 5.0) -> OutboxServiceImplementation:
+    return OutboxServiceImplementation(
+        uow=UnitOfWork(
+            session=session,
+            user_repository=UserRepositoryImplementation(session=session),
+            post_repository=PostRepositoryImplementation(session=session),
+            comment_repository=CommentRepositoryImplementation(session=session),
+            like_repository=LikeRepositoryImplementation(session=session),
+            outbox_repository=OutboxRepositoryImplementation(session=session),
+        ),
+        batch_size=batch_size,
+        retention=timedelta(days=1),
+        publish=publish,
+        publish_timeout=publish_timeout,
+    )
+
+
+async def add_messages(async_db_engine, task: str, count: int) -> List[int]:
+    async with AsyncSession(async_db_engine) as session:
+        messages = [OutboxMessage(task=task, args=[index]) for index in range(count)]
+        session.add_all(messages)
+        await session.flush()
+        message_ids = [message.id for message in messages]
+        await session.commit()
+    return message_ids
+
+
+async def sent_at(async_db_engine, message_ids: List[int]) -> dict:
+    async with async_db_engine.connect() as connection:
+        result = await connection.execute(
+            select(OutboxMessage.id, OutboxMessage.sent_at).where(OutboxMessage.id.in_(message_ids))
+        )
+        return dict(result.all())
+
+
+class Publisher:
+    def __init__(self, fail: bool = False, hang: bool = False):
+        self.batches = []
+        self.fail = fail
+        self.hang = threading.Event() if hang else None
+
+    def __call__(self, messages):
+        if self.hang is not None:
+            # Like a broker that doesn't answer, until the test ends
+            self.hang.wait(5)
+        if self.fail:
+            raise ConnectionError("Connection refused")
+        self.batches.append(messages)
+
+    def published(self, task: str) -> List[int]:
+        """Arguments of the published calls of the task, in the order they were published."""
+        return [message.args[0] for batch in self.batches for message in batch if message.name == task]
+
+
+class TestCommentOutbox:
+
+    @pytest.mark.asyncio
+    async def test_auto_reply_is_written_with_the_comment(self, mocker: MockerFixture, async_client: AsyncClient,
+                                                          tokens: AuthTokens, posts_of_main_user: List[Post],
+                                                          async_db_engine):
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        post = posts_of_main_user[0]
+
+        response = await async_client.post(
+            "/api/v1/comments/", json={"content": "Reply to me", "post_id": post.id},
+            headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+        assert response.status_code == 201
+        comment_id = response.json()["id"]
+
+        async with async_db_engine.connect() as connection:
+            message = (await connection.execute(
+                select(OutboxMessage).where(OutboxMessage.args == [comment_id])
+            )).one()
+        assert message.task == "auto-reply"
+        assert message.sent_at is None
+        expected_eta = datetime.now(UTC) + timedelta(minutes=post.reply_after)
+        assert abs(message.eta - expected_eta) < timedelta(minutes=1)
+
+    @pytest.mark.asyncio
+    async def test_auto_reply_is_rolled_back_with_the_comment(self, mocker: MockerFixture, async_client: AsyncClient,
+                                                              tokens: AuthTokens, posts_of_main_user: List[Post],
+                                                              async_db_engine):
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        # Fails after the comment and the outbox message were written
+        mocker.patch.object(PostRepositoryImplementation, "change_comment_counter", side_effect=RuntimeError("Lost"))
+        post = posts_of_main_user[0]
+
+        async def count_rows():
+            async with async_db_engine.connect() as connection:
+                comments = await connection.scalar(
+                    select(func.count()).select_from(Comment).where(Comment.post_id == post.id)
+                )
+                messages = await connection.scalar(select(func.count()).select_from(OutboxMessage))
+            return comments, messages
+
+        before = await count_rows()
+        with pytest.raises(RuntimeError):
+            await async_client.post(
+                "/api/v1/comments/", json={"content": "Never saved", "post_id": post.id},
+                headers={"Authorization": f"Bearer {tokens.access_token}"},
+            )
+
+        assert await count_rows() == before
+
+    @pytest.mark.asyncio
+    async def test_relay_publishes_in_batches(self, async_db_engine):
+        message_ids = await add_messages(async_db_engine, "relay-batches", 5)
+        publisher = Publisher()
+
+        async with AsyncSession(async_db_engine) as session:
+            relayed = await make_outbox_service(session, publisher, batch_size=2).relay_messages()
+
+        assert relayed >= 5
+        assert all(len(batch) <= 2 for batch in publisher.batches)
+        assert publisher.published("relay-batches") == [0, 1, 2, 3, 4]
+        assert all(value is not None for value in (await sent_at(async_db_engine, message_ids)).values())
+
+    @pytest.mark.asyncio
+    async def test_relay_skips_locked_messages(self, async_db_engine):
+        """A message claimed by a concurrent relay is left to it."""
+        message_ids = await add_messages(async_db_engine, "relay-locked", 2)
+        publisher = Publisher()
+
+        async with async_db_engine.connect() as other_relay:
+            async with other_relay.begin():
+                await other_relay.execute(
+                    select(OutboxMessage.id).where(OutboxMessage.id == message_ids[0]).with_for_update()
+                )
+                async with AsyncSession(async_db_engine) as session:
+                    await make_outbox_service(session, publisher).relay_messages()
+
+        assert publisher.published("relay-locked") == [1]
+        sent = await sent_at(async_db_engine, message_ids)
+        assert sent[message_ids[0]] is None
+        assert sent[message_ids[1]] is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_publish_leaves_messages_unsent(self, async_db_engine):
+        message_ids = await add_messages(async_db_engine, "relay-failed", 2)
+
+        async with AsyncSession(async_db_engine) as session:
+            with pytest.raises(ConnectionError):
+                await make_outbox_service(session, Publisher(fail=True)).relay_messages()
+
+        assert set((await sent_at(async_db_engine, message_ids)).values()) == {None}
+        publisher = Publisher()
+        async with AsyncSession(async_db_engine) as session:
+            await make_outbox_service(session, publisher).relay_messages()
+        assert publisher.published("relay-failed") == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_hung_publish_releases_the_messages(self, async_db_engine):
+        message_ids = await add_messages(async_db_engine, "relay-hung", 2)
+        hung = Publisher(hang=True)
+
+        try:
+            async with AsyncSession(async_db_engine) as session:
+                with pytest.raises(TimeoutError):
+                    await make_outbox_service(session, hung, publish_timeout=0.1).relay_messages()
+
+            # The locks were released with the rollback, another relay takes the messages right away
+            publisher = Publisher()
+            async with AsyncSession(async_db_engine) as session:
+                await make_outbox_service(session, publisher).relay_messages()
+        finally:
+            hung.hang.set()
+
+        assert publisher.published("relay-hung") == [0, 1]
+        assert all(value is not None for value in (await sent_at(async_db_engine, message_ids)).values())
@@ -0,0 +1,100 @@
+from datetime import datetime, UTC
+from typing import Dict
+
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.comment import Comment
+from src.models.like import Like
+from src.models.post import Post
+from src.models.user import User
+from src.schemes.auth.token_data import AuthTokens
+
+
+@pytest.fixture(scope="session")
+async def threaded_post(the_user: User, db_session: AsyncSession) -> Post:
+    post = Post(title="Threaded post", content="A post with a deep thread", draft=False, auto_reply=False,
+                created_at=datetime.now(UTC), author_id=the_user.id)
+    db_session.add(post)
+    await db_session.commit()
+    return post
+
+
+@pytest.fixture
+async def thread(mocker: MockerFixture, async_client: AsyncClient, tokens: AuthTokens,
+                 threaded_post: Post) -> Dict[str, int]:
+    """
+    root
+    ├── a
+    │   └── a1
+    │       └── a1x
+    └── b
+    """
+    mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+    ids = {}
+    for name, parent in (("root", None), ("a", "root"), ("b", "root"), ("a1", "a"), ("a1x", "a1")):
+        response = await async_client.post(
+            "/api/v1/comments/",
+            json={"content": name, "post_id": threaded_post.id, "parent_id": ids.get(parent)},
+            headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+        assert response.status_code == 201
+        ids[name] = response.json()["id"]
+    return ids
+
+
+class TestCommentThread:
+
+    @pytest.mark.asyncio
+    async def test_paths_are_materialized(self, thread: Dict[str, int], async_db_engine):
+        async with AsyncSession(async_db_engine) as session:
+            paths = dict((await session.exec(
+                select(Comment.id, Comment.path).where(Comment.id.in_(thread.values()))
+            )).all())
+
+        root, a, a1 = thread["root"], thread["a"], thread["a1"]
+        assert paths[root] == "/"
+        assert paths[thread["b"]] == f"/{root:010d}/"
+        assert paths[thread["a1x"]] == f"/{root:010d}/{a:010d}/{a1:010d}/"
+
+    @pytest.mark.asyncio
+    async def test_get_thread(self, async_client: AsyncClient, thread: Dict[str, int]):
+        """Every comment is followed by its replies."""
+        response = await async_client.get(f"/api/v1/comments/{thread['root']}/thread")
+
+        assert response.status_code == 200
+        assert [comment["content"] for comment in response.json()] == ["root", "a", "a1", "a1x", "b"]
+
+        response = await async_client.get(f"/api/v1/comments/{thread['a']}/thread", params={"depth": 1})
+
+        assert [comment["content"] for comment in response.json()] == ["a", "a1"]
+
+    @pytest.mark.asyncio
+    async def test_get_thread_of_non_existent_comment(self, async_client: AsyncClient):
+        response = await async_client.get("/api/v1/comments/999999/thread")
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_delete_subtree(self, async_client: AsyncClient, tokens: AuthTokens, thread: Dict[str, int],
+                                  another_user: User, async_db_engine):
+        """Deleting a comment deletes its replies at any depth and their likes, the siblings stay."""
+        async with AsyncSession(async_db_engine) as session:
+            session.add(Like(comment_id=thread["a1x"], owner_id=another_user.id))
+            await session.commit()
+
+        response = await async_client.delete(f"/api/v1/comments/{thread['a']}",
+                                             headers={"Authorization": f"Bearer {tokens.access_token}"})
+        assert response.status_code == 204
+
+        async with AsyncSession(async_db_engine) as session:
+            remaining = set((await session.exec(
+                select(Comment.id).where(Comment.id.in_(thread.values()))
+            )).all())
+            likes = (await session.exec(select(Like).where(Like.comment_id == thread["a1x"]))).all()
+
+        assert remaining == {thread["root"], thread["b"]}
+        assert likes == []
@@ -1,8 +1,10 @@
 import asyncio
+from contextlib import contextmanager
 from datetime import datetime, timedelta, UTC
 from typing import AsyncGenerator, List
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel
@@ -11,11 +13,14 @@ from sqlalchemy.pool import NullPool
 from dependency_injector import providers
 
 from src.core.app_factory import create_app
+from src.core.query_stats import collect_query_stats
 from src.core.settings import settings
+from src.migrations.runner import upgrade, MIGRATIONS_TABLE
 from src.models.comment import Comment
 from src.models.post import Post
 from src.models.user import User
 from src.schemes.auth.token_data import AuthTokens
+from src.utils.comment.comment_path import child_path
 from src.utils.password_utils import hash_password
 
 engine = create_async_engine(settings.psql_connection_string, echo=True, poolclass=NullPool)
@@ -27,13 +32,14 @@ async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
 
 @pytest.fixture(scope="session")
 async def async_db_engine():
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+    # The schema is created like in production, by the migrations
+    await upgrade(engine)
 
     yield engine
 
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.execute(text(f"DROP TABLE IF EXISTS {MIGRATIONS_TABLE}"))
 
 @pytest.fixture(scope="session")
 async def db_session(async_db_engine):
@@ -60,6 +66,21 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
 
+@pytest.fixture
+def assert_max_queries():
+    """
+    Fails the test if the requests made within the block issue more SQL statements than the budget.
+    """
+    @contextmanager
+    def _assert_max_queries(budget: int):
+        with collect_query_stats() as stats:
+            yield stats
+
+        assert stats.queries <= budget, f"Expected at most {budget} queries, got {stats.queries}"
+
+    return _assert_max_queries
+
+
 # let test session to know it is running inside event loop
 @pytest.fixture(scope='session')
 def event_loop():
@@ -242,7 +263,7 @@ async def comments_of_another_user(another_user: User, posts_of_another_user: Li
         {
             "content": "Reply to main user's comment on First Post",
             "post_id": comments_of_main_user[0].post_id,
-            "parent_id": comments_of_main_user[0].id,
+            "parent": comments_of_main_user[0],
         },
         {
             "content": "Another user's comment on their own First Post",
@@ -251,7 +272,7 @@ async def comments_of_another_user(another_user: User, posts_of_another_user: Li
         {
             "content": "Reply to main user's second comment on First Post",
             "post_id": comments_of_main_user[1].post_id,
-            "parent_id": comments_of_main_user[1].id,
+            "parent": comments_of_main_user[1],
         },
         {
             "content": "Another user's comment on their own Second Post",
@@ -268,7 +289,8 @@ async def comments_of_another_user(another_user: User, posts_of_another_user: Li
         comment = Comment(
             content=data["content"],
             post_id=data["post_id"],
-            parent_id=data.get("parent_id"),
+            parent_id=data["parent"].id if "parent" in data else None,
+            path=child_path(data.get("parent")),
             created_at=datetime.now() - timedelta(hours=1),  # More recent timestamp for replies
             owner_id=another_user.id  # Another user's comment
         )
@@ -0,0 +1,188 @@
+from datetime import datetime, UTC
+
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlmodel import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.comment import Comment
+from src.models.post import Post
+from src.models.user import User
+from src.schemes.auth.token_data import AuthTokens
+
+
+FUTURE_DATE = "Fri, 01 Jan 2100 00:00:00 GMT"
+
+
+@pytest.fixture(scope="session")
+async def polled_post(the_user: User, db_session: AsyncSession) -> Post:
+    post = Post(title="Polled post", content="Clients poll this post", draft=False, auto_reply=False,
+                created_at=datetime.now(UTC), author_id=the_user.id)
+    db_session.add(post)
+    await db_session.commit()
+    return post
+
+
+@pytest.fixture(scope="session")
+async def polled_comment(the_user: User, polled_post: Post, db_session: AsyncSession) -> Comment:
+    comment = Comment(content="Clients poll this comment", post_id=polled_post.id, owner_id=the_user.id,
+                      created_at=datetime.now(UTC))
+    db_session.add(comment)
+    await db_session.commit()
+    return comment
+
+
+class TestConditionalGet:
+
+    @pytest.mark.asyncio
+    async def test_post_not_modified(self, mocker: MockerFixture, async_client: AsyncClient, tokens: AuthTokens,
+                                     polled_post: Post, assert_max_queries):
+        """A fresh copy is confirmed by the validator query alone, an edit changes the ETag."""
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        url = f"/api/v1/posts/{polled_post.id}"
+
+        response = await async_client.get(url)
+        etag = response.headers["etag"]
+        assert response.status_code == 200
+        assert etag.startswith('W/"')
+        assert response.headers["cache-control"] == "no-cache"
+
+        with assert_max_queries(1):
+            response = await async_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = await async_client.put(
+            url, json={"title": "Polled post", "content": "Edited content"},
+            headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+        assert response.status_code == 200
+
+        response = await async_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["content"] == "Edited content"
+
+    @pytest.mark.asyncio
+    async def test_post_ignores_if_modified_since(self, mocker: MockerFixture, async_client: AsyncClient,
+                                                  tokens: AuthTokens, polled_post: Post):
+        """A new comment changes the comment count of the post but not updated_at, only the ETag catches it."""
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        url = f"/api/v1/posts/{polled_post.id}"
+        response = await async_client.get(url)
+        assert "last-modified" not in response.headers
+        etag, comment_count = response.headers["etag"], response.json()["comment_count"]
+
+        response = await async_client.post(
+            "/api/v1/comments/", json={"content": "Counted", "post_id": polled_post.id},
+            headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+        assert response.status_code == 201
+
+        response = await async_client.get(url, headers={"If-Modified-Since": FUTURE_DATE, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["comment_count"] == comment_count + 1
+
+    @pytest.mark.asyncio
+    async def test_counters_change_etag(self, async_client: AsyncClient, tokens: AuthTokens,
+                                        polled_comment: Comment):
+        """Likes don't change the content of the comment, but they change the ETags of the responses showing it."""
+        urls = [f"/api/v1/comments/{polled_comment.id}", f"/api/v1/comments/?post_id={polled_comment.post_id}"]
+        etags = [(await async_client.get(url)).headers["etag"] for url in urls]
+
+        response = await async_client.put(
+            f"/api/v1/comments/{polled_comment.id}/like", headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+        assert response.status_code == 204
+
+        for url, etag in zip(urls, etags):
+            response = await async_client.get(url, headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["etag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_post_lists(self, async_client: AsyncClient, tokens: AuthTokens, polled_post: Post):
+        response = await async_client.get("/api/v1/posts/")
+        response = await async_client.get("/api/v1/posts/", headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
+
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+        response = await async_client.get("/api/v1/posts/me", headers=headers)
+        assert response.headers["cache-control"] == "private, no-cache"
+        response = await async_client.get(
+            "/api/v1/posts/me", headers={**headers, "If-None-Match": response.headers["etag"]},
+        )
+        assert response.status_code == 304
+
+    @pytest.mark.asyncio
+    async def test_missing_post_is_not_found(self, async_client: AsyncClient):
+        response = await async_client.get("/api/v1/posts/999999", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_counter_swap_changes_list_etag(self, async_client: AsyncClient, the_user: User,
+                                                  db_session: AsyncSession):
+        """Moving counter values between comments keeps the count, the sums and the last change of the list."""
+        post = Post(title="Swapped likes", content="Two comments trade their likes", draft=False, auto_reply=False,
+                    created_at=datetime.now(UTC), author_id=the_user.id)
+        db_session.add(post)
+        await db_session.commit()
+        created_at = datetime.now(UTC)
+        first, second = (Comment(content=content, post_id=post.id, owner_id=the_user.id, created_at=created_at,
+                                 updated_at=created_at, likes_count=likes) for content, likes in (("A", 1), ("B", 0)))
+        db_session.add_all([first, second])
+        await db_session.commit()
+        url = f"/api/v1/comments/?post_id={post.id}"
+
+        response = await async_client.get(url)
+        etag = response.headers["etag"]
+        assert "last-modified" not in response.headers
+
+        # Counters are changed without touching updated_at, like the reply counter
+        for comment, likes in ((first, 0), (second, 1)):
+            await db_session.execute(
+                update(Comment).where(Comment.id == comment.id)
+                .values({Comment.likes_count: likes, Comment.updated_at: Comment.updated_at})
+            )
+        await db_session.commit()
+
+        response = await async_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert [comment["likes_count"] for comment in response.json()] == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_replaced_row_changes_list_etag(self, async_client: AsyncClient, the_user: User,
+                                                  db_session: AsyncSession):
+        """A deleted comment replaced by one with the same timestamps and counters changes the ETag."""
+        post = Post(title="Replaced comment", content="One comment is deleted, another is created", draft=False,
+                    auto_reply=False, created_at=datetime.now(UTC), author_id=the_user.id)
+        db_session.add(post)
+        await db_session.commit()
+        created_at = datetime.now(UTC)
+        deleted = Comment(content="Deleted", post_id=post.id, owner_id=the_user.id, created_at=created_at,
+                          updated_at=created_at)
+        db_session.add(deleted)
+        await db_session.commit()
+        url = f"/api/v1/comments/?post_id={post.id}"
+        etag = (await async_client.get(url)).headers["etag"]
+
+        await db_session.delete(deleted)
+        db_session.add(Comment(content="Created", post_id=post.id, owner_id=the_user.id, created_at=created_at,
+                               updated_at=created_at))
+        await db_session.commit()
+
+        response = await async_client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert [comment["content"] for comment in response.json()] == ["Created"]
+
+    @pytest.mark.asyncio
+    async def test_lists_ignore_if_modified_since(self, async_client: AsyncClient, polled_post: Post):
+        response = await async_client.get("/api/v1/posts/", headers={"If-Modified-Since": FUTURE_DATE})
+
+        assert response.status_code == 200
+        assert "last-modified" not in response.headers
@@ -0,0 +1,80 @@
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select, update
+from starlette.responses import PlainTextResponse
+
+from src.core.database import RoutingSession, RoutingState, routing_state
+from src.middlewares.database_routing import DatabaseRoutingMiddleware, STICKY_COOKIE_NAME
+from src.models.comment import Comment
+
+primary = object()
+replica = object()
+
+
+class TestRoutingSession:
+
+    @staticmethod
+    def _get_bind(state, clause, flushing: bool = False):
+        session = RoutingSession(primary=primary, replicas=[replica])
+        session._flushing = flushing
+        token = routing_state.set(state)
+        try:
+            return session.get_bind(clause=clause)
+        finally:
+            routing_state.reset(token)
+
+    def test_reads_of_safe_request_go_to_replica(self):
+        assert self._get_bind(RoutingState(use_replica=True), select(Comment)) is replica
+
+    def test_reads_without_request_go_to_primary(self):
+        assert self._get_bind(None, select(Comment)) is primary
+        assert self._get_bind(RoutingState(use_replica=False), select(Comment)) is primary
+
+    def test_locking_reads_go_to_primary(self):
+        assert self._get_bind(RoutingState(use_replica=True), select(Comment).with_for_update()) is primary
+
+    def test_request_sticks_to_primary_after_write(self):
+        state = RoutingState(use_replica=True)
+
+        assert self._get_bind(state, update(Comment).values(content="")) is primary
+        assert state.wrote is True
+        # Read your own writes
+        assert self._get_bind(state, select(Comment)) is primary
+
+    def test_flush_goes_to_primary(self):
+        state = RoutingState(use_replica=True)
+
+        assert self._get_bind(state, None, flushing=True) is primary
+        assert state.wrote is True
+
+
+class TestDatabaseRoutingMiddleware:
+
+    @staticmethod
+    def _make_client() -> AsyncClient:
+        async def app(scope, receive, send):
+            state = routing_state.get()
+            if scope["method"] == "POST":
+                state.wrote = True
+            response = PlainTextResponse("replica" if state.use_replica else "primary")
+            await response(scope, receive, send)
+
+        return AsyncClient(app=DatabaseRoutingMiddleware(app, sticky_seconds=5), base_url="http://test")
+
+    @pytest.mark.asyncio
+    async def test_safe_requests_use_replica(self):
+        async with self._make_client() as client:
+            response = await client.get("/")
+
+        assert response.text == "replica"
+        assert STICKY_COOKIE_NAME not in response.cookies
+
+    @pytest.mark.asyncio
+    async def test_client_reads_primary_after_write(self):
+        async with self._make_client() as client:
+            write_response = await client.post("/")
+            read_response = await client.get("/")
+
+        assert write_response.text == "primary"
+        assert STICKY_COOKIE_NAME in write_response.cookies
+        assert read_response.text == "primary"
@@ -0,0 +1,49 @@
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.responses import PlainTextResponse
+
+from src.core.database import get_request_session
+from src.middlewares.database_session import DatabaseSessionMiddleware
+
+
+class TestDatabaseSessionMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_request_shares_one_session(self, mocker: MockerFixture):
+        """
+        Everything within the request gets the same session, which is closed when the request is finished.
+        """
+        sessions = []
+        close_spy = mocker.spy(AsyncSession, "close")
+
+        async def app(scope, receive, send):
+            # E.g. the authentication and the service
+            sessions.append(get_request_session())
+            sessions.append(get_request_session())
+            response = PlainTextResponse("ok")
+            await response(scope, receive, send)
+
+        async with AsyncClient(app=DatabaseSessionMiddleware(app), base_url="http://test") as client:
+            await client.get("/")
+            await client.get("/")
+
+        first_request, second_request = sessions[:2], sessions[2:]
+        assert first_request[0] is first_request[1]
+        assert second_request[0] is second_request[1]
+        assert first_request[0] is not second_request[0]
+        assert close_spy.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_session_is_not_created_until_needed(self, mocker: MockerFixture):
+        close_spy = mocker.spy(AsyncSession, "close")
+
+        async def app(scope, receive, send):
+            response = PlainTextResponse("ok")
+            await response(scope, receive, send)
+
+        async with AsyncClient(app=DatabaseSessionMiddleware(app), base_url="http://test") as client:
+            await client.get("/")
+
+        close_spy.assert_not_called()
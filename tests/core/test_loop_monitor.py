@@ -0,0 +1,37 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from src.core.loop_monitor import LoopLagMonitor, running_requests, event_loop_stalls
+
+
+def block_the_loop():
+    time.sleep(0.2)
+
+
+class TestLoopLagMonitor:
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_is_attributed_to_route(self, caplog):
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        await monitor.start()
+
+        async def handle_request():
+            running_requests[asyncio.current_task()] = {"type": "http", "path": "/api/v1/slow"}
+            await asyncio.sleep(0.02)
+            block_the_loop()
+
+        stalls_before = event_loop_stalls.labels("/api/v1/slow").value
+        with caplog.at_level(logging.WARNING, logger="src.core.loop_monitor"):
+            await asyncio.create_task(handle_request())
+            await asyncio.sleep(0.05)
+        await monitor.stop()
+
+        records = [record for record in caplog.records if getattr(record, "route", None) == "/api/v1/slow"]
+        assert len(records) == 1
+        assert records[0].lag_ms >= 100
+        assert "handle_request" in records[0].task
+        assert records[0].blocking_stack.splitlines()[-1].startswith("block_the_loop")
+        assert event_loop_stalls.labels("/api/v1/slow").value == stalls_before + 1
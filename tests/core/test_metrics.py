@@ -0,0 +1,84 @@
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+
+from src.core.celery_metrics import WorkerMetricsPusher, WORKER_METRICS_KEY, _parse_worker_metrics, celery_task_duration
+from src.core.metrics import MetricsRegistry, track_external_call, external_call_errors
+from src.models.post import Post
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hash = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def hincrbyfloat(self, key, field, amount):
+        assert key == WORKER_METRICS_KEY
+        self.hash[field] = self.hash.get(field, 0.0) + amount
+
+    def execute(self):
+        return []
+
+
+class TestMetrics:
+
+    @pytest.mark.asyncio
+    async def test_histogram_is_rendered_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("duration_seconds", "Duration.", labelnames=("route", ), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.labels("/posts").observe(value)
+
+        rendered = await registry.render()
+
+        assert "# TYPE duration_seconds histogram" in rendered
+        assert 'duration_seconds_bucket{route="/posts",le="0.1"} 1' in rendered
+        assert 'duration_seconds_bucket{route="/posts",le="1.0"} 3' in rendered
+        assert 'duration_seconds_bucket{route="/posts",le="+Inf"} 4' in rendered
+        assert 'duration_seconds_count{route="/posts"} 4' in rendered
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self, async_client: AsyncClient, posts_of_main_user: List[Post]):
+        await async_client.get(f"/api/v1/posts/{posts_of_main_user[0].id}")
+
+        response = await async_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_requests_total{method="GET",route="/api/v1/posts/{post_id}",status="200"}' in response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/posts/{post_id}"}' in response.text
+        assert 'db_pool_checkout_wait_seconds_count{database="primary"}' in response.text
+        assert 'db_pool_checked_out{database="primary"}' in response.text
+
+    @pytest.mark.asyncio
+    async def test_external_call_errors_are_counted(self):
+        with pytest.raises(RuntimeError):
+            with track_external_call("test-service", "fail"):
+                raise RuntimeError()
+
+        registry = MetricsRegistry()
+        registry.register(external_call_errors)
+        assert 'external_call_errors_total{service="test-service",operation="fail"} 1.0' in await registry.render()
+
+    @pytest.mark.asyncio
+    async def test_worker_metrics_push_deltas(self):
+        client = FakeRedis()
+        pusher = WorkerMetricsPusher(client, metrics=(celery_task_duration, ))
+
+        celery_task_duration.labels("test-task", "SUCCESS").observe(0.2)
+        pusher.push()
+        celery_task_duration.labels("test-task", "SUCCESS").observe(0.3)
+        pusher.push()
+        pusher.push()
+
+        families = dict(
+            (metric.name, samples) for metric, samples in _parse_worker_metrics(client.hash)
+        )
+        count = [
+            value for suffix, labels, value in families["celery_task_duration_seconds"]
+            if suffix == "_count" and labels == {"task": "test-task", "state": "SUCCESS", "process": "worker"}
+        ]
+        assert count == [2.0]
@@ -0,0 +1,167 @@
+from typing import AsyncGenerator, Dict, Tuple
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncConnection
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+
+from src.core.settings import settings
+from src.migrations.runner import upgrade, load_migrations, applied_revisions
+
+SCHEMA = "migrations_check"
+MODELS_SCHEMA = "models_check"
+
+
+async def make_schema_engine(async_db_engine: AsyncEngine, schema: str) -> AsyncEngine:
+    """An engine whose tables are created in the empty schema, next to the tables of the test database in public."""
+    async with async_db_engine.begin() as connection:
+        await connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await connection.execute(text(f"CREATE SCHEMA {schema}"))
+
+    return create_async_engine(
+        settings.psql_connection_string, poolclass=NullPool,
+        connect_args={"server_settings": {"search_path": f"{schema}, public"}},
+    )
+
+
+async def drop_schema_engine(async_db_engine: AsyncEngine, engine: AsyncEngine, schema: str) -> None:
+    await engine.dispose()
+    async with async_db_engine.begin() as connection:
+        await connection.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+@pytest.fixture
+async def schema_engine(async_db_engine) -> AsyncGenerator[AsyncEngine, None]:
+    engine = await make_schema_engine(async_db_engine, SCHEMA)
+    yield engine
+    await drop_schema_engine(async_db_engine, engine, SCHEMA)
+
+
+@pytest.fixture
+async def models_schema(async_db_engine) -> AsyncGenerator[None, None]:
+    """A schema with the tables and indexes create_all gives for the models."""
+    engine = await make_schema_engine(async_db_engine, MODELS_SCHEMA)
+    async with engine.begin() as connection:
+        # The tables of public are visible through search_path, so they aren't checked for
+        await connection.run_sync(SQLModel.metadata.create_all, checkfirst=False)
+    yield
+    await drop_schema_engine(async_db_engine, engine, MODELS_SCHEMA)
+
+
+async def describe_schema(connection: AsyncConnection, schema: str) -> Tuple[Dict, Dict]:
+    columns = (await connection.execute(text(
+        "SELECT table_name, column_name, data_type, is_nullable, column_default, collation_name "
+        "FROM information_schema.columns WHERE table_schema = :schema AND table_name <> 'schema_migrations'"
+    ), {"schema": schema})).all()
+    indexes = (await connection.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = :schema AND tablename <> 'schema_migrations'"
+    ), {"schema": schema})).all()
+    # Sequences and indexes are qualified with the schema
+    unqualified = lambda value: value.replace(f"{schema}.", "") if isinstance(value, str) else value
+    return (
+        {(row[0], row[1]): tuple(map(unqualified, row[2:])) for row in columns},
+        # The trigram indexes need pg_trgm, so only the migrations create them
+        {name: unqualified(definition) for name, definition in indexes if not name.endswith("_trgm")},
+    )
+
+
+class TestMigrations:
+
+    @pytest.mark.asyncio
+    async def test_migrations_match_models(self, schema_engine: AsyncEngine, models_schema, async_db_engine):
+        """Migrating an empty database gives the tables and indexes that create_all gives for the models."""
+        applied = await upgrade(schema_engine)
+
+        assert applied == [migration.revision for migration in load_migrations()]
+        async with async_db_engine.connect() as connection:
+            migrated = await describe_schema(connection, SCHEMA)
+            created = await describe_schema(connection, MODELS_SCHEMA)
+        assert migrated == created
+
+    @pytest.mark.asyncio
+    async def test_upgrade_is_idempotent(self, schema_engine: AsyncEngine):
+        await upgrade(schema_engine)
+
+        assert await upgrade(schema_engine) == []
+        assert await applied_revisions(schema_engine) == {migration.revision for migration in load_migrations()}
+
+    @pytest.mark.asyncio
+    async def test_interrupted_index_build_is_repeated(self, schema_engine: AsyncEngine):
+        """An invalid index left by an interrupted concurrent build is built again."""
+        migrations = load_migrations()
+        await upgrade(schema_engine, migrations[:1])
+        async with schema_engine.begin() as connection:
+            await connection.execute(text("CREATE INDEX ix_comments_post_id ON comments (post_id)"))
+            await connection.execute(text(
+                "UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'ix_comments_post_id'::regclass"
+            ))
+
+        assert await upgrade(schema_engine, migrations) == [migration.revision for migration in migrations[1:]]
+        async with schema_engine.connect() as connection:
+            valid = await connection.scalar(text(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = 'ix_comments_post_id'::regclass"
+            ))
+        assert valid is True
+
+    @pytest.mark.asyncio
+    async def test_legacy_tables_get_search_vectors_and_indexes(self, schema_engine: AsyncEngine, models_schema,
+                                                                async_db_engine):
+        """Tables created before the search and the indexes end up like the tables of the models."""
+        migrations = load_migrations()
+        await upgrade(schema_engine, migrations[:1])
+        async with schema_engine.begin() as connection:
+            await connection.execute(text("ALTER TABLE posts DROP COLUMN search_vector"))
+            await connection.execute(text("ALTER TABLE comments DROP COLUMN search_vector"))
+
+        await upgrade(schema_engine, migrations)
+
+        async with async_db_engine.connect() as connection:
+            migrated = await describe_schema(connection, SCHEMA)
+            created = await describe_schema(connection, MODELS_SCHEMA)
+        assert migrated == created
+
+    @pytest.mark.asyncio
+    async def test_legacy_foreign_keys_cascade_and_paths_are_backfilled(self, schema_engine: AsyncEngine):
+        """A database created by create_all before the cascades and the paths is brought up to date."""
+        migrations = load_migrations()
+        await upgrade(schema_engine, migrations[:1])
+        async with schema_engine.begin() as connection:
+            for table, column, referred in (("comments", "post_id", "posts"), ("comments", "parent_id", "comments"),
+                                            ("likes", "comment_id", "comments")):
+                await connection.execute(text(
+                    f"ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_fkey, ADD CONSTRAINT {table}_{column}_fkey "
+                    f"FOREIGN KEY ({column}) REFERENCES {referred} (id)"
+                ))
+            await connection.execute(text(
+                "INSERT INTO users (id, created_at, updated_at) VALUES (1, now(), now())"
+            ))
+            await connection.execute(text(
+                "INSERT INTO posts (id, title, content, draft, author_id, auto_reply, created_at, updated_at) "
+                "VALUES (1, 'Title', 'Content', false, 1, false, now(), now())"
+            ))
+            await connection.execute(text(
+                "INSERT INTO comments (id, content, likes, post_id, owner_id, parent_id, blocked, created_at, updated_at) "
+                "VALUES (1, 'Root', 0, 1, 1, NULL, false, now(), now()), (2, 'Reply', 0, 1, 1, 1, false, now(), now()),"
+                " (3, 'Nested', 0, 1, 1, 2, false, now(), now())"
+            ))
+            await connection.execute(text(
+                "INSERT INTO likes (comment_id, owner_id, created_at) VALUES (3, 1, now())"
+            ))
+
+        await upgrade(schema_engine, migrations)
+
+        async with schema_engine.begin() as connection:
+            paths = dict((await connection.execute(text("SELECT id, path FROM comments"))).all())
+            constraints = (await connection.execute(text(
+                "SELECT confdeltype::text, convalidated FROM pg_constraint WHERE contype = 'f' AND conname IN "
+                "('comments_post_id_fkey', 'comments_parent_id_fkey', 'likes_comment_id_fkey') "
+                "AND connamespace = CAST(:schema AS regnamespace)"
+            ), {"schema": SCHEMA})).all()
+            await connection.execute(text("DELETE FROM posts WHERE id = 1"))
+            remaining = await connection.scalar(text("SELECT count(*) FROM comments"))
+            likes = await connection.scalar(text("SELECT count(*) FROM likes"))
+
+        assert paths == {1: "/", 2: "/0000000001/", 3: "/0000000001/0000000002/"}
+        assert constraints == [("c", True)] * 3
+        assert remaining == likes == 0
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from src.core.profiler import profile_event_loop, LOOP_BLOCKED, AWAITING_IO
+from src.core.settings import settings
+from src.models.user import User
+from src.schemes.auth.token_data import AuthTokens
+
+
+def blocking_work():
+    time.sleep(0.1)
+
+
+async def waiting_work():
+    await asyncio.sleep(1)
+
+
+class TestProfiler:
+
+    @pytest.mark.asyncio
+    async def test_blocking_and_awaiting_stacks_are_separated(self):
+        async def block():
+            await asyncio.sleep(0.05)
+            blocking_work()
+
+        waiting_task = asyncio.create_task(waiting_work())
+        blocking_task = asyncio.create_task(block())
+
+        sampler = await profile_event_loop(0.3, interval=0.005)
+        waiting_task.cancel()
+        await blocking_task
+
+        stacks = [line.rsplit(" ", 1)[0] for line in sampler.collapsed().splitlines()]
+        assert any(stack.startswith(LOOP_BLOCKED) and stack.endswith("blocking_work (test_profiler.py:13)")
+                   for stack in stacks)
+        assert any(stack.startswith(f"{AWAITING_IO};waiting_work (test_profiler.py:17)") for stack in stacks)
+        assert not any("blocking_work" in stack for stack in stacks if stack.startswith(AWAITING_IO))
+
+    @pytest.mark.asyncio
+    async def test_profile_endpoint_requires_admin(self, async_client: AsyncClient, tokens: AuthTokens,
+                                                   monkeypatch):
+        monkeypatch.setattr(settings, "profiler_enabled", True)
+        monkeypatch.setattr(settings, "admin_emails", [])
+
+        response = await async_client.get(
+            "/api/v1/debug/profile?seconds=0.05",
+            headers={"Authorization": f"Bearer {tokens.access_token}"}
+        )
+
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_profile_endpoint_is_opt_in(self, async_client: AsyncClient, tokens: AuthTokens, the_user: User,
+                                              monkeypatch):
+        monkeypatch.setattr(settings, "admin_emails", [the_user.email])
+        monkeypatch.setattr(settings, "profiler_enabled", False)
+
+        response = await async_client.get(
+            "/api/v1/debug/profile?seconds=0.05",
+            headers={"Authorization": f"Bearer {tokens.access_token}"}
+        )
+        assert response.status_code == 404
+
+        monkeypatch.setattr(settings, "profiler_enabled", True)
+        response = await async_client.get(
+            "/api/v1/debug/profile?seconds=0.05",
+            headers={"Authorization": f"Bearer {tokens.access_token}"}
+        )
+        assert response.status_code == 200
+        assert int(response.headers["x-profile-samples"]) > 0
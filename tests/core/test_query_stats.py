@@ -0,0 +1,58 @@
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.responses import PlainTextResponse
+
+from src.core.exceptions.database import QueryBudgetExceeded
+from src.core.query_stats import install_query_listeners
+from src.middlewares.query_stats import QueryStatsMiddleware
+from src.models.comment import Comment
+from src.models.post import Post
+
+
+class TestQueryStats:
+
+    @pytest.mark.asyncio
+    async def test_server_timing_header(self, async_client: AsyncClient, async_db_engine):
+        # Post details may be served from the post cache, the comments aren't cached
+        response = await async_client.get("/api/v1/comments/", params={"post_id": 999999})
+
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("db;dur=")
+        # The validator of the conditional GET and the empty list
+        assert '2 queries, 1 rows' in response.headers["server-timing"]
+
+    @pytest.mark.asyncio
+    async def test_read_endpoints_query_budget(self, async_client: AsyncClient, assert_max_queries,
+                                               posts_of_main_user: List[Post], comments_of_another_user: List[Comment],
+                                               comments_of_main_user: List[Comment]):
+        """
+        Read endpoints issue one statement regardless of the number of items, after the validator of the conditional GET.
+        """
+        with assert_max_queries(2):
+            await async_client.get("/api/v1/posts/")
+
+        with assert_max_queries(2):
+            await async_client.get(f"/api/v1/comments/?post_id={posts_of_main_user[0].id}")
+
+        with assert_max_queries(2):
+            await async_client.get(f"/api/v1/comments/{comments_of_main_user[0].id}")
+
+    @pytest.mark.asyncio
+    async def test_strict_budget_fails_request(self, db_session: AsyncSession):
+        install_query_listeners()
+
+        async def app(scope, receive, send):
+            await db_session.exec(select(Comment.id))
+            await db_session.exec(select(Post.id))
+            await db_session.commit()
+            response = PlainTextResponse("ok")
+            await response(scope, receive, send)
+
+        middleware = QueryStatsMiddleware(app, budget=1, strict=True)
+        async with AsyncClient(app=middleware, base_url="http://test") as client:
+            with pytest.raises(QueryBudgetExceeded):
+                await client.get("/")
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, UTC
+
+import pytest
+from httpx import AsyncClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.comment import Comment
+from src.models.post import Post
+from src.models.user import User
+from src.utils.single_flight import SingleFlight
+
+
+class SlowCall:
+    def __init__(self, result="post"):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class TestSingleFlight:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        single_flight = SingleFlight("test")
+        call = SlowCall()
+
+        tasks = [asyncio.create_task(single_flight.do("post:1", call)) for _ in range(5)]
+        other = asyncio.create_task(single_flight.do("post:2", call))
+        await asyncio.sleep(0)
+        call.release.set()
+
+        assert await asyncio.gather(*tasks, other) == ["post"] * 6
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        single_flight = SingleFlight("test")
+        call = SlowCall(ValueError("Post not found"))
+
+        tasks = [asyncio.create_task(single_flight.do("post:1", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert call.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_hands_over(self):
+        """When the caller running the call is cancelled, a waiting caller runs it again."""
+        single_flight = SingleFlight("test")
+        call = SlowCall()
+
+        first = asyncio.create_task(single_flight.do("post:1", call))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(single_flight.do("post:1", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        call.release.set()
+
+        assert await second == "post"
+        assert first.cancelled()
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_call_started_before_commit_isnt_shared(self, db_session: AsyncSession, the_user: User):
+        single_flight = SingleFlight("test")
+        call = SlowCall()
+
+        before = asyncio.create_task(single_flight.do("post:1", call))
+        await asyncio.sleep(0)
+        await db_session.commit()
+        after = asyncio.create_task(single_flight.do("post:1", call))
+        await asyncio.sleep(0)
+        call.release.set()
+
+        assert await asyncio.gather(before, after) == ["post", "post"]
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_queries(self, async_client: AsyncClient, the_user: User,
+                                                     db_session: AsyncSession, assert_max_queries):
+        post = Post(title="Viral post", content="Everybody reads it", draft=False, auto_reply=False,
+                    created_at=datetime.now(UTC), author_id=the_user.id)
+        db_session.add(post)
+        await db_session.commit()
+        db_session.add(Comment(content="First", post_id=post.id, owner_id=the_user.id, created_at=datetime.now(UTC)))
+        await db_session.commit()
+
+        with assert_max_queries(4):
+            responses = await asyncio.gather(
+                *(async_client.get("/api/v1/comments/", params={"post_id": post.id}) for _ in range(10))
+            )
+
+        assert all(response.status_code == 200 for response in responses)
+        assert all(len(response.json()) == 1 for response in responses)
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+
+import pytest
+
+from src.utils.task_queue import TaskEnqueuer, SpillBuffer, TaskMessage
+
+
+class Broker:
+    """Records the batches it takes, fails while it's down and hangs while it's slow."""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+        self.down = False
+        self.slow = threading.Event()
+
+    def send(self, messages):
+        self.threads.add(threading.current_thread().name)
+        if self.slow.is_set():
+            time.sleep(1)
+        if self.down:
+            raise ConnectionError("Connection refused")
+        self.batches.append([(message.name, message.args) for message in messages])
+
+
+def make_enqueuer(broker: Broker, directory, **kwargs) -> TaskEnqueuer:
+    return TaskEnqueuer(broker.send, SpillBuffer(str(directory)), **{"timeout": 0.2, "retry_after": 60, **kwargs})
+
+
+class TestTaskEnqueuer:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_batched(self, tmp_path):
+        broker = Broker()
+        enqueuer = make_enqueuer(broker, tmp_path, batch_size=3)
+
+        for comment_id in range(5):
+            enqueuer.enqueue("auto-reply", (comment_id, ), countdown=60)
+        await enqueuer.stop()
+
+        assert broker.batches == [
+            [("auto-reply", (0, )), ("auto-reply", (1, )), ("auto-reply", (2, ))],
+            [("auto-reply", (3, )), ("auto-reply", (4, ))],
+        ]
+        # Hung sends can't take the threads of the default executor
+        assert all(name.startswith("task-enqueuer") for name in broker.threads)
+
+    @pytest.mark.asyncio
+    async def test_slow_broker_doesnt_block_enqueue(self, tmp_path):
+        broker = Broker()
+        broker.slow.set()
+        enqueuer = make_enqueuer(broker, tmp_path)
+
+        started = time.monotonic()
+        enqueuer.enqueue("auto-reply", (1, ))
+        enqueued = time.monotonic() - started
+        await enqueuer.stop()
+
+        assert enqueued < 0.1
+        # The batch is spilled after the timeout, even though the broker may still take it
+        assert len(os.listdir(tmp_path)) == 1
+
+    @pytest.mark.asyncio
+    async def test_spilled_calls_are_replayed(self, tmp_path):
+        broker = Broker()
+        broker.down = True
+        enqueuer = make_enqueuer(broker, tmp_path)
+
+        enqueuer.enqueue("auto-reply", (1, ), countdown=600)
+        enqueuer.enqueue("purge-deleted-posts")
+        await enqueuer.stop()
+        assert broker.batches == []
+        assert len(os.listdir(tmp_path)) == 1
+
+        broker.down = False
+        # Another process of the host, or the next run of this one, replays the batch
+        await make_enqueuer(broker, tmp_path).replay()
+
+        assert broker.batches == [[("auto-reply", (1, )), ("purge-deleted-posts", ())]]
+        assert os.listdir(tmp_path) == []
+
+    def test_spilled_call_keeps_its_eta(self, tmp_path):
+        spill = SpillBuffer(str(tmp_path))
+        eta = datetime.now(UTC) + timedelta(minutes=10)
+        spill.write([TaskMessage("auto-reply", (1, ), eta)])
+        replayed = []
+
+        assert spill.replay_one(replayed.extend) == 1
+        assert spill.replay_one(replayed.extend) is None
+        assert replayed[0].eta == eta
+
+    def test_failed_replay_keeps_the_batch(self, tmp_path):
+        spill = SpillBuffer(str(tmp_path))
+        spill.write([TaskMessage("auto-reply", (1, ))])
+        broker = Broker()
+        broker.down = True
+
+        with pytest.raises(ConnectionError):
+            spill.replay_one(broker.send)
+        broker.down = False
+
+        assert spill.replay_one(broker.send) == 1
+        assert broker.batches == [[("auto-reply", (1, ))]]
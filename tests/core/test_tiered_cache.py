@@ -0,0 +1,288 @@
+import asyncio
+import json
+from datetime import datetime, UTC
+
+import pytest
+import redis
+from httpx import AsyncClient
+
+from src.dto.post import PostWithAuthorDTO, AuthorDTO
+from src.dto.validator import ValidatorDTO
+from src.utils.cache import TTLCache
+from src.utils.post.post_cache import PostCacheEntry, dump_entry, load_entry
+from src.utils.tiered_cache import TieredCache
+
+
+class FakeRedis:
+    """Keys and channels shared by the clients of one server, like the clients of several processes."""
+
+    def __init__(self, server: dict = None):
+        self.server = server if server is not None else {"keys": {}, "channels": {}}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise redis.ConnectionError("Connection refused")
+
+    async def get(self, key):
+        self._check()
+        return self.server["keys"].get(key)
+
+    async def mget(self, *keys):
+        self._check()
+        return [self.server["keys"].get(key) for key in keys]
+
+    async def eval(self, script, numkeys, key, version_key, version, value, ttl):
+        """Runs SET_IF_VERSION, the only script of the cache."""
+        self._check()
+        if (self.server["keys"].get(version_key) or "") != version:
+            return 0
+        self.server["keys"][key] = value
+        return 1
+
+    async def set(self, key, value, ex=None, nx=False, px=None):
+        self._check()
+        if nx and key in self.server["keys"]:
+            return None
+        self.server["keys"][key] = value
+        return True
+
+    async def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.server["keys"].pop(key, None)
+
+    async def exists(self, key):
+        self._check()
+        return int(key in self.server["keys"])
+
+    async def aclose(self):
+        pass
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def delete(self, *keys):
+        self.commands.append(lambda: [self.client.server["keys"].pop(key, None) for key in keys])
+
+    def incr(self, key):
+        keys = self.client.server["keys"]
+        self.commands.append(lambda: keys.__setitem__(key, str(int(keys.get(key, 0)) + 1)))
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: True)
+
+    def publish(self, channel, message):
+        self.commands.append(
+            lambda: [queue.put_nowait(message) for queue in self.client.server["channels"].get(channel, [])]
+        )
+
+    async def execute(self):
+        self.client._check()
+        return [command() for command in self.commands]
+
+
+class FakePubSub:
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.queue = asyncio.Queue()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        for queues in self.client.server["channels"].values():
+            if self.queue in queues:
+                queues.remove(self.queue)
+
+    async def subscribe(self, channel):
+        self.client._check()
+        self.client.server["channels"].setdefault(channel, []).append(self.queue)
+
+    async def listen(self):
+        while True:
+            yield {"type": "message", "data": await self.queue.get()}
+
+
+def make_cache(client: FakeRedis, lock_seconds: float = 0) -> TieredCache[dict]:
+    return TieredCache("test", TTLCache(max_size=10, ttl=60), client, ttl=60, dumps=json.dumps, loads=json.loads,
+                       retry_after=60, lock_seconds=lock_seconds)
+
+
+class Source:
+    def __init__(self, value=None):
+        self.value = value if value is not None else {"title": "First"}
+        self.loads = 0
+        self.release = None
+
+    async def load(self):
+        self.loads += 1
+        if self.release is not None:
+            await self.release.wait()
+        return dict(self.value) if self.value else None
+
+
+async def subscribed(*caches: TieredCache):
+    for cache in caches:
+        cache.start()
+    # Lets the listeners subscribe
+    await asyncio.sleep(0)
+
+
+class TestTieredCache:
+
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_other_processes(self):
+        server = {"keys": {}, "channels": {}}
+        first, second = make_cache(FakeRedis(server)), make_cache(FakeRedis(server))
+        await subscribed(first, second)
+        source = Source()
+
+        try:
+            assert await first.get_or_load("1", source.load) == {"title": "First"}
+            # Served from Redis, then from the local tier
+            assert await second.get_or_load("1", source.load) == {"title": "First"}
+            assert await second.get_or_load("1", source.load) == {"title": "First"}
+            assert source.loads == 1
+
+            source.value = {"title": "Second"}
+            await first.invalidate("1")
+            await asyncio.sleep(0)
+
+            assert await second.get_or_load("1", source.load) == {"title": "Second"}
+            assert await first.get_or_load("1", source.load) == {"title": "Second"}
+            assert source.loads == 2
+        finally:
+            await first.stop()
+            await second.stop()
+
+    @pytest.mark.asyncio
+    async def test_unsubscribed_process_skips_local_tier(self):
+        """A process that may miss invalidations reads every value from Redis."""
+        client = FakeRedis()
+        reader = make_cache(client)
+        source = Source()
+
+        await reader.get_or_load("1", source.load)
+        # Another process invalidated the entry while this one wasn't subscribed
+        client.server["keys"].clear()
+        await reader.get_or_load("1", source.load)
+
+        assert source.loads == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_falls_back_to_source(self):
+        client = FakeRedis()
+        cache = make_cache(client)
+        source = Source()
+        client.down = True
+
+        assert await cache.get_or_load("1", source.load) == {"title": "First"}
+        client.down = False
+        # Redis is skipped for retry_after seconds after the failure
+        assert await cache.get_or_load("1", source.load) == {"title": "First"}
+        await cache.invalidate("1")
+
+        assert source.loads == 2
+        assert "cache:test:1" not in client.server["keys"]
+
+    @pytest.mark.asyncio
+    async def test_load_overlapping_invalidation_isnt_cached(self):
+        cache = TieredCache("test", TTLCache(max_size=10, ttl=60), None, ttl=60, dumps=json.dumps, loads=json.loads)
+
+        async def stale_load():
+            await cache.invalidate("1")
+            return {"title": "Stale"}
+
+        assert await cache.get_or_load("1", stale_load) == {"title": "Stale"}
+        assert await cache.get_or_load("1", Source().load) == {"title": "First"}
+
+    @pytest.mark.asyncio
+    async def test_load_overlapping_invalidation_of_other_process_isnt_stored(self):
+        """The invalidation may reach Redis before the stale value is written and before its pub/sub message."""
+        server = {"keys": {}, "channels": {}}
+        reader, writer = make_cache(FakeRedis(server)), make_cache(FakeRedis(server))
+
+        async def stale_load():
+            await writer.invalidate("1")
+            return {"title": "Stale"}
+
+        assert await reader.get_or_load("1", stale_load) == {"title": "Stale"}
+        assert "cache:test:1" not in server["keys"]
+        assert await reader.get_or_load("1", Source().load) == {"title": "First"}
+        assert json.loads(server["keys"]["cache:test:1"]) == {"title": "First"}
+
+    @pytest.mark.asyncio
+    async def test_one_process_loads_a_miss(self):
+        server = {"keys": {}, "channels": {}}
+        first, second = make_cache(FakeRedis(server), lock_seconds=5), make_cache(FakeRedis(server), lock_seconds=5)
+        source = Source()
+        source.release = asyncio.Event()
+
+        loading = [asyncio.create_task(first.get_or_load("1", source.load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(second.get_or_load("1", source.load))
+        await asyncio.sleep(0)
+        source.release.set()
+
+        assert await asyncio.gather(*loading, waiting) == [{"title": "First"}] * 4
+        assert source.loads == 1
+        assert "cache:test:1:lock" not in server["keys"]
+
+    @pytest.mark.asyncio
+    async def test_missing_value_releases_waiters(self):
+        server = {"keys": {}, "channels": {}}
+        first, second = make_cache(FakeRedis(server), lock_seconds=60), make_cache(FakeRedis(server), lock_seconds=60)
+        source = Source(value={})
+        source.release = asyncio.Event()
+
+        loading = asyncio.create_task(first.get_or_load("1", source.load))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(second.get_or_load("1", source.load))
+        await asyncio.sleep(0)
+        source.release.set()
+
+        # The waiter doesn't wait for the lock to expire, it loads the value itself
+        assert await asyncio.wait_for(asyncio.gather(loading, waiting), timeout=1) == [None, None]
+        assert source.loads == 2
+
+    def test_entry_round_trip(self):
+        now = datetime.now(UTC)
+        entry = PostCacheEntry(
+            PostWithAuthorDTO(1, "Title", "Content", False, True, 2, None, 3, now, now, author=AuthorDTO("Jo", "Doe")),
+            ValidatorDTO(now, (now, 3, now)),
+        )
+
+        loaded = load_entry(dump_entry(entry))
+
+        assert loaded.details.author.first_name == "Jo"
+        assert loaded.details.created_at == now
+        assert loaded.validator.last_modified == now
+        assert loaded.validator.state == entry.validator.state
+
+    @pytest.mark.asyncio
+    async def test_hit_ratio_metric(self, async_client: AsyncClient):
+        cache = TieredCache("ratio_test", TTLCache(max_size=10, ttl=60), None, ttl=60, dumps=json.dumps,
+                            loads=json.loads)
+        for _ in range(4):
+            await cache.get_or_load("1", Source().load)
+
+        rendered = (await async_client.get("/metrics")).text
+
+        assert 'cache_requests_total{cache="ratio_test",tier="local",result="hit"} 3' in rendered
+        assert 'cache_hit_ratio{cache="ratio_test",tier="local"} 0.75' in rendered
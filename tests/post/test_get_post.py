@@ -1,7 +1,10 @@
+from datetime import datetime, UTC
 from typing import List
 
 import pytest
 from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.models.post import Post
 from src.models.user import User
@@ -25,6 +28,7 @@ class TestGetPost:
         assert response.json()["id"] == post_to_get.id
         assert response.json()["title"] == post_to_get.title
         assert response.json()["content"] == post_to_get.content
+        assert response.json()["author"] == {"first_name": "John", "last_name": "Doe"}
 
     @pytest.mark.asyncio
     async def test_get_post_not_found(self, async_client: AsyncClient, tokens: AuthTokens):
@@ -81,6 +85,10 @@ class TestGetPost:
         )
 
         assert response.status_code == 200
+        posts = response.json()
+
+        assert all(post["draft"] is False for post in posts)  # Drafts are not listed
+        assert all("first_name" in post["author"] for post in posts)
 
     @pytest.mark.asyncio
     async def test_get_all_posts_unauthenticated(self, async_client: AsyncClient):
@@ -94,3 +102,30 @@ class TestGetPost:
         posts = response.json()
 
         assert isinstance(posts, list)  # Ensure the response is a list
+
+    @pytest.mark.asyncio
+    async def test_post_details_are_cached(self, mocker: MockerFixture, async_client: AsyncClient,
+                                           tokens: AuthTokens, the_user: User, db_session: AsyncSession,
+                                           assert_max_queries):
+        """A cached post is served without queries until a change of the post or its comments invalidates it."""
+        mocker.patch('src.utils.content_moderator.implementation.ContentModerator.moderate_text', return_value=True)
+        post = Post(title="Cached post", content="Read often", draft=False, auto_reply=False,
+                    created_at=datetime.now(UTC), author_id=the_user.id)
+        db_session.add(post)
+        await db_session.commit()
+        url = f"/api/v1/posts/{post.id}"
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+
+        await async_client.get(url)
+        with assert_max_queries(0):
+            response = await async_client.get(url)
+        assert response.json()["comment_count"] == 0
+
+        response = await async_client.post(
+            "/api/v1/comments/", json={"content": "First", "post_id": post.id, "parent_id": None}, headers=headers,
+        )
+        assert response.status_code == 201
+        assert (await async_client.get(url)).json()["comment_count"] == 1
+
+        await async_client.put(url, json={"title": "Cached post", "content": "Edited"}, headers=headers)
+        assert (await async_client.get(url)).json()["content"] == "Edited"
@@ -0,0 +1,147 @@
+import subprocess
+import sys
+from datetime import datetime, UTC
+
+import pytest
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+from sqlalchemy import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.core.settings import settings
+from src.models.comment import Comment
+from src.models.like import Like
+from src.models.post import Post
+from src.models.user import User
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+from src.repositories.like.implementation import LikeRepositoryImplementation
+from src.repositories.outbox.implementation import OutboxRepositoryImplementation
+from src.repositories.post.implementation import PostRepositoryImplementation
+from src.repositories.unit_of_work.implementation import UnitOfWork
+from src.repositories.user.implementation import UserRepositoryImplementation
+from src.schemes.auth.token_data import AuthTokens
+from src.services.post.implementation import PostServiceImplementation
+from src.utils.comment.comment_path import child_path
+
+
+async def create_thread(session: AsyncSession, user: User) -> Post:
+    """Creates a post with a comment, a reply and a like of the reply."""
+    post = Post(title="Thread post", content="A post with a comment thread", draft=False, auto_reply=False,
+                created_at=datetime.now(UTC), author_id=user.id)
+    session.add(post)
+    await session.flush()
+
+    comment = Comment(content="Top comment", post_id=post.id, owner_id=user.id, created_at=datetime.now())
+    session.add(comment)
+    await session.flush()
+
+    reply = Comment(content="Reply", post_id=post.id, owner_id=user.id, parent_id=comment.id,
+                    path=child_path(comment), created_at=datetime.now())
+    session.add(reply)
+    await session.flush()
+
+    session.add(Like(comment_id=reply.id, owner_id=user.id))
+    post.comment_count = 2
+    await session.commit()
+    return post
+
+
+async def count_rows(async_db_engine, post_id: int) -> tuple:
+    async with async_db_engine.connect() as connection:
+        posts = await connection.scalar(select(func.count()).select_from(Post).where(Post.id == post_id))
+        comments = await connection.scalar(
+            select(func.count()).select_from(Comment).where(Comment.post_id == post_id)
+        )
+        likes = await connection.scalar(
+            select(func.count()).select_from(Like).join(Comment, Comment.id == Like.comment_id)
+            .where(Comment.post_id == post_id)
+        )
+    return posts, comments, likes
+
+
+class TestPostCascade:
+
+    @pytest.mark.asyncio
+    async def test_delete_post_deletes_thread(self, async_client: AsyncClient, the_user: User, tokens: AuthTokens,
+                                              db_session: AsyncSession, async_db_engine):
+        """The comments of the post and the likes of the comments are deleted with the post."""
+        post = await create_thread(db_session, the_user)
+
+        response = await async_client.delete(
+            f"/api/v1/posts/{post.id}", headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+
+        assert response.status_code == 204
+        assert await count_rows(async_db_engine, post.id) == (0, 0, 0)
+
+    @pytest.mark.asyncio
+    async def test_large_post_is_purged_in_background(self, mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch,
+                                                      async_client: AsyncClient, the_user: User, tokens: AuthTokens,
+                                                      db_session: AsyncSession, async_db_engine):
+        """
+        A post with many comments is hidden right away and its thread is deleted later in chunks.
+        """
+        monkeypatch.setattr(settings, "post_purge_threshold", 0)
+        monkeypatch.setattr(settings, "purge_chunk_size", 1)
+        schedule_posts_purge = mocker.patch("src.services.post.implementation.schedule_posts_purge")
+        post = await create_thread(db_session, the_user)
+
+        response = await async_client.delete(
+            f"/api/v1/posts/{post.id}", headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+
+        assert response.status_code == 204
+        schedule_posts_purge.assert_called_once()
+        assert (await async_client.get(f"/api/v1/posts/{post.id}")).status_code == 404
+        assert await count_rows(async_db_engine, post.id) == (1, 2, 1)
+
+        async with AsyncSession(async_db_engine) as session:
+            service = PostServiceImplementation(
+                uow=UnitOfWork(
+                    session=session,
+                    user_repository=UserRepositoryImplementation(session=session),
+                    post_repository=PostRepositoryImplementation(session=session),
+                    comment_repository=CommentRepositoryImplementation(session=session),
+                    like_repository=LikeRepositoryImplementation(session=session),
+                    outbox_repository=OutboxRepositoryImplementation(session=session),
+                ),
+                content_moderator=mocker.Mock(),
+            )
+            assert await service.purge_deleted_posts() == 1
+            assert await service.purge_deleted_posts() == 0
+
+        assert await count_rows(async_db_engine, post.id) == (0, 0, 0)
+
+    @pytest.mark.asyncio
+    async def test_blocked_comments_count_towards_threshold(self, mocker: MockerFixture,
+                                                            monkeypatch: pytest.MonkeyPatch, async_client: AsyncClient,
+                                                            the_user: User, tokens: AuthTokens,
+                                                            db_session: AsyncSession, async_db_engine):
+        """comment_count leaves out blocked comments, the size of the thread doesn't."""
+        monkeypatch.setattr(settings, "post_purge_threshold", 2)
+        schedule_posts_purge = mocker.patch("src.services.post.implementation.schedule_posts_purge")
+        post = await create_thread(db_session, the_user)
+        for comment in (await db_session.exec(select(Comment).where(Comment.post_id == post.id))).scalars():
+            comment.blocked = True
+        post.comment_count = 0
+        await db_session.commit()
+
+        response = await async_client.delete(
+            f"/api/v1/posts/{post.id}", headers={"Authorization": f"Bearer {tokens.access_token}"},
+        )
+
+        assert response.status_code == 204
+        schedule_posts_purge.assert_called_once()
+        assert await count_rows(async_db_engine, post.id) == (1, 2, 1)
+
+    def test_purge_task_is_registered_in_worker(self):
+        """The worker loads the tasks of src.tasks on its own, in a process that didn't import them before."""
+        script = (
+            "from src.celery_worker import celery\n"
+            "celery.loader.import_default_modules()\n"
+            "assert 'purge-deleted-posts' in celery.tasks, sorted(celery.tasks)\n"
+        )
+
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
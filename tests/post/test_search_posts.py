@@ -0,0 +1,119 @@
+from datetime import datetime, UTC
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.comment import Comment
+from src.models.post import Post
+from src.models.user import User
+
+
+@pytest.fixture(scope="session")
+async def searchable_posts(the_user: User, db_session: AsyncSession) -> List[Post]:
+    post_data = [
+        ("Aurora borealis", "Watching the aurora from the north of Norway", False),
+        ("Travel notes", "An aurora appeared above the fjord on the last night", False),
+        ("Winter photography", "Tips for shooting the aurora with long exposures", False),
+        ("Unfinished aurora draft", "The aurora draft must never be found", True),
+    ]
+    posts = []
+    for title, content, draft in post_data:
+        post = Post(title=title, content=content, draft=draft, auto_reply=False,
+                    created_at=datetime.now(UTC), author_id=the_user.id)
+        db_session.add(post)
+        posts.append(post)
+    await db_session.commit()
+    return posts
+
+
+@pytest.fixture(scope="session")
+async def searchable_comments(the_user: User, searchable_posts: List[Post], db_session: AsyncSession) -> List[Comment]:
+    comment_data = [
+        ("Great glacier pictures", searchable_posts[0].id, False),
+        ("The glacier was blocked for spam", searchable_posts[1].id, True),
+        ("A glacier hidden in a draft", searchable_posts[3].id, False),
+    ]
+    comments = []
+    for content, post_id, blocked in comment_data:
+        comment = Comment(content=content, post_id=post_id, owner_id=the_user.id, blocked=blocked,
+                          created_at=datetime.now())
+        db_session.add(comment)
+        comments.append(comment)
+    await db_session.commit()
+    return comments
+
+
+class TestSearchPosts:
+
+    @pytest.mark.asyncio
+    async def test_search_posts(self, async_client: AsyncClient, searchable_posts: List[Post]):
+        """
+        Published posts matching the query are returned with highlighted snippets, drafts are not.
+        The post with the match in the title ranks first.
+        """
+        response = await async_client.get("/api/v1/posts/search", params={"q": "aurora"})
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert {item["id"] for item in items} == {post.id for post in searchable_posts[:3]}
+        assert items[0]["id"] == searchable_posts[0].id
+        assert all("<mark>aurora</mark>" in item["snippet"].lower() for item in items)
+        assert response.json()["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_search_posts_pagination(self, async_client: AsyncClient, searchable_posts: List[Post]):
+        """Following next_cursor returns every hit exactly once."""
+        ids, cursor = [], None
+        while True:
+            params = {"q": "aurora", "limit": 1}
+            if cursor:
+                params["cursor"] = cursor
+            response = await async_client.get("/api/v1/posts/search", params=params)
+            assert response.status_code == 200
+            ids.extend(item["id"] for item in response.json()["items"])
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                break
+
+        assert sorted(ids) == sorted(post.id for post in searchable_posts[:3])
+
+    @pytest.mark.asyncio
+    async def test_search_posts_invalid_cursor(self, async_client: AsyncClient):
+        response = await async_client.get("/api/v1/posts/search", params={"q": "aurora", "cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    @pytest.mark.asyncio
+    async def test_search_indexes(self, async_db_engine):
+        """The search vectors are covered by partial GIN indexes."""
+        async with async_db_engine.connect() as connection:
+            indexes = dict((await connection.execute(text(
+                "SELECT indexname, indexdef FROM pg_indexes "
+                "WHERE indexname IN ('ix_posts_search_vector', 'ix_comments_search_vector')"
+            ))).all())
+
+        assert "USING gin (search_vector) WHERE (NOT draft)" in indexes["ix_posts_search_vector"]
+        assert "USING gin (search_vector) WHERE (NOT blocked)" in indexes["ix_comments_search_vector"]
+
+
+class TestSearchComments:
+
+    @pytest.mark.asyncio
+    async def test_search_comments(self, async_client: AsyncClient, searchable_comments: List[Comment]):
+        """Blocked comments and comments of drafts are not returned."""
+        response = await async_client.get("/api/v1/comments/search", params={"q": "glaciers"})
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert [item["id"] for item in items] == [searchable_comments[0].id]
+        assert "<mark>glacier</mark>" in items[0]["snippet"]
+
+    @pytest.mark.asyncio
+    async def test_search_comments_empty_query(self, async_client: AsyncClient):
+        response = await async_client.get("/api/v1/comments/search", params={"q": ""})
+
+        assert response.status_code == 422
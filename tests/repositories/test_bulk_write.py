@@ -0,0 +1,92 @@
+from typing import List
+
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.comment import Comment
+from src.models.post import Post
+from src.models.user import User
+from src.repositories.comment.implementation import CommentRepositoryImplementation
+
+
+class TestBulkWrite:
+
+    @staticmethod
+    def _make_comments(user: User, post: Post, count: int) -> List[Comment]:
+        return [
+            Comment(content=f"Bulk comment {i}", post_id=post.id, owner_id=user.id)
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_add_many(self, db_session: AsyncSession, another_user: User, posts_of_another_user: List[Post]):
+        """
+        Records are created in bulk and their ids are returned in the same order.
+        """
+        repository = CommentRepositoryImplementation(db_session)
+        records = self._make_comments(another_user, posts_of_another_user[2], 5)
+
+        ids = await repository.add_many(records)
+        await db_session.commit()
+
+        assert len(ids) == 5
+        created = await repository.list(id=ids)
+        contents_by_id = {comment.id: comment.content for comment in created}
+        assert [contents_by_id[id] for id in ids] == [record.content for record in records]
+        # Python-side defaults are applied to every row
+        assert all(comment.created_at is not None and comment.likes_count == 0 for comment in created)
+
+        await repository.delete_where(id=ids)
+        await db_session.commit()
+
+    @pytest.mark.asyncio
+    async def test_add_many_empty(self, db_session: AsyncSession):
+        repository = CommentRepositoryImplementation(db_session)
+
+        assert await repository.add_many([]) == []
+
+    @pytest.mark.asyncio
+    async def test_update_many(self, db_session: AsyncSession, another_user: User, posts_of_another_user: List[Post]):
+        """
+        The same values are applied to all matching records, ids of the updated records are returned.
+        """
+        repository = CommentRepositoryImplementation(db_session)
+        ids = await repository.add_many(self._make_comments(another_user, posts_of_another_user[2], 3))
+
+        updated_ids = await repository.update_many({"blocked": True}, id=ids[:2])
+        await db_session.commit()
+
+        assert sorted(updated_ids) == sorted(ids[:2])
+        blocked = await repository.list(id=ids, blocked=True)
+        assert sorted(comment.id for comment in blocked) == sorted(ids[:2])
+
+        await repository.delete_where(id=ids)
+        await db_session.commit()
+
+    @pytest.mark.asyncio
+    async def test_delete_where(self, db_session: AsyncSession, another_user: User, posts_of_another_user: List[Post]):
+        repository = CommentRepositoryImplementation(db_session)
+        ids = await repository.add_many(self._make_comments(another_user, posts_of_another_user[2], 3))
+
+        deleted_ids = await repository.delete_where(id=ids)
+
+        assert sorted(deleted_ids) == sorted(ids)
+        assert await repository.list(id=ids) == []
+
+        await db_session.commit()
+
+    @pytest.mark.asyncio
+    async def test_bulk_write_requires_filters(self, db_session: AsyncSession):
+        """
+        Update and delete without filter conditions must not touch the whole table.
+        """
+        repository = CommentRepositoryImplementation(db_session)
+
+        with pytest.raises(ValueError):
+            await repository.update_many({"blocked": True})
+
+        with pytest.raises(ValueError):
+            await repository.delete_where()
+
+        with pytest.raises(ValueError):
+            await repository.delete_where(not_a_column=1)
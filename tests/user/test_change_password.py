@@ -6,7 +6,17 @@ from src.schemes.auth.token_data import AuthTokens
 class TestChangePassword:
 
     @pytest.mark.asyncio
-    async def test_change_password(self, async_client: AsyncClient, the_user: User, tokens: AuthTokens):
+    async def test_change_password(self, async_client: AsyncClient, async_db_engine):
+        # The change revokes the tokens of the user, so the user isn't shared with other tests
+        email = "password.changer@email.com"
+        response = await async_client.post("/api/v1/users/signup", json={
+            "email": email, "first_name": "Pat", "last_name": "Changer",
+            "date_of_birth": "1990-01-01", "password1": "some_pwd", "password2": "some_pwd",
+        })
+        assert response.status_code == 201
+        response = await async_client.post("/api/v1/auth/token", data={"username": email, "password": "some_pwd"})
+        old_tokens = AuthTokens(**response.json())
+
         # Valid password change
         response = await async_client.put(
             "/api/v1/users/change-password",
@@ -15,20 +25,25 @@ class TestChangePassword:
                 "new_password1": "new_password123",
                 "new_password2": "new_password123"
             },
-            headers={"Authorization": f"Bearer {tokens.access_token}"}
+            headers={"Authorization": f"Bearer {old_tokens.access_token}"}
         )
         assert response.status_code == 204
 
-        # Reset password for future tests
-        await async_client.put(
-            "/api/v1/users/change-password",
-            json={
-                "old_password": "new_password123",
-                "new_password1": "some_pwd",
-                "new_password2": "some_pwd"
-            },
-            headers={"Authorization": f"Bearer {tokens.access_token}"}
-        )
+        # Tokens issued before the change are revoked
+        response = await async_client.get("/api/v1/users/details",
+                                          headers={"Authorization": f"Bearer {old_tokens.access_token}"})
+        assert response.status_code == 401
+        assert response.json()["detail"] == "Token revoked"
+        response = await async_client.post("/api/v1/auth/token/refresh",
+                                           json={"refresh_token": old_tokens.refresh_token})
+        assert response.status_code == 401
+
+        response = await async_client.post("/api/v1/auth/token",
+                                           data={"username": email, "password": "new_password123"})
+        new_tokens = AuthTokens(**response.json())
+        response = await async_client.get("/api/v1/users/details",
+                                          headers={"Authorization": f"Bearer {new_tokens.access_token}"})
+        assert response.status_code == 200
 
     @pytest.mark.asyncio
     async def test_change_password_too_short(self, async_client: AsyncClient, tokens: AuthTokens):
@@ -0,0 +1,103 @@
+from typing import List
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.user import User
+from src.schemes.auth.token_data import AuthTokens
+from src.utils.password_utils import hash_password
+
+
+@pytest.fixture(scope="session")
+async def trigram_search(async_db_engine):
+    """Skips the test when the database server has no pg_trgm extension."""
+    async with async_db_engine.connect() as connection:
+        installed = (await connection.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        )).first()
+    if installed is None:
+        pytest.skip("pg_trgm is not available")
+
+
+@pytest.fixture(scope="session")
+async def searchable_users(db_session: AsyncSession) -> List[User]:
+    user_data = [
+        ("jonathan.smith@email.com", "Jonathan", "Smith"),
+        ("joanna.brown@email.com", "Joanna", "Brown"),
+        ("mark@email.com", "Mark", "Jolly"),
+        ("zed@email.com", "Zed", "Zimmer"),
+    ]
+    users = []
+    for email, first_name, last_name in user_data:
+        user = User(email=email, first_name=first_name, last_name=last_name, password=hash_password("some_pwd"))
+        db_session.add(user)
+        users.append(user)
+    await db_session.commit()
+    return users
+
+
+class TestSearchUsers:
+
+    @pytest.mark.asyncio
+    async def test_search_users_by_prefix(self, async_client: AsyncClient, tokens: AuthTokens,
+                                          trigram_search, searchable_users: List[User]):
+        """Names starting with the query match, the response contains neither passwords nor emails."""
+        response = await async_client.get("/api/v1/users/search", params={"q": "@JO"},
+                                          headers={"Authorization": f"Bearer {tokens.access_token}"})
+
+        assert response.status_code == 200
+        found = {user["id"] for user in response.json()}
+        assert {searchable_users[0].id, searchable_users[1].id, searchable_users[2].id} <= found
+        assert searchable_users[3].id not in found
+        assert all(set(user) == {"id", "first_name", "last_name"} for user in response.json())
+
+    @pytest.mark.asyncio
+    async def test_search_users_by_email(self, async_client: AsyncClient, tokens: AuthTokens,
+                                         trigram_search, searchable_users: List[User]):
+        """Only the whole email finds a user, a part of it can't be used to enumerate emails."""
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+
+        response = await async_client.get("/api/v1/users/search", params={"q": "@Zed@Email.com"}, headers=headers)
+        assert [user["id"] for user in response.json()] == [searchable_users[3].id]
+
+        response = await async_client.get("/api/v1/users/search", params={"q": "zed@email"}, headers=headers)
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_search_users_fuzzy(self, async_client: AsyncClient, tokens: AuthTokens,
+                                      trigram_search, searchable_users: List[User]):
+        """A misspelled name still finds the user."""
+        response = await async_client.get("/api/v1/users/search", params={"q": "jonathon"},
+                                          headers={"Authorization": f"Bearer {tokens.access_token}"})
+
+        assert response.status_code == 200
+        assert [user["id"] for user in response.json()] == [searchable_users[0].id]
+
+    @pytest.mark.asyncio
+    async def test_search_users_cached(self, async_client: AsyncClient, tokens: AuthTokens,
+                                       trigram_search, searchable_users: List[User], assert_max_queries):
+        """Repeated queries are answered from the cache, only the current user is loaded."""
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+        await async_client.get("/api/v1/users/search", params={"q": "zimm"}, headers=headers)
+
+        with assert_max_queries(1):
+            response = await async_client.get("/api/v1/users/search", params={"q": "@Zimm"}, headers=headers)
+
+        assert [user["id"] for user in response.json()] == [searchable_users[3].id]
+
+    @pytest.mark.asyncio
+    async def test_search_users_short_query(self, async_client: AsyncClient, tokens: AuthTokens):
+        """One character queries return nothing without querying the users."""
+        response = await async_client.get("/api/v1/users/search", params={"q": "@j"},
+                                          headers={"Authorization": f"Bearer {tokens.access_token}"})
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_search_users_unauthenticated(self, async_client: AsyncClient):
+        response = await async_client.get("/api/v1/users/search", params={"q": "jo"})
+
+        assert response.status_code == 401